@@ -0,0 +1,203 @@
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from grafo_csr import GrafoCSR
+from limitacoes_geograficas import mascara_terrenos
+
+
+def componentes_fortes(num_nodos: int, offsets: List[int], destinos: List[int],
+                       permitida: List[bool]) -> Tuple[List[int], int]:
+    """
+    Componentes fortemente conexas do subgrafo das arestas permitidas (Tarjan iterativo).
+
+    As componentes são numeradas pela ordem em que são fechadas, que é uma ordem
+    topológica inversa do grafo condensado: os sucessores de uma componente têm
+    sempre número menor.
+
+    Returns:
+        tuple: (componente de cada nodo, número de componentes)
+    """
+    componente = [-1] * num_nodos
+    ordem = [-1] * num_nodos
+    baixo = [0] * num_nodos
+    pilha = []
+    na_pilha = [False] * num_nodos
+    contador = 0
+    num_componentes = 0
+
+    for raiz in range(num_nodos):
+        if ordem[raiz] >= 0:
+            continue
+        # Cada entrada guarda o nodo e a próxima aresta a visitar
+        chamadas = [(raiz, offsets[raiz])]
+        ordem[raiz] = baixo[raiz] = contador
+        contador += 1
+        pilha.append(raiz)
+        na_pilha[raiz] = True
+        while chamadas:
+            u, e = chamadas[-1]
+            fim = offsets[u + 1]
+            while e < fim and not permitida[e]:
+                e += 1
+            if e < fim:
+                chamadas[-1] = (u, e + 1)
+                v = destinos[e]
+                if ordem[v] < 0:
+                    ordem[v] = baixo[v] = contador
+                    contador += 1
+                    pilha.append(v)
+                    na_pilha[v] = True
+                    chamadas.append((v, offsets[v]))
+                elif na_pilha[v]:
+                    baixo[u] = min(baixo[u], ordem[v])
+                continue
+
+            chamadas.pop()
+            if chamadas:
+                pai = chamadas[-1][0]
+                baixo[pai] = min(baixo[pai], baixo[u])
+            if baixo[u] == ordem[u]:
+                while True:
+                    w = pilha.pop()
+                    na_pilha[w] = False
+                    componente[w] = num_componentes
+                    if w == u:
+                        break
+                num_componentes += 1
+
+    return componente, num_componentes
+
+
+# Limite de bits (componentes ao quadrado) dos bitsets de alcance de uma classe, cerca de 8 MB;
+# acima dele a classe guarda só as componentes e as consultas recorrem a uma BFS
+MAX_BITS_ALCANCE = 2 ** 26
+
+
+class IndiceAlcancabilidade:
+    """
+    Índice de alcançabilidade por classe de terrenos a evitar.
+
+    Para cada classe calcula as componentes fortemente conexas do subgrafo
+    transitável (arestas não bloqueadas e sem terrenos a evitar) e, sobre o
+    grafo condensado, o conjunto de componentes alcançáveis a partir de cada
+    componente, guardado como bitset num inteiro. Saber se existe caminho entre
+    dois nodos passa a ser uma consulta O(1), feita antes de qualquer busca.
+
+    Os bitsets ocupam O(C²) bits para C componentes; se uma classe tiver
+    componentes a mais (por exemplo, barcos, em que quase todas as componentes
+    são nodos isolados), guardam-se só as componentes e as consultas entre
+    componentes diferentes são resolvidas por BFS no subgrafo transitável.
+
+    Só os bloqueios e os terrenos afetam a alcançabilidade: as alterações de
+    custo não invalidam o índice. Uma mudança de terreno descarta todas as
+    classes; quando só há desbloqueios de arestas cuja ligação já estava
+    implícita, o índice mantém-se; caso contrário, a classe é recalculada no
+    próximo acesso.
+    """
+
+    def __init__(self, csr: GrafoCSR):
+        self.csr = csr
+        self._versao = None
+        self._versao_terreno = None
+        self._bloqueado = None
+        # Por máscara: (componente de cada nodo, bitsets de alcance ou None, terrenos a evitar)
+        self._classes: Dict[int, Tuple[List[int], Optional[List[int]], List[str]]] = {}
+
+    def _verificar_bloqueios(self):
+        """Compara os bloqueios e o terreno atuais com os do último cálculo e invalida as classes afetadas."""
+        csr = self.csr
+        if csr.versao == self._versao:
+            return
+        self._versao = csr.versao
+        if (self._bloqueado is None or len(self._bloqueado) != csr.num_arestas
+                or csr.versao_terreno != self._versao_terreno):
+            self._classes.clear()
+            self._bloqueado = csr.bloqueado.copy()
+            self._versao_terreno = csr.versao_terreno
+            return
+
+        alteradas = np.flatnonzero(self._bloqueado != csr.bloqueado)
+        if len(alteradas) == 0:
+            return
+        self._bloqueado = csr.bloqueado.copy()
+        if csr.bloqueado[alteradas].any():
+            # Novos bloqueios podem separar componentes: recalcular tudo
+            self._classes.clear()
+            return
+
+        # Só desbloqueios: mantém-se cada classe em que as novas arestas já eram redundantes
+        origens = np.repeat(np.arange(len(csr)), np.diff(csr.offsets))
+        for mascara, (componente, alcance, evitar) in list(self._classes.items()):
+            permitida = csr.arestas_permitidas(evitar)
+            for e in alteradas.tolist():
+                if not permitida[e]:
+                    continue
+                cu, cv = componente[origens[e]], componente[csr.destinos[e]]
+                if alcance is None or not alcance[cu] >> cv & 1:
+                    del self._classes[mascara]
+                    break
+
+    def _classe(self, evitar: Iterable[str]) -> Tuple[List[int], Optional[List[int]], List[str]]:
+        """Devolve (componente de cada nodo, bitsets de alcance ou None, terrenos a evitar) para uma classe."""
+        self._verificar_bloqueios()
+        evitar = list(evitar)
+        mascara = mascara_terrenos(evitar)
+        if mascara not in self._classes:
+            offsets, destinos, _, _ = self.csr.listas()
+            permitida = self.csr.arestas_permitidas(evitar)
+            componente, num_componentes = componentes_fortes(len(self.csr), offsets, destinos, permitida)
+            if num_componentes * num_componentes > MAX_BITS_ALCANCE:
+                self._classes[mascara] = (componente, None, evitar)
+                return self._classes[mascara]
+
+            # Arestas do grafo condensado, por componente de origem
+            sucessores: List[set] = [set() for _ in range(num_componentes)]
+            for u in range(len(self.csr)):
+                cu = componente[u]
+                for e in range(offsets[u], offsets[u + 1]):
+                    if permitida[e] and componente[destinos[e]] != cu:
+                        sucessores[cu].add(componente[destinos[e]])
+
+            # Os sucessores de uma componente têm número menor: basta percorrer por ordem crescente
+            alcance = [0] * num_componentes
+            for c in range(num_componentes):
+                bits = 1 << c
+                for s in sucessores[c]:
+                    bits |= alcance[s]
+                alcance[c] = bits
+            self._classes[mascara] = (componente, alcance, evitar)
+        return self._classes[mascara]
+
+    def _bfs(self, inicio: int, objetivo: int, evitar: List[str]) -> bool:
+        """Procura em largura no subgrafo transitável da classe."""
+        offsets, destinos, _, _ = self.csr.listas()
+        permitida = self.csr.arestas_permitidas(evitar)
+        visitado = {inicio}
+        fila = deque([inicio])
+        while fila:
+            u = fila.popleft()
+            for e in range(offsets[u], offsets[u + 1]):
+                v = destinos[e]
+                if permitida[e] and v not in visitado:
+                    if v == objetivo:
+                        return True
+                    visitado.add(v)
+                    fila.append(v)
+        return False
+
+    def alcancavel(self, inicio: str, objetivo: str, evitar: Iterable[str] = ()) -> bool:
+        """Indica se existe algum caminho transitável do início ao objetivo para a classe dada."""
+        if inicio not in self.csr or objetivo not in self.csr:
+            return False
+        componente, alcance, evitar = self._classe(evitar)
+        u, v = self.csr.indice[inicio], self.csr.indice[objetivo]
+        cu, cv = componente[u], componente[v]
+        if alcance is not None:
+            return bool(alcance[cu] >> cv & 1)
+        if cu == cv:
+            return True
+        # Os sucessores de uma componente têm sempre número menor
+        if cv > cu:
+            return False
+        return self._bfs(u, v, evitar)
@@ -1,57 +1,81 @@
 import time
-import networkx as nx
 from estado_inicial import estado_inicial
 from criar_grafo import PortugalDistributionGraph
+from grafo_csr import GrafoCSR
+from avaliacao_rotas import AvaliadorRotas, MARGEM_COMBUSTIVEL
+from heuristicas import distancias_ate_objetivo
+from fronteira import FronteiraFIFO, FronteiraLIFO, FronteiraPrioridade
 
 
 def calcular_heuristica(grafo, objetivo):
     """
     Calcula uma heurística baseada no custo mínimo entre os nodos.
+
+    Usa um único Dijkstra inverso a partir do objetivo em vez de um Dijkstra por
+    nodo. Para uma tabela densa reutilizável entre consultas, ver MotorIncremental.
     """
-    heuristica = {}
-    for nodo in grafo.nodes():
-        try:
-            # Usa o algoritmo de Dijkstra para encontrar o caminho mais curto
-            caminho = nx.dijkstra_path(grafo, nodo, objetivo, weight='custo')
-            custo = sum(grafo[caminho[i]][caminho[i+1]]['custo'] 
-                       for i in range(len(caminho)-1))
-            heuristica[nodo] = custo
-        except (nx.NetworkXNoPath, nx.NodeNotFound):
-            heuristica[nodo] = float('inf')
+    csr = _como_csr(grafo)
+    if objetivo not in csr:
+        return {nodo: float('inf') for nodo in csr.nomes}
+    tabela = distancias_ate_objetivo(csr, csr.indice[objetivo])
+    return dict(zip(csr.nomes, tabela.tolist()))
+
+def _como_csr(grafo):
+    """Devolve a vista CSR do grafo, compilando-a se for passado um DiGraph."""
+    return grafo if isinstance(grafo, GrafoCSR) else GrafoCSR(grafo)
+
+def _heuristica_por_indice(csr, heuristica):
+    """Converte uma heurística indexada pelo nome dos nodos numa lista indexada pelos ids do CSR."""
+    if isinstance(heuristica, dict):
+        return [heuristica.get(nome, float('inf')) for nome in csr.nomes]
     return heuristica
 
+def _reconstruir_caminho(csr, pais, nodo):
+    """Reconstrói o caminho até `nodo` seguindo os apontadores para o pai, uma única vez no fim da busca."""
+    caminho = []
+    while nodo is not None:
+        caminho.append(nodo)
+        nodo = pais[nodo]
+    caminho.reverse()
+    return csr.caminho_para_nomes(caminho)
+
+def _pre_avaliar(heuristica, nodos):
+    """Pede às heurísticas avaliadas a pedido que calculem em lote os nodos gerados numa expansão."""
+    if hasattr(heuristica, 'pre_avaliar'):
+        heuristica.pre_avaliar(nodos)
+
 def busca_em_largura(grafo, inicio, objetivo, evitar: list[str] = []):
     """
     Implementação corrigida da busca em largura.
+
+    Aceita um nx.DiGraph ou um GrafoCSR já compilado.
     """
     
     if inicio not in grafo or objetivo not in grafo:
         print(f"Nodo inicial {inicio} ou objetivo {objetivo} não encontrado no grafo")
         return None
+
+    csr = _como_csr(grafo)
+    offsets, destinos, _, _ = csr.listas()
+    permitida = csr.arestas_permitidas(evitar)
+    i_inicio, i_objetivo = csr.indice[inicio], csr.indice[objetivo]
         
-    fronteira = [(inicio, [inicio])]
-    explorados = set()
+    fronteira = FronteiraFIFO()
+    fronteira.inserir(i_inicio)
+    # Os nodos já gerados são as chaves de `pais`: cada nodo entra na fronteira no máximo uma vez
+    pais = {i_inicio: None}
     
     while fronteira:
-        nodo, caminho = fronteira.pop(0)
+        nodo = fronteira.remover()
         
-        pai = None
-        if len(caminho) > 1:
-            pai = caminho[-2]
+        if nodo == i_objetivo:
+            return _reconstruir_caminho(csr, pais, nodo)
         
-        if nodo == objetivo:
-            return caminho
-        
-        if nodo not in explorados:
-            explorados.add((nodo, pai))
-            vizinhos = sorted(list(grafo.neighbors(nodo)))
-            
-            for vizinho in vizinhos:
-                # print(nodo, vizinho, grafo.nodes[vizinho].get("tipo_terreno", None), evitar)
-                if (vizinho, nodo) not in explorados and not grafo[nodo][vizinho].get('bloqueado', False) and grafo.nodes[vizinho].get("tipo_terreno", None) not in evitar:
-                    novo_caminho = caminho + [vizinho]
-                    if vizinho not in caminho:
-                        fronteira.append((vizinho, novo_caminho))
+        for e in range(offsets[nodo], offsets[nodo + 1]):
+            vizinho = destinos[e]
+            if vizinho not in pais and permitida[e]:
+                pais[vizinho] = nodo
+                fronteira.inserir(vizinho)
     
     print(f"Não foi encontrado caminho entre {inicio} e {objetivo}")
     return None
@@ -59,30 +83,39 @@ def busca_em_largura(grafo, inicio, objetivo, evitar: list[str] = []):
 def busca_em_profundidade(grafo, inicio, objetivo, evitar: list[str] = []):
     """
     Implementação corrigida da busca em profundidade.
+
+    Aceita um nx.DiGraph ou um GrafoCSR já compilado.
     """
     if inicio not in grafo or objetivo not in grafo:
         print(f"Nodo inicial {inicio} ou objetivo {objetivo} não encontrado no grafo")
         return None
+
+    csr = _como_csr(grafo)
+    offsets, destinos, _, _ = csr.listas()
+    permitida = csr.arestas_permitidas(evitar)
+    i_inicio, i_objetivo = csr.indice[inicio], csr.indice[objetivo]
         
-    fronteira = [(inicio, [inicio])]
+    fronteira = FronteiraLIFO()
+    fronteira.inserir(i_inicio)
+    pais = {i_inicio: None}
     explorados = set()
     
     while fronteira:
-        nodo, caminho = fronteira.pop()
+        nodo = fronteira.remover()
         
-        if nodo == objetivo:
-            return caminho
+        if nodo == i_objetivo:
+            return _reconstruir_caminho(csr, pais, nodo)
             
         if nodo not in explorados:
             explorados.add(nodo)
-            vizinhos = sorted(list(grafo.neighbors(nodo)), reverse=True)
             
-            for vizinho in vizinhos:
-                # print(nodo, vizinho, grafo.nodes[vizinho].get("tipo_terreno", None), evitar)
-                if vizinho not in explorados and not grafo[nodo][vizinho].get('bloqueado', False) and grafo.nodes[vizinho].get("tipo_terreno", None) not in evitar:
-                    novo_caminho = caminho + [vizinho]
-                    if vizinho not in [n for n, _ in fronteira]:
-                        fronteira.append((vizinho, novo_caminho))
+            # Vizinhos por ordem decrescente de nome, para que o menor seja expandido primeiro
+            for e in range(offsets[nodo + 1] - 1, offsets[nodo] - 1, -1):
+                vizinho = destinos[e]
+                if vizinho not in explorados and permitida[e]:
+                    if vizinho not in fronteira:
+                        pais[vizinho] = nodo
+                        fronteira.inserir(vizinho)
     
     print(f"Não foi encontrado caminho entre {inicio} e {objetivo}")
     return None
@@ -90,33 +123,44 @@ def busca_em_profundidade(grafo, inicio, objetivo, evitar: list[str] = []):
 def busca_gulosa(grafo, inicio, objetivo, heuristica=None, evitar: list[str] = []):
     """
     Implementação corrigida da busca gulosa.
+
+    Aceita um nx.DiGraph ou um GrafoCSR já compilado. A heurística pode ser um
+    dicionário indexado pelo nome dos nodos ou uma sequência indexada pelos ids do CSR.
     """
     if inicio not in grafo or objetivo not in grafo:
         print(f"Nodo inicial {inicio} ou objetivo {objetivo} não encontrado no grafo")
         return None
     
+    csr = _como_csr(grafo)
     if heuristica is None:
-        heuristica = calcular_heuristica(grafo, objetivo)
+        heuristica = calcular_heuristica(csr, objetivo)
+
+    offsets, destinos, _, _ = csr.listas()
+    permitida = csr.arestas_permitidas(evitar)
+    heuristica = _heuristica_por_indice(csr, heuristica)
+    i_inicio, i_objetivo = csr.indice[inicio], csr.indice[objetivo]
         
-    fronteira = [(heuristica[inicio], inicio, [inicio])]
+    fronteira = FronteiraPrioridade()
+    fronteira.inserir(i_inicio, heuristica[i_inicio])
+    pais = {i_inicio: None}
     explorados = set()
     
     while fronteira:
-        _, nodo, caminho = sorted(fronteira, key=lambda x: x[0])[0]
-        fronteira = [(h, n, p) for h, n, p in fronteira if n != nodo]
+        nodo, _ = fronteira.remover()
         
-        if nodo == objetivo:
-            return caminho
+        if nodo == i_objetivo:
+            return _reconstruir_caminho(csr, pais, nodo)
             
         if nodo not in explorados:
             explorados.add(nodo)
+            _pre_avaliar(heuristica, destinos[offsets[nodo]:offsets[nodo + 1]])
             
-            for vizinho in sorted(grafo.neighbors(nodo)):
-                # print(nodo, vizinho, grafo.nodes[vizinho].get("tipo_terreno", None), evitar)
-                if vizinho not in explorados and not grafo[nodo][vizinho].get('bloqueado', False) and grafo.nodes[vizinho].get("tipo_terreno", None) not in evitar:
-                    if vizinho not in [n for _, n, _ in fronteira]:
-                        novo_caminho = caminho + [vizinho]
-                        fronteira.append((heuristica[vizinho], vizinho, novo_caminho))
+            for e in range(offsets[nodo], offsets[nodo + 1]):
+                vizinho = destinos[e]
+                if vizinho not in explorados and permitida[e]:
+                    if vizinho not in fronteira:
+                        pais[vizinho] = nodo
+                        fronteira.inserir(vizinho, heuristica[vizinho])
     
     print(f"Não foi encontrado caminho entre {inicio} e {objetivo}")
     return None
@@ -124,65 +168,244 @@ def busca_gulosa(grafo, inicio, objetivo, heuristica=None, evitar: list[str] = [
 def busca_a_estrela(grafo, inicio, objetivo, heuristica=None, evitar: list[str] = []):
     """
     Implementação corrigida do A*.
+
+    Aceita um nx.DiGraph ou um GrafoCSR já compilado. A heurística pode ser um
+    dicionário indexado pelo nome dos nodos ou uma sequência indexada pelos ids do CSR.
     """
     if inicio not in grafo or objetivo not in grafo:
         print(f"Nodo inicial {inicio} ou objetivo {objetivo} não encontrado no grafo")
         return None
     
+    csr = _como_csr(grafo)
     if heuristica is None:
-        heuristica = calcular_heuristica(grafo, objetivo)
+        heuristica = calcular_heuristica(csr, objetivo)
+
+    offsets, destinos, custo, _ = csr.listas()
+    permitida = csr.arestas_permitidas(evitar)
+    heuristica = _heuristica_por_indice(csr, heuristica)
+    i_inicio, i_objetivo = csr.indice[inicio], csr.indice[objetivo]
         
-    open_list = {inicio}
-    closed_list = set()
+    open_list = FronteiraPrioridade()
+    open_list.inserir(i_inicio, heuristica[i_inicio])
     
-    g = {inicio: 0}
-    parents = {inicio: None}
+    g = {i_inicio: 0}
+    parents = {i_inicio: None}
     
     while open_list:
-        n = min(open_list, key=lambda x: g[x] + heuristica[x])
+        n, _ = open_list.remover()
         
-        if n == objetivo:
-            path = []
-            while n is not None:
-                path.append(n)
-                n = parents[n]
-            path.reverse()
-            return path
+        if n == i_objetivo:
+            return _reconstruir_caminho(csr, parents, n)
             
-        open_list.remove(n)
-        closed_list.add(n)
+        _pre_avaliar(heuristica, destinos[offsets[n]:offsets[n + 1]])
         
-        for vizinho in sorted(grafo.neighbors(n)):
-            if grafo[n][vizinho].get('bloqueado', False) or grafo.nodes[vizinho].get("tipo_terreno", None) in evitar:
+        for e in range(offsets[n], offsets[n + 1]):
+            vizinho = destinos[e]
+            if not permitida[e]:
                 continue
                 
-            tentative_g = g[n] + grafo[n][vizinho]['custo']
+            tentative_g = g[n] + custo[e]
             
-            if vizinho in closed_list and tentative_g >= g.get(vizinho, float('inf')):
-                continue
-                
-            if vizinho not in open_list or tentative_g < g.get(vizinho, float('inf')):
+            if tentative_g < g.get(vizinho, float('inf')):
+                # Novo nodo, nodo na fronteira com melhor custo (decrease-key) ou reabertura
                 parents[vizinho] = n
                 g[vizinho] = tentative_g
-                if vizinho not in open_list:
-                    open_list.add(vizinho)
+                open_list.inserir(vizinho, tentative_g + heuristica[vizinho])
     
     print(f"Não foi encontrado caminho entre {inicio} e {objetivo}")
     return None
 
+def busca_bidirecional(grafo, inicio, objetivo, evitar: list[str] = []):
+    """
+    Dijkstra bidirecional: uma busca para a frente a partir do início e outra
+    para trás a partir do objetivo, sobre os predecessores do grafo.
+
+    Cada lado expande o nodo de menor custo da sua fronteira (alternando pelo
+    lado com a fronteira mais pequena) e a busca termina quando a soma dos
+    topos das duas fronteiras atinge o melhor custo de encontro já conhecido,
+    o que garante o caminho de custo mínimo. Respeita as arestas bloqueadas e
+    os terrenos a evitar com a mesma regra das restantes buscas: a aresta
+    u -> v só é usada se v não tiver um terreno a evitar.
+
+    Aceita um nx.DiGraph ou um GrafoCSR já compilado.
+    """
+    if inicio not in grafo or objetivo not in grafo:
+        print(f"Nodo inicial {inicio} ou objetivo {objetivo} não encontrado no grafo")
+        return None
+
+    csr = _como_csr(grafo)
+    offsets, destinos, custo, _ = csr.listas()
+    offsets_inv, origens_inv, arestas_inv = csr.listas_inversas()
+    permitida = csr.arestas_permitidas(evitar)
+    i_inicio, i_objetivo = csr.indice[inicio], csr.indice[objetivo]
+
+    if i_inicio == i_objetivo:
+        return [inicio]
+
+    # Custos e apontadores de cada lado: `pais` para a frente, `seguintes` para trás
+    g_frente, g_tras = {i_inicio: 0.0}, {i_objetivo: 0.0}
+    pais, seguintes = {i_inicio: None}, {i_objetivo: None}
+    frente, tras = FronteiraPrioridade(), FronteiraPrioridade()
+    frente.inserir(i_inicio, 0.0)
+    tras.inserir(i_objetivo, 0.0)
+
+    melhor, encontro = float('inf'), None
+
+    while frente and tras:
+        if frente.minimo() + tras.minimo() >= melhor:
+            break
+
+        if len(frente) <= len(tras):
+            n, d = frente.remover()
+            for e in range(offsets[n], offsets[n + 1]):
+                vizinho = destinos[e]
+                if not permitida[e]:
+                    continue
+                nova = d + custo[e]
+                if nova < g_frente.get(vizinho, float('inf')):
+                    g_frente[vizinho] = nova
+                    pais[vizinho] = n
+                    frente.inserir(vizinho, nova)
+                    if vizinho in g_tras and nova + g_tras[vizinho] < melhor:
+                        melhor, encontro = nova + g_tras[vizinho], vizinho
+        else:
+            n, d = tras.remover()
+            for k in range(offsets_inv[n], offsets_inv[n + 1]):
+                e = arestas_inv[k]
+                if not permitida[e]:
+                    continue
+                anterior = origens_inv[k]
+                nova = d + custo[e]
+                if nova < g_tras.get(anterior, float('inf')):
+                    g_tras[anterior] = nova
+                    seguintes[anterior] = n
+                    tras.inserir(anterior, nova)
+                    if anterior in g_frente and g_frente[anterior] + nova < melhor:
+                        melhor, encontro = g_frente[anterior] + nova, anterior
+
+    if encontro is None:
+        print(f"Não foi encontrado caminho entre {inicio} e {objetivo}")
+        return None
+
+    caminho = _reconstruir_caminho(csr, pais, encontro)
+    nodo = seguintes[encontro]
+    while nodo is not None:
+        caminho.append(csr.nomes[nodo])
+        nodo = seguintes[nodo]
+    return caminho
+
+def busca_com_combustivel(grafo, inicio, objetivos, combustivel, autonomia, evitar: list[str] = []):
+    """
+    Busca de rótulos sobre estados (nodo, combustível restante) com paragens nos postos.
+
+    O consumo de cada aresta é o seu custo com a reserva MARGEM_COMBUSTIVEL, a
+    mesma que a simulação exige em cada troço, pelo que uma rota aceite aqui não
+    é recusada por falta de combustível. Ao chegar a um posto o veículo
+    reabastece até à autonomia; como o reabastecimento não tem custo, o rótulo
+    reabastecido domina sempre o outro.
+    Um rótulo (custo, combustível) é descartado se outro rótulo do mesmo nodo
+    tiver custo menor ou igual e pelo menos tanto combustível. Os rótulos são
+    expandidos por custo crescente, pelo que o primeiro a chegar a cada objetivo
+    dá a rota mais barata exequível, com as paragens necessárias incluídas.
+
+    Aceita um nx.DiGraph ou um GrafoCSR já compilado.
+
+    Args:
+        combustivel: Combustível atual do veículo
+        autonomia: Combustível após um reabastecimento
+
+    Returns:
+        dict: Objetivo -> (custo, caminho) para cada objetivo alcançável
+    """
+    if inicio not in grafo:
+        print(f"Nodo inicial {inicio} não encontrado no grafo")
+        return {}
+
+    csr = _como_csr(grafo)
+    offsets, destinos, custo, _ = csr.listas()
+    permitida = csr.arestas_permitidas(evitar)
+    posto = [csr.grafo.nodes[nome].get('tipo') == 'posto' for nome in csr.nomes]
+    i_inicio = csr.indice[inicio]
+    pendentes = {csr.indice[o] for o in objetivos if o in csr}
+
+    # Rótulos guardados em listas paralelas; `vivos[n]` tem os rótulos não dominados do nodo n
+    nodo_rotulo = [i_inicio]
+    custo_rotulo = [0.0]
+    combustivel_rotulo = [autonomia if posto[i_inicio] else combustivel]
+    pai_rotulo = [None]
+    dominado = [False]
+    vivos = {i_inicio: [0]}
+
+    fronteira = FronteiraPrioridade()
+    fronteira.inserir(0, 0.0)
+    resultados = {}
+
+    while fronteira and pendentes:
+        r, d = fronteira.remover()
+        if dominado[r]:
+            continue
+        n = nodo_rotulo[r]
+        if n in pendentes:
+            pendentes.discard(n)
+            caminho = []
+            rotulo = r
+            while rotulo is not None:
+                caminho.append(nodo_rotulo[rotulo])
+                rotulo = pai_rotulo[rotulo]
+            resultados[csr.nomes[n]] = (d, csr.caminho_para_nomes(reversed(caminho)))
+
+        restante = combustivel_rotulo[r]
+        for e in range(offsets[n], offsets[n + 1]):
+            consumo = custo[e] * MARGEM_COMBUSTIVEL
+            if not permitida[e] or consumo > restante:
+                continue
+            vizinho = destinos[e]
+            nova = d + custo[e]
+            tanque = autonomia if posto[vizinho] else restante - consumo
+
+            existentes = vivos.setdefault(vizinho, [])
+            if any(custo_rotulo[k] <= nova and combustivel_rotulo[k] >= tanque for k in existentes):
+                continue
+            # O novo rótulo elimina os que passou a dominar
+            for k in existentes:
+                if nova <= custo_rotulo[k] and tanque >= combustivel_rotulo[k]:
+                    dominado[k] = True
+            existentes[:] = [k for k in existentes if not dominado[k]]
+
+            novo = len(nodo_rotulo)
+            nodo_rotulo.append(vizinho)
+            custo_rotulo.append(nova)
+            combustivel_rotulo.append(tanque)
+            pai_rotulo.append(r)
+            dominado.append(False)
+            existentes.append(novo)
+            fronteira.inserir(novo, nova)
+
+    return resultados
+
 def calcular_metricas_caminho(grafo, caminho):
-    """Calcula métricas do caminho."""
+    """
+    Calcula métricas do caminho.
+
+    Aceita um nx.DiGraph ou um GrafoCSR já compilado. Com um GrafoCSR os custos e
+    tempos são somados sobre os arrays de arestas; com um DiGraph são lidos apenas
+    nas arestas do caminho, sem compilar o grafo inteiro.
+    """
     if not caminho or len(caminho) < 2:
         return None
-    
-    custo_total = 0
-    tempo_total = 0
-    
-    for i in range(len(caminho) - 1):
-        aresta = grafo[caminho[i]][caminho[i + 1]]
-        custo_total += aresta['custo']
-        tempo_total += aresta['tempo']
-    
+
+    if isinstance(grafo, GrafoCSR):
+        avaliador = AvaliadorRotas(grafo)
+        metricas = avaliador.avaliar(avaliador.ids_arestas(caminho))
+        custo_total, tempo_total = metricas['custo'], metricas['tempo']
+    else:
+        custo_total = 0
+        tempo_total = 0
+        for i in range(len(caminho) - 1):
+            aresta = grafo[caminho[i]][caminho[i + 1]]
+            custo_total += aresta['custo']
+            tempo_total += aresta['tempo']
+
     return {
         'custo': round(custo_total, 2),
         'tempo': round(tempo_total, 2),
@@ -200,14 +423,18 @@ def avaliar_algoritmos(grafo, inicio, objetivo):
         print("Erro: nodos de início ou objetivo não encontrados no grafo")
         return None
     
+    # Vista CSR compilada uma vez para a heurística, as buscas e as métricas de todos os caminhos
+    csr = _como_csr(grafo)
+
     print("\nA calcular a heurística...")
-    heuristica = calcular_heuristica(grafo, objetivo)
+    heuristica = calcular_heuristica(csr, objetivo)
     
     algoritmos = {
         "Busca em Largura": busca_em_largura,
         "Busca em Profundidade": busca_em_profundidade,
         "Busca Gulosa": lambda g, i, o: busca_gulosa(g, i, o, heuristica),
-        "A*": lambda g, i, o: busca_a_estrela(g, i, o, heuristica)
+        "A*": lambda g, i, o: busca_a_estrela(g, i, o, heuristica),
+        "Busca Bidirecional": busca_bidirecional
     }
     
     resultados = {}
@@ -215,11 +442,11 @@ def avaliar_algoritmos(grafo, inicio, objetivo):
         print(f"\n A executar {nome}...")
         try:
             inicio_tempo = time.time()
-            caminho = algoritmo(grafo, inicio, objetivo)
+            caminho = algoritmo(csr, inicio, objetivo)
             tempo_execucao = time.time() - inicio_tempo
             
             if caminho:
-                metricas = calcular_metricas_caminho(grafo, caminho)
+                metricas = calcular_metricas_caminho(csr, caminho)
                 if metricas:
                     resultados[nome] = {
                         "caminho": caminho,
@@ -0,0 +1,119 @@
+from typing import Dict, Sequence
+
+import numpy as np
+from grafo_csr import GrafoCSR
+
+# Reserva de combustível exigida em cada troço: a simulação só aceita uma viagem se
+# o combustível disponível for pelo menos custo * MARGEM_COMBUSTIVEL
+MARGEM_COMBUSTIVEL = 1.1
+
+
+class AvaliadorRotas:
+    """
+    Avaliação de rotas representadas como arrays de ids de arestas do CSR.
+
+    Numa única passagem vetorizada obtém, para uma rota ou para um lote de rotas,
+    o custo e o tempo base (soma dos pesos atuais das arestas) e, havendo um
+    gestor de eventos, os fatores de impacto dos obstáculos nos nodos e dos
+    eventos nas arestas, calculados por GestorEventos.impacto_rotas.
+    Os pesos vêm dos arrays do CSR, pelo que este deve estar atualizado.
+    """
+
+    def __init__(self, csr: GrafoCSR, gestor_eventos=None):
+        """
+        Args:
+            csr: Vista CSR do grafo
+            gestor_eventos: GestorEventos cujos arrays de impacto entram na avaliação; sem
+                gestor os impactos são sempre 1
+        """
+        self.csr = csr
+        self.gestor_eventos = gestor_eventos
+        self._nomes = None
+
+    def _preparar(self):
+        """(Re)calcula os arrays derivados da estrutura do CSR, se esta mudou."""
+        csr = self.csr
+        if self._nomes is csr.nomes:
+            return
+        self._nomes = csr.nomes
+        # Nodo de origem de cada aresta e nodos que são postos de reabastecimento
+        self.origens = np.repeat(np.arange(len(csr), dtype=np.int64), np.diff(csr.offsets))
+        self.e_posto = np.array(["POSTO_" in nome for nome in csr.nomes], dtype=bool)
+        if self.gestor_eventos is not None:
+            # Correspondência entre os ids do CSR e os índices dos arrays de impacto do gestor
+            gestor = self.gestor_eventos
+            self._nodo_eventos = np.array([gestor.indice_nodo[n] for n in csr.nomes], dtype=np.int64)
+            self._aresta_eventos = np.empty(csr.num_arestas, dtype=np.int64)
+            for aresta, e in csr.arestas.items():
+                self._aresta_eventos[e] = gestor.custos.indice[aresta]
+
+    def ids_arestas(self, rota: Sequence[str]) -> np.ndarray:
+        """Converte uma rota (lista de nomes de nodos) no array dos ids das suas arestas."""
+        arestas = self.csr.arestas
+        return np.fromiter((arestas[(u, v)] for u, v in zip(rota, rota[1:])),
+                           dtype=np.int64, count=max(len(rota) - 1, 0))
+
+    def avaliar_lote(self, rotas: Sequence[np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        Avalia várias rotas de uma vez.
+
+        Args:
+            rotas: Arrays de ids de arestas, um por rota
+
+        Returns:
+            dict: Arrays com um valor por rota: 'custo' e 'tempo' base e os fatores
+                'impacto_custo' e 'impacto_tempo' dos obstáculos e eventos
+        """
+        num_rotas = len(rotas)
+        comprimentos = np.fromiter((len(r) for r in rotas), dtype=np.int64, count=num_rotas)
+        ids = np.concatenate(rotas).astype(np.int64) if num_rotas else np.empty(0, dtype=np.int64)
+        rota_de = np.repeat(np.arange(num_rotas), comprimentos)
+
+        resultado = {
+            'custo': np.bincount(rota_de, weights=self.csr.custo[ids], minlength=num_rotas),
+            'tempo': np.bincount(rota_de, weights=self.csr.tempo[ids], minlength=num_rotas),
+            'impacto_custo': np.ones(num_rotas),
+            'impacto_tempo': np.ones(num_rotas),
+        }
+        if self.gestor_eventos is None or len(ids) == 0:
+            return resultado
+
+        self._preparar()
+        nao_vazias = comprimentos > 0
+        inicios = (np.cumsum(comprimentos) - comprimentos)[nao_vazias]
+        # Ids do CSR traduzidos para os índices dos arrays de impacto do gestor
+        impacto = self.gestor_eventos.impacto_rotas(
+            self._nodo_eventos[self.origens[ids[inicios]]],
+            self._aresta_eventos[ids],
+            self._nodo_eventos[self.csr.destinos[ids]],
+            inicios,
+        )
+        resultado['impacto_custo'][nao_vazias] = impacto[:, 0]
+        resultado['impacto_tempo'][nao_vazias] = impacto[:, 1]
+        return resultado
+
+    def avaliar(self, ids: np.ndarray) -> Dict[str, float]:
+        """Avalia uma rota: custo e tempo base e fatores de impacto, como em `avaliar_lote`."""
+        return {chave: float(valores[0]) for chave, valores in self.avaliar_lote([ids]).items()}
+
+    def autonomia_suficiente(self, ids: np.ndarray, combustivel: float, autonomia: float) -> bool:
+        """
+        Verifica se o combustível chega para a rota, repondo a autonomia em cada posto.
+
+        O primeiro troço usa o combustível atual (ou a autonomia, se a rota partir de
+        um posto) e cada troço seguinte começa com o depósito cheio. Cada troço tem
+        de caber no combustível disponível com a reserva MARGEM_COMBUSTIVEL.
+        """
+        if len(ids) == 0:
+            return True
+        self._preparar()
+        custo = self.csr.custo[ids]
+        chega_posto = self.e_posto[self.csr.destinos[ids]]
+        # Troço de cada aresta: número de postos atingidos antes dela
+        troco = np.concatenate(([0], np.cumsum(chega_posto[:-1])))
+        acumulado = np.cumsum(custo)
+        inicio_troco = np.flatnonzero(np.diff(troco, prepend=-1))
+        gasto = acumulado - (acumulado - custo)[inicio_troco][troco]
+        inicial = autonomia if self.e_posto[self.origens[ids[0]]] else combustivel
+        disponivel = np.where(troco == 0, inicial, autonomia)
+        return bool((gasto * MARGEM_COMBUSTIVEL <= disponivel).all())
@@ -1,6 +1,7 @@
 import networkx as nx
 import heapq
-from typing import Dict, List
+from functools import cached_property
+from typing import Dict, List, Optional, Tuple
 from estado_inicial import estado_inicial, inicializar_zonas_afetadas
 from criar_grafo import PortugalDistributionGraph
 from algoritmos_busca import (
@@ -8,24 +9,130 @@ from algoritmos_busca import (
     busca_em_profundidade,
     busca_gulosa,
     busca_a_estrela,
-    calcular_heuristica
+    busca_bidirecional,
+    busca_com_combustivel
 )
 from limitacoes_geograficas import TipoTerreno, RestricaoAcesso
+from grafo_csr import GrafoCSR
+from heuristicas import HeuristicaALT, HeuristicaGeografica
+from busca_incremental import MotorIncremental
+from hierarquia_contracao import HierarquiaContracao
+from rede_hubs import RoteadorHubs
+from alcancabilidade import IndiceAlcancabilidade
+from rotas_aereas import PlaneadorAereo
+from gestao_recursos import TabelaPostos
+from avaliacao_rotas import AvaliadorRotas
 from janela_tempo import JanelaTempoZona
+from distancias import CUSTO_POR_KM, matriz_distancias
 import time
 from datetime import datetime, timedelta
 import math
 
+# Custo de referência para normalizar o custo das rotas no score das zonas (300 km)
+CUSTO_REFERENCIA_ZONAS = 300.0 * CUSTO_POR_KM
+
+# Algoritmos que garantem o caminho de custo mínimo
+ALGORITMOS_EXATOS = ("A*", "Busca Bidirecional", "Hierarquia de Contração", "Busca Incremental", "Rede de Hubs")
+
 
 class BuscaEmergencia:
-    def __init__(self, grafo: nx.DiGraph, estado_inicial: Dict):
+    def __init__(self, grafo: nx.DiGraph, estado_inicial: Dict, modo_heuristica: str = "exata",
+                 gestor_meteo=None):
+        """
+        Args:
+            grafo: Grafo da rede de distribuição
+            estado_inicial: Estado inicial da simulação
+            modo_heuristica: Heurística usada pela busca gulosa e pelo A*:
+                "exata" (tabela de custos mantida de forma incremental), "alt" (marcos) ou
+                "geografica" (limite inferior pela distância de haversine, sem pré-processamento)
+            gestor_meteo: GestorMeteorologico cujas condições definem o espaço aéreo fechado
+                para drones e helicópteros
+        """
         self.grafo = grafo
         self.estado = estado_inicial
         self.estado["zonas_afetadas"] = inicializar_zonas_afetadas(grafo)
         self.restricao_acesso = RestricaoAcesso()
-        self.algoritmo_escolhido = self.escolher_melhor_algoritmo()
+        # Vista CSR usada pelas buscas; deve ser atualizada após alterações ao grafo
+        self.grafo_csr = GrafoCSR(grafo)
+        self.modo_heuristica = modo_heuristica
+        self.gestor_meteo = gestor_meteo
         self.pdg = PortugalDistributionGraph()
+        # Os motores de busca abaixo (propriedades) só são construídos no primeiro uso,
+        # depois de os terrenos e os postos estarem definidos no grafo
+
+    @cached_property
+    def motor_incremental(self) -> MotorIncremental:
+        """Estados LPA* por objetivo, reparados com as alterações de cada ciclo."""
+        return MotorIncremental(self.grafo_csr)
+
+    @cached_property
+    def heuristica_alt(self) -> HeuristicaALT:
+        return HeuristicaALT(self.grafo_csr)
+
+    @cached_property
+    def heuristica_geografica(self) -> HeuristicaGeografica:
+        return HeuristicaGeografica(self.grafo_csr)
+
+    @cached_property
+    def hierarquia_contracao(self) -> HierarquiaContracao:
+        """Ordem e atalhos calculados uma vez; os pesos são repersonalizados quando o CSR muda de versão."""
+        return HierarquiaContracao(self.grafo_csr)
+
+    @cached_property
+    def roteador_hubs(self) -> Optional[RoteadorHubs]:
+        try:
+            return RoteadorHubs(self.grafo_csr)
+        except ValueError as e:
+            # Grafo sem a estrutura backbone + folhas: as rotas usam sempre busca no grafo
+            print(f"Rede de hubs indisponível: {e}")
+            return None
+
+    @cached_property
+    def tabela_postos(self) -> TabelaPostos:
+        """Posto mais próximo de cada nodo, recalculado uma vez por versão do CSR."""
+        return TabelaPostos(self.grafo_csr)
+
+    @cached_property
+    def indice_alcancabilidade(self) -> IndiceAlcancabilidade:
+        """Componentes fortemente conexas por classe de veículo, recalculadas só quando os bloqueios mudam."""
+        return IndiceAlcancabilidade(self.grafo_csr)
+
+    @cached_property
+    def avaliador_rotas(self) -> AvaliadorRotas:
+        """Custos das rotas avaliados sobre os arrays de arestas do CSR."""
+        return AvaliadorRotas(self.grafo_csr)
+
+    @cached_property
+    def planeador_aereo(self) -> PlaneadorAereo:
+        """Drones e helicópteros voam em linha reta entre nodos, sem busca no grafo."""
+        return PlaneadorAereo(self.grafo_csr, self.pdg.regioes, self.gestor_meteo)
+
+    @cached_property
+    def algoritmo_escolhido(self) -> str:
+        """Algoritmo escolhido pela avaliação do portefólio, feita na primeira busca."""
+        return self.escolher_melhor_algoritmo()
     
+    def obter_heuristica(self, objetivo: str):
+        """Devolve a heurística até ao objetivo segundo o modo configurado, indexada pelos ids do CSR."""
+        if self.modo_heuristica == "alt":
+            return self.heuristica_alt.para_objetivo(objetivo)
+        if self.modo_heuristica == "geografica":
+            return self.heuristica_geografica.para_objetivo(objetivo)
+        return self.motor_incremental.distancias(objetivo)
+
+    def aplicar_alteracoes(self, alteracoes: List[Tuple[str, str, float, float]]):
+        """
+        Reflete na vista CSR e nos estados incrementais as arestas alteradas.
+
+        Args:
+            alteracoes: Alterações (u, v, custo antigo, custo novo) emitidas por
+                GestorMeteorologico.atualizar_grafo e GestorEventos.aplicar_efeitos
+        """
+        arestas = self.grafo_csr.aplicar_alteracoes(alteracoes)
+        # Sem motor ainda construído não há estados a reparar
+        if 'motor_incremental' in self.__dict__:
+            self.motor_incremental.notificar(arestas)
+
     def escolher_melhor_algoritmo(self):
         """
         Avalia os algoritmos considerando critérios principais:
@@ -44,14 +151,19 @@ class BuscaEmergencia:
         objetivo = pontos_entrega[0]
         
         # Calcular heurística para o objetivo escolhido
-        heuristica = calcular_heuristica(self.grafo, objetivo)
+        heuristica = self.obter_heuristica(objetivo)
         
         algoritmos = {
-            "Busca em Largura": lambda: busca_em_largura(self.grafo, inicio, objetivo),
-            "Busca em Profundidade": lambda: busca_em_profundidade(self.grafo, inicio, objetivo),
-            "Busca Gulosa": lambda: busca_gulosa(self.grafo, inicio, objetivo, heuristica),
-            "A*": lambda: busca_a_estrela(self.grafo, inicio, objetivo, heuristica)
+            "Busca em Largura": lambda: busca_em_largura(self.grafo_csr, inicio, objetivo),
+            "Busca em Profundidade": lambda: busca_em_profundidade(self.grafo_csr, inicio, objetivo),
+            "Busca Gulosa": lambda: busca_gulosa(self.grafo_csr, inicio, objetivo, heuristica),
+            "A*": lambda: busca_a_estrela(self.grafo_csr, inicio, objetivo, heuristica),
+            "Busca Bidirecional": lambda: busca_bidirecional(self.grafo_csr, inicio, objetivo),
+            "Hierarquia de Contração": lambda: self.hierarquia_contracao.busca(inicio, objetivo),
+            "Busca Incremental": lambda: self.motor_incremental.busca(inicio, objetivo)
         }
+        if self.roteador_hubs is not None:
+            algoritmos["Rede de Hubs"] = lambda: self.roteador_hubs.busca(inicio, objetivo)
 
         resultados = {}
         num_testes = 5  # Número de testes para média
@@ -79,18 +191,17 @@ class BuscaEmergencia:
                 # Calcular médias dos testes
                 tempo_exec_medio = sum(tempos_execucao) / len(tempos_execucao)
                 
-                # Para cada caminho, calcular tempo e custo total
-                caminhos_metricas = []
-                for caminho in caminhos:
-                    tempo_rota = sum(self.grafo[caminho[i]][caminho[i+1]]['tempo'] 
-                                   for i in range(len(caminho)-1))
-                    custo_rota = sum(self.grafo[caminho[i]][caminho[i+1]]['custo'] 
-                                   for i in range(len(caminho)-1))
-                    caminhos_metricas.append({
+                # Tempo e custo total de cada caminho, avaliados num só lote sobre o CSR
+                metricas = self.avaliador_rotas.avaliar_lote(
+                    [self.avaliador_rotas.ids_arestas(caminho) for caminho in caminhos])
+                caminhos_metricas = [
+                    {
                         'caminho': caminho,
-                        'tempo_rota': tempo_rota,
-                        'custo_rota': custo_rota
-                    })
+                        'tempo_rota': float(tempo_rota),
+                        'custo_rota': float(custo_rota)
+                    }
+                    for caminho, tempo_rota, custo_rota in zip(caminhos, metricas['tempo'], metricas['custo'])
+                ]
                 
                 # Escolher o melhor caminho baseado em tempo e custo
                 melhor_caminho = min(caminhos_metricas, 
@@ -133,6 +244,30 @@ class BuscaEmergencia:
             print("Nenhum dos algoritmos encontrou um caminho válido")
             return "A*"  # Algoritmo padrão em caso de falha
 
+    def executar_busca(self, inicio: str, objetivo: str, evitar: List[str] = []) -> List[str]:
+        """
+        Executa o algoritmo escolhido entre dois nodos, evitando os terrenos indicados.
+        """
+        if self.algoritmo_escolhido == "Rede de Hubs" and self.roteador_hubs is not None:
+            return self.roteador_hubs.busca(inicio, objetivo, evitar=evitar)
+        if self.algoritmo_escolhido == "Busca em Largura":
+            return busca_em_largura(self.grafo_csr, inicio, objetivo, evitar=evitar)
+        elif self.algoritmo_escolhido == "Busca em Profundidade":
+            return busca_em_profundidade(self.grafo_csr, inicio, objetivo, evitar=evitar)
+        elif self.algoritmo_escolhido == "Busca Bidirecional":
+            return busca_bidirecional(self.grafo_csr, inicio, objetivo, evitar=evitar)
+        elif self.algoritmo_escolhido == "Hierarquia de Contração":
+            return self.hierarquia_contracao.busca(inicio, objetivo, evitar=evitar)
+        elif self.algoritmo_escolhido == "Busca Incremental":
+            return self.motor_incremental.busca(inicio, objetivo, evitar=evitar)
+
+        # Tabela de custos até ao objetivo, reutilizada enquanto os pesos não mudarem
+        heuristica = self.obter_heuristica(objetivo)
+        if self.algoritmo_escolhido == "Busca Gulosa":
+            return busca_gulosa(self.grafo_csr, inicio, objetivo, heuristica, evitar=evitar)
+        else:  # A* como padrão
+            return busca_a_estrela(self.grafo_csr, inicio, objetivo, heuristica, evitar=evitar)
+
     def busca_rota_prioritaria(self, veiculo_id: int, destino_especifico: str = None) -> List[str]:
         """
         Busca a rota prioritária considerando proximidade e prioridade da zona.
@@ -147,9 +282,6 @@ class BuscaEmergencia:
         veiculo = next(v for v in self.estado["veiculos"] if v["id"] == veiculo_id)
         inicio = veiculo["localizacao"]
         
-        # Obter coordenadas do veículo
-        coord_veiculo = self.grafo.nodes[inicio]['coordenadas']
-        
         # Se tiver um destino específico, verificar apenas esse destino
         if destino_especifico:
             if destino_especifico not in self.estado["zonas_afetadas"]:
@@ -162,41 +294,109 @@ class BuscaEmergencia:
             if not self.verificar_capacidade_veiculo(veiculo, zona_info):
                 return None
                 
-            heuristica = calcular_heuristica(self.grafo, destino_especifico)
-            evitar = [e.value for e in self.restricao_acesso.restricoes_veiculo[veiculo["tipo"]]]
+            evitar = self.restricao_acesso.terrenos_evitar(veiculo["tipo"])
+            if self.planeador_aereo.e_aereo(veiculo["tipo"]):
+                rota = self.planeador_aereo.planear(veiculo, [destino_especifico]).get(destino_especifico)
+                return rota[1] if rota else None
+            if not self.indice_alcancabilidade.alcancavel(inicio, destino_especifico, evitar):
+                return None
+            return self.executar_busca(inicio, destino_especifico, evitar)
+        
+        zonas_validas = self._zonas_validas(veiculo)
+        evitar = self.restricao_acesso.terrenos_evitar(veiculo["tipo"])
+        if self.planeador_aereo.e_aereo(veiculo["tipo"]):
+            # A proximidade de um voo direto é a própria distância de haversine
+            rotas = self.planeador_aereo.planear(veiculo, zonas_validas)
+            zonas_candidatas = self._pontuar_zonas(veiculo, [z for z in zonas_validas if z in rotas])
+            if not zonas_candidatas:
+                return None
+            zona = zonas_candidatas[0]
+            print(f"Veículo {veiculo_id} a voar para zona {zona['zona_id']} na região {zona['regiao']}")
+            return rotas[zona['zona_id']][1]
+
+        rotas = None
+        if self.algoritmo_escolhido in ALGORITMOS_EXATOS:
+            # Uma única busca sobre (nodo, combustível) fixa a rota de todas as zonas, com as paragens necessárias
+            rotas = busca_com_combustivel(self.grafo_csr, inicio, zonas_validas,
+                                          veiculo["combustivel"], veiculo["autonomia"], evitar=evitar)
+        zonas_candidatas = self._pontuar_zonas(veiculo, zonas_validas, rotas)
+        
+        # Tentar encontrar um caminho válido para cada zona candidata
+        for zona in zonas_candidatas:
+            zona_id = zona['zona_id']
             
-            if self.algoritmo_escolhido == "Busca em Largura":
-                return busca_em_largura(self.grafo, inicio, destino_especifico, evitar=evitar)
-            elif self.algoritmo_escolhido == "Busca em Profundidade":
-                return busca_em_profundidade(self.grafo, inicio, destino_especifico, evitar=evitar)
-            elif self.algoritmo_escolhido == "Busca Gulosa":
-                return busca_gulosa(self.grafo, inicio, destino_especifico, heuristica, evitar=evitar)
-            else:  # A* como padrão
-                return busca_a_estrela(self.grafo, inicio, destino_especifico, heuristica, evitar=evitar)
+            if rotas is not None:
+                # Rota já calculada e dentro do combustível disponível
+                caminho = rotas[zona_id][1]
+            else:
+                caminho = self.executar_busca(inicio, zona_id, evitar)
+            
+            if caminho and self.verificar_autonomia(veiculo, caminho):
+                print(f"Veículo {veiculo_id} indo para zona {zona_id} na região {zona['regiao']}")
+                return caminho
         
-        # Filtrar zonas acessíveis e calcular scores
-        zonas_candidatas = []
+        return None
+
+    def _zonas_validas(self, veiculo: Dict) -> List[str]:
+        """
+        Zonas acessíveis, por suprir e compatíveis com a capacidade do veículo, exceto a sua
+        localização. As zonas sem caminho transitável para o tipo de veículo são excluídas
+        pelo índice de alcançabilidade, antes de qualquer busca; para os veículos aéreos
+        basta que o terreno da zona seja compatível.
+        """
+        evitar = self.restricao_acesso.terrenos_evitar(veiculo["tipo"])
+        aereo = self.planeador_aereo.e_aereo(veiculo["tipo"])
+        proibido = self.grafo_csr.nodos_proibidos(evitar)
+        zonas_validas = []
         for zona_id, zona_info in self.estado["zonas_afetadas"].items():
             if not zona_info["janela_tempo"].esta_acessivel() or zona_info.get("suprida", False):
                 continue
                 
             if not self.verificar_capacidade_veiculo(veiculo, zona_info):
                 continue
-                
-            # Usar o método calcula_distancia do PDG em vez de cálculo euclidiano
-            coord_zona = self.grafo.nodes[zona_id]['coordenadas']
-            distancia = self.pdg.calcula_distancia(coord_veiculo, coord_zona)
-            
-            # Normalizar distância (quanto menor a distância, maior o score)
+
+            if zona_id == veiculo["localizacao"]:
+                continue
+
+            if aereo:
+                if not proibido[self.grafo_csr.indice[zona_id]]:
+                    zonas_validas.append(zona_id)
+            elif self.indice_alcancabilidade.alcancavel(veiculo["localizacao"], zona_id, evitar):
+                zonas_validas.append(zona_id)
+        return zonas_validas
+
+    def _pontuar_zonas(self, veiculo: Dict, zonas_validas: List[str], rotas: Dict = None) -> List[Dict]:
+        """
+        Calcula o score das zonas para um veículo, por ordem decrescente.
+
+        Args:
+            rotas: Resultado de busca_com_combustivel a partir da localização do veículo. Com
+                rotas, a proximidade é o custo real (e só ficam as zonas alcançáveis com o
+                combustível e as paragens possíveis); sem rotas, é a distância de haversine.
+        """
+        coord_veiculo = self.grafo.nodes[veiculo["localizacao"]]['coordenadas']
+        if rotas is not None:
+            zonas_validas = [zona_id for zona_id in zonas_validas if zona_id in rotas]
+            proximidades = [rotas[zona_id][0] / CUSTO_REFERENCIA_ZONAS for zona_id in zonas_validas]
+        else:
+            # Distâncias de haversine do veículo a todas as zonas numa única operação vetorizada
+            coords_zonas = [self.grafo.nodes[zona_id]['coordenadas'] for zona_id in zonas_validas]
             max_dist = 300.0  # Ajustado para distâncias reais em km
-            score_distancia = 1 - min(distancia / max_dist, 1.0)
+            proximidades = (matriz_distancias([coord_veiculo], coords_zonas)[0] / max_dist).tolist()
+        regiao_veiculo = self.pdg._determinar_regiao(coord_veiculo)
+
+        # Calcular scores
+        zonas_candidatas = []
+        for zona_id, proximidade in zip(zonas_validas, proximidades):
+            # Normalizar o custo ou a distância (quanto menor, maior o score)
+            score_distancia = 1 - min(proximidade, 1.0)
+            coord_zona = self.grafo.nodes[zona_id]['coordenadas']
             
             # Identificar região da zona para considerações adicionais
             regiao_zona = self.pdg._determinar_regiao(coord_zona)
             
             score_emergencia = self.calcular_score_emergencia(zona_id)
             # Adicionar peso para zonas na mesma região
-            regiao_veiculo = self.pdg._determinar_regiao(coord_veiculo)
             bonus_regiao = 0.1 if regiao_zona == regiao_veiculo else 0
             
             score_total = (0.5 * score_emergencia) + (0.4 * score_distancia) + (0.1 * bonus_regiao)
@@ -204,87 +404,128 @@ class BuscaEmergencia:
             zonas_candidatas.append({
                 'zona_id': zona_id,
                 'score': score_total,
-                'distancia': distancia,
                 'regiao': regiao_zona
             })
         
         # Ordenar zonas por score total
         zonas_candidatas.sort(key=lambda x: x['score'], reverse=True)
-        
-        # Cache para heurística
-        heuristica = None
-        
-        # Tentar encontrar um caminho válido para cada zona candidata
-        for zona in zonas_candidatas:
+        return zonas_candidatas
+
+    def planear_lote(self, veiculos: List[Dict]) -> Dict[int, List[str]]:
+        """
+        Planeia as rotas de vários veículos com uma busca por grupo de origem.
+
+        Os veículos são agrupados por (localização, terrenos a evitar) e cada grupo
+        faz uma busca de um para muitos sobre estados (nodo, combustível), que inclui
+        as paragens nos postos, por cada par (combustível, autonomia) distinto entre os
+        seus membros: nenhum veículo é planeado com menos combustível do que tem, e os
+        veículos com o mesmo depósito partilham a busca. Com algoritmos não exatos a
+        busca por zona é partilhada por todo o grupo e a autonomia verificada por
+        veículo. As zonas são depois atribuídas por ordem decrescente de score entre
+        todos os pares (veículo, zona), reservando cada zona atribuída para que dois
+        veículos não sigam para a mesma zona.
+
+        Args:
+            veiculos: Veículos a planear (entradas de estado["veiculos"])
+
+        Returns:
+            dict: Id do veículo -> rota, ou None se não houver zona alcançável
+        """
+        grupos = {}
+        aereos = []
+        for veiculo in veiculos:
+            if self.planeador_aereo.e_aereo(veiculo["tipo"]):
+                aereos.append(veiculo)
+                continue
+            evitar = tuple(self.restricao_acesso.terrenos_evitar(veiculo["tipo"]))
+            chave = (veiculo["localizacao"], evitar)
+            grupos.setdefault(chave, []).append(veiculo)
+
+        exato = self.algoritmo_escolhido in ALGORITMOS_EXATOS
+        rotas_grupo = {}
+        pares = []
+        # Veículos aéreos: voos diretos planeados por geometria, um "grupo" por veículo
+        for veiculo in aereos:
+            zonas = self._zonas_validas(veiculo)
+            rotas = self.planeador_aereo.planear(veiculo, zonas)
+            rotas_grupo[("aereo", veiculo["id"])] = rotas
+            for zona in self._pontuar_zonas(veiculo, [z for z in zonas if z in rotas]):
+                pares.append((zona, veiculo, ("aereo", veiculo["id"])))
+        for grupo, membros in grupos.items():
+            inicio, evitar = grupo
+            zonas_por_veiculo = {v["id"]: self._zonas_validas(v) for v in membros}
+            if not exato:
+                rotas_grupo[grupo] = {}
+                for veiculo in membros:
+                    for zona in self._pontuar_zonas(veiculo, zonas_por_veiculo[veiculo["id"]]):
+                        pares.append((zona, veiculo, grupo))
+                continue
+
+            # Uma busca por depósito distinto: (localização, evitar, combustível, autonomia)
+            depositos = {}
+            for veiculo in membros:
+                depositos.setdefault(grupo + (veiculo["combustivel"], veiculo["autonomia"]), []).append(veiculo)
+            for chave, veiculos_deposito in depositos.items():
+                zonas = list(dict.fromkeys(z for v in veiculos_deposito for z in zonas_por_veiculo[v["id"]]))
+                rotas = busca_com_combustivel(self.grafo_csr, inicio, zonas, chave[2], chave[3],
+                                              evitar=list(evitar))
+                rotas_grupo[chave] = rotas
+                for veiculo in veiculos_deposito:
+                    for zona in self._pontuar_zonas(veiculo, zonas_por_veiculo[veiculo["id"]], rotas):
+                        pares.append((zona, veiculo, chave))
+
+        # Atribuição gulosa pelo maior score; empates resolvidos pela ordem dos veículos
+        posicao = {v["id"]: i for i, v in enumerate(veiculos)}
+        pares.sort(key=lambda p: (-p[0]['score'], posicao[p[1]["id"]]))
+        planeadas = {v["id"]: None for v in veiculos}
+        reservadas = set()
+        for zona, veiculo, grupo in pares:
             zona_id = zona['zona_id']
-            
-            if zona_id == inicio:
+            if planeadas[veiculo["id"]] is not None or zona_id in reservadas:
                 continue
-            
-            if self.algoritmo_escolhido in ["Busca Gulosa", "A*"] and not heuristica:
-                heuristica = calcular_heuristica(self.grafo, zona_id)
-            
-            evitar = [e.value for e in self.restricao_acesso.restricoes_veiculo[veiculo["tipo"]]]
-            caminho = None
-            if self.algoritmo_escolhido == "Busca em Largura":
-                caminho = busca_em_largura(self.grafo, inicio, zona_id, evitar=evitar)
-            elif self.algoritmo_escolhido == "Busca em Profundidade":
-                caminho = busca_em_profundidade(self.grafo, inicio, zona_id, evitar=evitar)
-            elif self.algoritmo_escolhido == "Busca Gulosa":
-                caminho = busca_gulosa(self.grafo, inicio, zona_id, heuristica, evitar=evitar)
-            else:  # A* como padrão
-                caminho = busca_a_estrela(self.grafo, inicio, zona_id, heuristica, evitar=evitar)
-            
+
+            rotas = rotas_grupo[grupo]
+            if zona_id not in rotas:
+                # Algoritmos não exatos: uma busca por (grupo, zona), partilhada pelo grupo
+                caminho = self.executar_busca(grupo[0], zona_id, list(grupo[1]))
+                rotas[zona_id] = (None, caminho)
+            caminho = rotas[zona_id][1]
+
             if caminho and self.verificar_autonomia(veiculo, caminho):
-                print(f"Veículo {veiculo_id} indo para zona {zona_id} na região {zona['regiao']}")
-                return caminho
-        
-        return None
+                print(f"Veículo {veiculo['id']} indo para zona {zona_id} na região {zona['regiao']}")
+                planeadas[veiculo["id"]] = caminho
+                reservadas.add(zona_id)
+
+        return planeadas
+
     def planear_reabastecimento(self, veiculo: Dict) -> List[str]:
         """Planea uma rota para o posto de reabastecimento mais próximo."""
-        coord_veiculo = self.grafo.nodes[veiculo["localizacao"]]['coordenadas']
-        regiao_veiculo = self.pdg._determinar_regiao(coord_veiculo)
-        
-        # Primeiro tentar posto da mesma região
-        posto_regiao = self.estado["postos_reabastecimento"].get(regiao_veiculo)
-        
-        postos = [
-            node for node, data in self.grafo.nodes(data=True) if data.get('tipo') == 'posto'
-        ]
-        if not postos:
-            print("Erro: Nenhum posto de reabastecimento disponível.")
-            return None
+        if self.planeador_aereo.e_aereo(veiculo["tipo"]):
+            rota = self.planeador_aereo.rota_reabastecimento(veiculo)
+            if rota is None:
+                print("Não foi possível encontrar um posto de reabastecimento acessível.")
+            return rota
 
-        # Se houver posto na mesma região, dar prioridade a ele
-        if posto_regiao in postos:
-            postos.remove(posto_regiao)
-            postos.insert(0, posto_regiao)
+        # Posto mais próximo e respetiva rota lidos da tabela de postos, sem busca por posto
+        evitar = self.restricao_acesso.terrenos_evitar(veiculo["tipo"])
+        posto, custo = self.tabela_postos.consultar(veiculo["localizacao"], evitar)
+        if posto is None or custo > veiculo["combustivel"]:
+            print("Não foi possível encontrar um posto de reabastecimento acessível.")
+            return None
 
-        # Tentar cada posto, começando pelo da mesma região
-        for posto in postos:
-            coord_posto = self.grafo.nodes[posto]['coordenadas']
-            distancia = self.pdg.calcula_distancia(coord_veiculo, coord_posto)
-            
-            if distancia <= veiculo["combustivel"]:  # Se tiver autonomia para chegar
-                heuristica = calcular_heuristica(self.grafo, posto)
-                caminho = busca_a_estrela(self.grafo, veiculo["localizacao"], posto, heuristica)
-                if caminho:
-                    print(f"Rota de reabastecimento planejada para {posto}")
-                    print(f"Distância até o posto: {distancia:.2f} km")
-                    return caminho
-
-        print("Não foi possível encontrar um posto de reabastecimento acessível.")
-        return None
+        print(f"Rota de reabastecimento planejada para {posto}")
+        print(f"Custo até o posto: {custo:.2f}")
+        return self.tabela_postos.rota(veiculo["localizacao"], evitar)
 
     def verificar_autonomia(self, veiculo: Dict, caminho: List[str]) -> bool:
         """Verifica se o veículo tem autonomia suficiente para a rota."""
         if not caminho:
             return False
-        custo_total = sum(
-            self.grafo[caminho[i]][caminho[i + 1]]['custo']
-            for i in range(len(caminho) - 1)
-        )
-        return veiculo["combustivel"] >= custo_total
+        if self.planeador_aereo.e_aereo(veiculo["tipo"]):
+            return self.planeador_aereo.autonomia_suficiente(veiculo, caminho)
+        # O veículo reabastece até à autonomia em cada posto da rota
+        return self.avaliador_rotas.autonomia_suficiente(
+            self.avaliador_rotas.ids_arestas(caminho), veiculo["combustivel"], veiculo["autonomia"])
 
     def calcular_score_emergencia(self, zona_id: str) -> float:
         """Calcula o score de emergência para uma zona."""
@@ -0,0 +1,171 @@
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+import numpy as np
+from grafo_csr import GrafoCSR
+from limitacoes_geograficas import mascara_terrenos
+from fronteira import FronteiraPrioridade
+
+# Número máximo de estados LPA* guardados; acima dele sai o usado há mais tempo
+MAX_ESTADOS = 64
+
+
+class EstadoIncremental:
+    """
+    Estado de uma busca LPA* inversa (heurística nula) para um objetivo fixo.
+
+    Guarda para cada nodo `g` (custo até ao objetivo) e `rhs` (custo previsto
+    a partir dos sucessores). Quando o custo de algumas arestas muda, só são
+    recolocados na fila os nodos de origem dessas arestas, e a reparação
+    propaga-se apenas pelos nodos cujo custo até ao objetivo mudou de facto.
+    Segue a mesma regra das restantes buscas: a aresta u -> v não pode ser
+    usada se estiver bloqueada ou se v tiver um terreno a evitar.
+    """
+
+    def __init__(self, csr: GrafoCSR, origens: List[int], objetivo: int, evitar: Iterable[str]):
+        self.csr = csr
+        self.origens = origens
+        self.objetivo = objetivo
+        # As listas do CSR e a máscara de arestas são alteradas no lugar por `aplicar_alteracoes`
+        self.offsets, self.destinos, self.custo, _ = csr.listas()
+        self.permitida = csr.arestas_permitidas(evitar)
+        self.g = [float('inf')] * len(csr)
+        self.rhs = [float('inf')] * len(csr)
+        self.rhs[objetivo] = 0.0
+        self.fila = FronteiraPrioridade()
+        self.fila.alterar(objetivo, 0.0)
+
+    def _custo(self, e: int) -> float:
+        if not self.permitida[e]:
+            return float('inf')
+        return self.custo[e]
+
+    def _calcular_rhs(self, u: int) -> float:
+        if u == self.objetivo:
+            return 0.0
+        offsets, destinos, g = self.offsets, self.destinos, self.g
+        return min((self._custo(e) + g[destinos[e]] for e in range(offsets[u], offsets[u + 1])),
+                   default=float('inf'))
+
+    def _atualizar_nodo(self, u: int):
+        """Coloca o nodo na fila se estiver inconsistente (g != rhs) e retira-o caso contrário."""
+        if self.g[u] != self.rhs[u]:
+            self.fila.alterar(u, min(self.g[u], self.rhs[u]))
+        else:
+            self.fila.retirar(u)
+
+    def alterar_arestas(self, arestas: Iterable[int]):
+        """Regista arestas cujo custo ou bloqueio mudou; a reparação é feita no próximo acesso."""
+        for e in arestas:
+            u = self.origens[e]
+            self.rhs[u] = self._calcular_rhs(u)
+            self._atualizar_nodo(u)
+
+    def reparar(self):
+        """Processa os nodos inconsistentes até todos os custos até ao objetivo estarem corretos."""
+        offsets_inv, origens_inv, arestas_inv = self.csr.listas_inversas()
+        g, rhs = self.g, self.rhs
+        while self.fila:
+            u, _ = self.fila.remover()
+            predecessores = range(offsets_inv[u], offsets_inv[u + 1])
+            if g[u] > rhs[u]:
+                # Sobreconsistente: o custo baixou e fica fixado
+                g[u] = rhs[u]
+                for k in predecessores:
+                    p = origens_inv[k]
+                    if p != self.objetivo:
+                        rhs[p] = min(rhs[p], self._custo(arestas_inv[k]) + g[u])
+                        self._atualizar_nodo(p)
+            else:
+                # Subconsistente: o custo subiu; o nodo e os predecessores são reavaliados
+                g[u] = float('inf')
+                for p in [u] + [origens_inv[k] for k in predecessores]:
+                    rhs[p] = self._calcular_rhs(p)
+                    self._atualizar_nodo(p)
+
+    def caminho(self, inicio: int) -> Optional[List[int]]:
+        """Caminho de custo mínimo do início ao objetivo, seguindo o melhor sucessor de cada nodo."""
+        self.reparar()
+        if self.g[inicio] == float('inf'):
+            return None
+        offsets, destinos = self.offsets, self.destinos
+        caminho = [inicio]
+        u = inicio
+        while u != self.objetivo:
+            if len(caminho) > len(self.g):
+                return None
+            u = destinos[min(range(offsets[u], offsets[u + 1]),
+                             key=lambda e: self._custo(e) + self.g[destinos[e]])]
+            caminho.append(u)
+        return caminho
+
+
+class MotorIncremental:
+    """
+    Mantém estados LPA* por objetivo e por conjunto de terrenos a evitar entre ciclos.
+
+    Depois de cada `GrafoCSR.aplicar_alteracoes`, as arestas alteradas devem ser
+    passadas a `notificar`; o custo de voltar a planear depende então do número
+    de nodos afetados e não do tamanho do grafo. Se o CSR mudar de versão sem
+    notificação (por exemplo com `atualizar()`), os estados são descartados.
+
+    Cada estado guarda arrays do tamanho do grafo e é reparado a cada
+    notificação, pelo que só são mantidos os `max_estados` usados mais
+    recentemente (LRU); um objetivo descartado volta a ser calculado de raiz.
+    """
+
+    def __init__(self, csr: GrafoCSR, max_estados: int = MAX_ESTADOS):
+        self.csr = csr
+        self.max_estados = max_estados
+        self._versao = csr.versao
+        self._origens = np.repeat(np.arange(len(csr)), np.diff(csr.offsets)).tolist()
+        self._estados: 'OrderedDict[tuple[int, int], EstadoIncremental]' = OrderedDict()
+
+    def _verificar_versao(self):
+        if self.csr.versao != self._versao:
+            self._estados.clear()
+            self._origens = np.repeat(np.arange(len(self.csr)), np.diff(self.csr.offsets)).tolist()
+            self._versao = self.csr.versao
+
+    def notificar(self, arestas: List[int]):
+        """Propaga aos estados guardados as arestas alteradas pela última `aplicar_alteracoes`."""
+        if self.csr.versao != self._versao + 1:
+            self._verificar_versao()
+            return
+        self._versao = self.csr.versao
+        for estado in self._estados.values():
+            estado.alterar_arestas(arestas)
+
+    def _estado(self, objetivo: str, evitar: Iterable[str]) -> EstadoIncremental:
+        self._verificar_versao()
+        evitar = list(evitar)
+        chave = (self.csr.indice[objetivo], mascara_terrenos(evitar))
+        if chave in self._estados:
+            self._estados.move_to_end(chave)
+        else:
+            self._estados[chave] = EstadoIncremental(self.csr, self._origens, chave[0], evitar)
+            while len(self._estados) > self.max_estados:
+                self._estados.popitem(last=False)
+        return self._estados[chave]
+
+    def distancias(self, objetivo: str, evitar: Iterable[str] = ()) -> List[float]:
+        """Custo mínimo de cada nodo até ao objetivo, indexado pelos ids do CSR."""
+        estado = self._estado(objetivo, evitar)
+        estado.reparar()
+        return estado.g
+
+    def busca(self, inicio: str, objetivo: str, evitar: List[str] = []) -> Optional[List[str]]:
+        """
+        Caminho de custo mínimo entre dois nodos, reutilizando o estado do objetivo.
+
+        Returns:
+            list: Nomes dos nodos do caminho, ou None se não existir caminho
+        """
+        if inicio not in self.csr or objetivo not in self.csr:
+            print(f"Nodo inicial {inicio} ou objetivo {objetivo} não encontrado no grafo")
+            return None
+        caminho = self._estado(objetivo, evitar).caminho(self.csr.indice[inicio])
+        if caminho is None:
+            print(f"Não foi encontrado caminho entre {inicio} e {objetivo}")
+            return None
+        return self.csr.caminho_para_nomes(caminho)
@@ -0,0 +1,141 @@
+import json
+import os
+import shutil
+import tempfile
+from enum import Enum
+from typing import Dict, Optional
+
+import numpy as np
+import networkx as nx
+from limitacoes_geograficas import TipoTerreno
+
+DIRETORIO_CACHE = '.cache_grafos'
+
+# Atributos categóricos dos nodos guardados como códigos int8 (-1 = atributo ausente)
+ATRIBUTOS_CATEGORICOS = ('tipo', 'regiao', 'tipo_terreno', 'densidade_populacional')
+
+# Atributos cujos valores são membros de um Enum e devem ser reconstruídos como tal
+ENUMS_ATRIBUTOS = {'tipo_terreno': TipoTerreno}
+
+
+def nome_snapshot(seed: int, num_pontos_entrega: int, versao: int) -> str:
+    """Nome do snapshot para os parâmetros de geração dados."""
+    return f'grafo_s{seed}_n{num_pontos_entrega}_v{versao}'
+
+
+def _valor_categoria(valor):
+    """Converte o valor de um atributo categórico numa string serializável."""
+    return valor.value if isinstance(valor, Enum) else str(valor)
+
+
+def guardar_snapshot(grafo: nx.DiGraph, caminho: str):
+    """
+    Guarda o grafo num snapshot binário composto por arrays NumPy.
+
+    O snapshot é uma diretoria com os ids e coordenadas dos nodos, os atributos
+    categóricos codificados em int8 e as arestas (origem, destino, custo, tempo).
+    A escrita é feita numa diretoria temporária e movida no fim, para que
+    processos concorrentes nunca vejam um snapshot incompleto.
+    """
+    nos = list(grafo.nodes())
+    indice = {node: i for i, node in enumerate(nos)}
+
+    arrays = {
+        'nos': np.array(nos, dtype=str),
+        'coordenadas': np.array([grafo.nodes[n]['coordenadas'] for n in nos], dtype=np.float64).reshape(-1, 2),
+    }
+
+    categorias = {}
+    for atributo in ATRIBUTOS_CATEGORICOS:
+        valores = [grafo.nodes[n].get(atributo) for n in nos]
+        lista = sorted({_valor_categoria(v) for v in valores if v is not None})
+        codigos = {c: i for i, c in enumerate(lista)}
+        arrays[atributo] = np.array(
+            [codigos[_valor_categoria(v)] if v is not None else -1 for v in valores], dtype=np.int8
+        )
+        categorias[atributo] = lista
+
+    arestas = list(grafo.edges(data=True))
+    arrays['origens'] = np.array([indice[u] for u, _, _ in arestas], dtype=np.int32)
+    arrays['destinos'] = np.array([indice[v] for _, v, _ in arestas], dtype=np.int32)
+    arrays['custo'] = np.array([d['custo'] for _, _, d in arestas], dtype=np.float64)
+    arrays['tempo'] = np.array([d['tempo'] for _, _, d in arestas], dtype=np.float64)
+
+    pai = os.path.dirname(os.path.abspath(caminho))
+    os.makedirs(pai, exist_ok=True)
+    temporaria = tempfile.mkdtemp(dir=pai, prefix='.tmp_')
+    try:
+        for nome, array in arrays.items():
+            np.save(os.path.join(temporaria, f'{nome}.npy'), array)
+        with open(os.path.join(temporaria, 'categorias.json'), 'w', encoding='utf-8') as f:
+            json.dump(categorias, f, ensure_ascii=False)
+        try:
+            os.replace(temporaria, caminho)
+        except OSError:
+            # Outro processo já publicou o mesmo snapshot
+            shutil.rmtree(temporaria, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(temporaria, ignore_errors=True)
+        raise
+
+
+def carregar_arrays(caminho: str) -> Dict[str, np.ndarray]:
+    """
+    Abre os arrays de um snapshot em modo memory-mapped.
+
+    Só os arrays lidos diretamente por esta função ficam com as páginas
+    partilhadas pelo sistema operativo entre os processos que abram o mesmo
+    snapshot; o que for construído a partir deles é uma cópia de cada processo.
+    """
+    arrays = {}
+    for ficheiro in os.listdir(caminho):
+        if ficheiro.endswith('.npy'):
+            arrays[ficheiro[:-4]] = np.load(os.path.join(caminho, ficheiro), mmap_mode='r')
+    with open(os.path.join(caminho, 'categorias.json'), encoding='utf-8') as f:
+        arrays['categorias'] = json.load(f)
+    return arrays
+
+
+def carregar_snapshot(caminho: str) -> nx.DiGraph:
+    """
+    Reconstrói o DiGraph a partir de um snapshot guardado com guardar_snapshot.
+
+    O DiGraph é uma cópia privada do processo (os arrays mapeados só servem para
+    o preencher); a vantagem do snapshot é evitar a geração, não a memória.
+    """
+    arrays = carregar_arrays(caminho)
+    categorias = arrays['categorias']
+    nos = arrays['nos'].tolist()
+    coordenadas = arrays['coordenadas'].tolist()
+
+    valores_categorias = {}
+    for atributo in ATRIBUTOS_CATEGORICOS:
+        conversor = ENUMS_ATRIBUTOS.get(atributo)
+        lista = categorias[atributo]
+        valores_categorias[atributo] = [conversor(v) for v in lista] if conversor else lista
+
+    atributos = [{'coordenadas': tuple(c)} for c in coordenadas]
+    for atributo in ATRIBUTOS_CATEGORICOS:
+        lista = valores_categorias[atributo]
+        for dados, codigo in zip(atributos, arrays[atributo].tolist()):
+            if codigo >= 0:
+                dados[atributo] = lista[codigo]
+
+    grafo = nx.DiGraph()
+    grafo.add_nodes_from(zip(nos, atributos))
+    grafo.add_edges_from(
+        (nos[u], nos[v], {'custo': c, 'tempo': t})
+        for u, v, c, t in zip(arrays['origens'].tolist(), arrays['destinos'].tolist(),
+                              arrays['custo'].tolist(), arrays['tempo'].tolist())
+    )
+    grafo.graph['snapshot'] = caminho
+    return grafo
+
+
+def procurar_snapshot(seed: Optional[int], num_pontos_entrega: int, versao: int,
+                      diretorio: str = DIRETORIO_CACHE) -> Optional[str]:
+    """Devolve o caminho do snapshot para os parâmetros dados, ou None se não existir."""
+    if seed is None:
+        return None
+    caminho = os.path.join(diretorio, nome_snapshot(seed, num_pontos_entrega, versao))
+    return caminho if os.path.isfile(os.path.join(caminho, 'categorias.json')) else None
@@ -1,7 +1,9 @@
 import random
 from enum import Enum
+import numpy as np
 import networkx as nx
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Tuple
+from custos_arestas import GestorCustosArestas
 
 class CondicaoMeteorologica(Enum):
     NORMAL = "normal"
@@ -12,7 +14,7 @@ class CondicaoMeteorologica(Enum):
     NEVE = "neve"
 
 class GestorMeteorologico:
-    def __init__(self, grafo: nx.DiGraph):
+    def __init__(self, grafo: nx.DiGraph, seed=None):
         self.grafo = grafo
         self.condicoes_por_regiao = {}
         self.multiplicadores = {
@@ -47,13 +49,20 @@ class GestorMeteorologico:
                 'bloqueio': 0.2
             }
         }
-        self.valores_originais = {
-            (u, v): {
-                'custo': data['custo'],
-                'tempo': data['tempo']
-            }
-            for u, v, data in self.grafo.edges(data=True)
+        # Pesos base e camadas partilhados com os eventos; aqui só se altera a camada meteorológica
+        self.custos = GestorCustosArestas.do_grafo(self.grafo)
+        # Gerador NumPy para o sorteio dos bloqueios, feito em lote por região
+        self.rng = np.random.default_rng(seed)
+
+        # Ids das arestas agrupados pela região do nodo de origem
+        regioes_arestas = np.array([self.grafo.nodes[u]['regiao'] for u, _ in self.custos.arestas])
+        ordem = np.argsort(regioes_arestas, kind='stable')
+        regioes, inicios = np.unique(regioes_arestas[ordem], return_index=True)
+        self.arestas_por_regiao: Dict[str, np.ndarray] = {
+            regiao: ids for regiao, ids in zip(regioes.tolist(), np.split(ordem, inicios[1:]))
         }
+        # Condição de cada região refletida atualmente na camada meteorológica
+        self._condicoes_aplicadas: Dict[str, CondicaoMeteorologica] = {}
         self.inicializar_condicoes()
 
     def inicializar_condicoes(self):
@@ -62,35 +71,64 @@ class GestorMeteorologico:
         self.condicoes_por_regiao = {
             regiao: CondicaoMeteorologica.NORMAL for regiao in regioes
         }
+        self.reamostrar_bloqueios()
         self.atualizar_grafo()
 
-    def atualizar_grafo(self):
-        """Atualiza o grafo com base nas condições meteorológicas"""
-        for (u, v), valores in self.valores_originais.items():
-            self.grafo[u][v]['custo'] = valores['custo']
-            self.grafo[u][v]['tempo'] = valores['tempo']
-            self.grafo[u][v]['bloqueado'] = False
+    def atualizar_grafo(self) -> List[Tuple[str, str, float, float]]:
+        """
+        Atualiza o grafo com base nas condições meteorológicas
+
+        Só as regiões cuja condição mudou desde a última atualização são visitadas:
+        os multiplicadores da nova condição são aplicados de uma vez às arestas que
+        saem da região. Os bloqueios não são sorteados aqui (ver `reamostrar_bloqueios`).
+        Só a camada meteorológica do repositório de custos é alterada, pelo que os
+        efeitos dos eventos se mantêm.
+
+        Returns:
+            list: Alterações (u, v, custo antigo, custo novo) das arestas cujo custo, tempo ou bloqueio mudou
+        """
+        for regiao, ids in self.arestas_por_regiao.items():
+            condicao = self.condicoes_por_regiao.get(regiao, CondicaoMeteorologica.NORMAL)
+            if self._condicoes_aplicadas.get(regiao) == condicao:
+                continue
+            self._condicoes_aplicadas[regiao] = condicao
+            mult = self.multiplicadores[condicao]
+            self.custos.definir_camada('meteorologia', ids, mult['custo'], mult['tempo'])
+        return self.custos.aplicar()
 
-            regiao = self.grafo.nodes[u]['regiao']
-            condicao = self.condicoes_por_regiao[regiao]
-            multiplicadores = self.multiplicadores[condicao]
+    def reamostrar_bloqueios(self, regioes: Iterable[str] = None):
+        """
+        Sorteia de novo os bloqueios das arestas segundo a condição atual de cada região.
 
-            self.grafo[u][v]['custo'] *= multiplicadores['custo']
-            self.grafo[u][v]['tempo'] *= multiplicadores['tempo']
+        Cada aresta fica bloqueada com a probabilidade de bloqueio da condição da
+        região de origem; nas regiões sem risco de bloqueio as arestas são apenas
+        desbloqueadas, sem sorteio. As alterações ficam pendentes até ao próximo
+        `atualizar_grafo`.
 
-            if random.random() < multiplicadores['bloqueio']:
-                self.grafo[u][v]['bloqueado'] = True
-                self.grafo[u][v]['custo'] = float('inf')
-                self.grafo[u][v]['tempo'] = float('inf')
+        Args:
+            regioes: Regiões a sortear; por omissão, todas
+        """
+        for regiao in (self.arestas_por_regiao if regioes is None else regioes):
+            ids = self.arestas_por_regiao.get(regiao)
+            if ids is None:
+                continue
+            condicao = self.condicoes_por_regiao.get(regiao, CondicaoMeteorologica.NORMAL)
+            prob_bloqueio = self.multiplicadores[condicao]['bloqueio']
+            if prob_bloqueio > 0:
+                self.custos.definir_bloqueios(ids, self.rng.random(len(ids)) < prob_bloqueio)
+            else:
+                self.custos.definir_bloqueios(ids, False)
 
-    def atualizar_condicoes(self):
+    def atualizar_condicoes(self) -> List[Tuple[str, str, float, float]]:
         """Atualiza as condições meteorológicas para cada região"""
         for regiao in self.condicoes_por_regiao:
             condicao_atual = self.condicoes_por_regiao[regiao]
             nova_condicao = self.gerar_nova_condicao(condicao_atual)
             self.condicoes_por_regiao[regiao] = nova_condicao
-        
-        self.atualizar_grafo()
+
+        # Os bloqueios são sorteados de novo em todas as regiões a cada mudança de tempo
+        self.reamostrar_bloqueios()
+        return self.atualizar_grafo()
 
     def gerar_nova_condicao(self, condicao_atual: CondicaoMeteorologica) -> CondicaoMeteorologica:
         """Gera uma nova condição meteorológica baseada na atual"""
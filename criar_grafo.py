@@ -1,16 +1,28 @@
+import os
 import random
+import numpy as np
 import networkx as nx
 import matplotlib.pyplot as plt
-import math
 from eventos_dinamicos import TipoObstaculo
 from condicoes_meteorologicas import CondicaoMeteorologica, GestorMeteorologico
 from limitacoes_geograficas import TipoTerreno
 import haversine as hs   
 from haversine import Unit
+from indice_espacial import IndiceEspacial
+from distancias import haversine_vetorizado, gerar_custos_tempos
+from cache_grafo import DIRETORIO_CACHE, guardar_snapshot, carregar_snapshot, procurar_snapshot, nome_snapshot
+
+# Versão do gerador; incrementar sempre que a geração do grafo mudar para invalidar os snapshots
+VERSAO_GERADOR = 1
 
 class PortugalDistributionGraph:
-    def __init__(self):
+    def __init__(self, seed=None):
         self.grafo = nx.DiGraph()
+        self.seed = seed
+        # Geradores próprios para que o grafo dependa apenas da seed
+        self.random = random.Random(seed)
+        # Gerador NumPy para os custos/tempos das arestas, gerados em lote
+        self.rng = np.random.default_rng(seed)
         self.regioes = {
             'Norte': {'min_lat': 41.0, 'max_lat': 42.0, 'min_lon': -8.5, 'max_lon': -6.5},
             'Centro': {'min_lat': 40.0, 'max_lat': 41.0, 'min_lon': -8.5, 'max_lon': -6.5},
@@ -80,31 +92,41 @@ class PortugalDistributionGraph:
 
     def gerar_coordenadas_regiao(self, regiao):
         bounds = self.regioes[regiao]
-        lat = random.uniform(bounds['min_lat'], bounds['max_lat'])
-        lon = random.uniform(bounds['min_lon'], bounds['max_lon'])
+        lat = self.random.uniform(bounds['min_lat'], bounds['max_lat'])
+        lon = self.random.uniform(bounds['min_lon'], bounds['max_lon'])
         return (lat, lon)
 
     def gerar_coordenadas_posto(self, regiao, id):
         bounds = self.regioes[regiao]
-        lat = max(bounds['min_lat'], min((bounds['min_lat'] + bounds['max_lat']) / 2 + random.uniform(-0.5, 0.5), bounds['max_lat']))
+        lat = max(bounds['min_lat'], min((bounds['min_lat'] + bounds['max_lat']) / 2 + self.random.uniform(-0.5, 0.5), bounds['max_lat']))
         
-        lon = bounds['min_lon'] + 0.1 + random.uniform(-0.1, 0.1)
+        lon = bounds['min_lon'] + 0.1 + self.random.uniform(-0.1, 0.1)
         if id == 2:
-            lon = bounds['max_lon'] - 0.1 + random.uniform(-0.1, 0.1)
+            lon = bounds['max_lon'] - 0.1 + self.random.uniform(-0.1, 0.1)
         elif id == 3:
-            lon = (bounds['min_lon'] + bounds['max_lon']) / 2 + random.uniform(-0.1, 0.1)
+            lon = (bounds['min_lon'] + bounds['max_lon']) / 2 + self.random.uniform(-0.1, 0.1)
         return (lat, lon)
 
     def calcula_distancia(self, coord1, coord2):
         return hs.haversine(coord1, coord2, unit=Unit.KILOMETERS)
 
     def calcular_custo_tempo(self, coord1, coord2):
-        dist = self.calcula_distancia(coord1, coord2)
-        custo_base = dist * 0.08
-        tempo_base = dist * 0.01
-        custo = custo_base * random.uniform(0.8, 1.2)
-        tempo = tempo_base * random.uniform(0.9, 1.3)
-        return round(custo, 2), round(tempo, 3)
+        custos, tempos = self.calcular_custos_tempos([coord1], [coord2])
+        return float(custos[0]), float(tempos[0])
+
+    def calcular_custos_tempos(self, coords_origem, coords_destino):
+        """
+        Versão em lote de calcular_custo_tempo.
+
+        Args:
+            coords_origem: Sequência de pares (latitude, longitude)
+            coords_destino: Sequência de pares (latitude, longitude) com o mesmo tamanho
+
+        Returns:
+            tuple: Vetores NumPy (custo, tempo) para cada par origem/destino
+        """
+        distancias = haversine_vetorizado(coords_origem, coords_destino)
+        return gerar_custos_tempos(distancias, self.rng)
 
 
     def criar_grafo_grande(self, num_pontos_entrega=500):
@@ -134,165 +156,161 @@ class PortugalDistributionGraph:
                                   tipo='hub',
                                   coordenadas=coords,
                                   regiao=regiao,
-                                  tipo_terreno=random.choice(list(TipoTerreno)))
+                                  tipo_terreno=self.random.choice(list(TipoTerreno)))
 
         # Adicionar pontos de entrega
         for i in range(num_pontos_entrega):
-            regiao = random.choice(list(self.regioes.keys()))
+            regiao = self.random.choice(list(self.regioes.keys()))
             coords = self.gerar_coordenadas_regiao(regiao)
-            densidade_populacional = random.choices(['alta', 'normal', 'baixa'], weights=[0.4, 0.4, 0.2])[0]
+            densidade_populacional = self.random.choices(['alta', 'normal', 'baixa'], weights=[0.4, 0.4, 0.2])[0]
             node_id = f'PE_{i+1}'
             self.grafo.add_node(node_id,
                               tipo='entrega',
                               coordenadas=coords,
                               regiao=regiao,
                               densidade_populacional=densidade_populacional,
-                              tipo_terreno=random.choice(list(TipoTerreno)))
+                              tipo_terreno=self.random.choice(list(TipoTerreno)))
 
         self._criar_conexoes()
         return self.grafo
 
+    def carregar_ou_criar_grafo(self, num_pontos_entrega=500, diretorio_cache=DIRETORIO_CACHE):
+        """
+        Devolve o grafo a partir do snapshot em cache ou gera-o e guarda o snapshot.
+
+        Os snapshots são identificados por (seed, num_pontos_entrega, VERSAO_GERADOR);
+        sem seed o grafo não é reprodutível e é sempre gerado.
+        """
+        caminho = procurar_snapshot(self.seed, num_pontos_entrega, VERSAO_GERADOR, diretorio_cache)
+        if caminho:
+            self.grafo = carregar_snapshot(caminho)
+            return self.grafo
+
+        self.criar_grafo_grande(num_pontos_entrega)
+        if self.seed is not None:
+            guardar_snapshot(self.grafo, os.path.join(
+                diretorio_cache, nome_snapshot(self.seed, num_pontos_entrega, VERSAO_GERADOR)))
+        return self.grafo
+
     def _criar_conexoes(self):
         nodes = list(self.grafo.nodes(data=True))
+        indice = IndiceEspacial.do_grafo(self.grafo)
+        coordenadas = {n: d['coordenadas'] for n, d in nodes}
+
+        # Agrupar os nodos por tipo uma única vez
+        por_tipo = {'base': [], 'posto': [], 'hub': [], 'entrega': []}
+        for n, d in nodes:
+            por_tipo[d['tipo']].append(n)
+        bases = por_tipo['base']
+        postos = por_tipo['posto']
+
+        # Ligações a criar (origem, destino, bidirecional); os custos são gerados em lote no fim
+        ligacoes = []
         
         # Conectar bases com bases e postos de abastecimento mais próximas
-        bases = [n for n, d in nodes if d['tipo'] == 'base']
-        
         for base1 in bases:
-            coord_base1 = self.grafo.nodes[base1]['coordenadas']
+            coord_base1 = coordenadas[base1]
             # Conectar com a base mais próxima
-            bases_dist = [(b, self.calcula_distancia(coord_base1, self.grafo.nodes[b]['coordenadas']))
-                        for b in bases if b != base1]
-            bases_dist.sort(key=lambda x: x[1])
-            
-            base_mais_proxima, dist_proxima = bases_dist[0]
-            custo, tempo = self.calcular_custo_tempo(coord_base1, self.grafo.nodes[base_mais_proxima]['coordenadas'])
-            self.grafo.add_edge(base1, base_mais_proxima, custo=custo, tempo=tempo)
-            self.grafo.add_edge(base_mais_proxima, base1, custo=custo, tempo=tempo)
+            base_mais_proxima, _ = indice.k_mais_proximos(coord_base1, 'base', k=1, excluir=[base1])[0]
+            ligacoes.append((base1, base_mais_proxima, True))
             
             # Conectar com o posto de abastecimento mais próximo
-            postos = [n for n, d in nodes if d['tipo'] == 'posto']
-            postos_dist = [(p, self.calcula_distancia(coord_base1, self.grafo.nodes[p]['coordenadas']))
-                        for p in postos]
-            postos_dist.sort(key=lambda x: x[1])
-            
-            for posto, dist in postos_dist[:2]:
-                custo, tempo = self.calcular_custo_tempo(coord_base1, self.grafo.nodes[posto]['coordenadas'])
-                self.grafo.add_edge(base1, posto, custo=custo, tempo=tempo)
-                self.grafo.add_edge(posto, base1, custo=custo, tempo=tempo)
+            for posto, _ in indice.k_mais_proximos(coord_base1, 'posto', k=2):
+                ligacoes.append((base1, posto, True))
                 
         # Conectar todas as cidades com as bases mais próximas
-        cidades = [n for n, d in nodes if d['tipo'] == 'hub']
+        cidades = por_tipo['hub']
 
         for cidade in cidades:
-            coord_cidade = self.grafo.nodes[cidade]['coordenadas']
+            coord_cidade = coordenadas[cidade]
             # Conectar com a base mais próxima
-            bases_dist = [(b, self.calcula_distancia(coord_cidade, self.grafo.nodes[b]['coordenadas']))
-                        for b in bases]
-            bases_dist.sort(key=lambda x: x[1])
-            
-            base_mais_proxima, dist_proxima = bases_dist[0]
-            custo, tempo = self.calcular_custo_tempo(coord_cidade, self.grafo.nodes[base_mais_proxima]['coordenadas'])
-            self.grafo.add_edge(cidade, base_mais_proxima, custo=custo, tempo=tempo)
-            self.grafo.add_edge(base_mais_proxima, cidade, custo=custo, tempo=tempo)
+            base_mais_proxima, _ = indice.k_mais_proximos(coord_cidade, 'base', k=1)[0]
+            ligacoes.append((cidade, base_mais_proxima, True))
         
         # Conectar todas as bases com os hubs mais próximos
-        hubs = [n for n, d in nodes if d['tipo'] == 'hub']
-        
         for base in bases:
-            coord_base = self.grafo.nodes[base]['coordenadas']
+            coord_base = coordenadas[base]
             # Conectar com os 3 hubs mais próximos
-            hubs_dist = [(h, self.calcula_distancia(coord_base, self.grafo.nodes[h]['coordenadas']))
-                        for h in hubs]
-            hubs_dist.sort(key=lambda x: x[1])
-            
-            for hub, _ in hubs_dist[:3]:
-                coord_hub = self.grafo.nodes[hub]['coordenadas']
-                custo, tempo = self.calcular_custo_tempo(coord_base, coord_hub)
-                self.grafo.add_edge(base, hub, custo=custo, tempo=tempo)
-                self.grafo.add_edge(hub, base, custo=custo, tempo=tempo)
+            for hub, _ in indice.k_mais_proximos(coord_base, 'hub', k=3):
+                ligacoes.append((base, hub, True))
 
         # conectar postos da mesma regiao entre si
+        postos_por_regiao = {regiao: [] for regiao in self.regioes}
+        for posto in postos:
+            postos_por_regiao[self.grafo.nodes[posto]['regiao']].append(posto)
         
         for regiao in self.regioes:
-            postos_regiao = [n for n, d in nodes if d['tipo'] == 'posto' and d['regiao'] == regiao]
+            postos_regiao = postos_por_regiao[regiao]
             for posto1 in postos_regiao:
                 for posto2 in postos_regiao:
                     if posto1 != posto2:
-                        coord1 = self.grafo.nodes[posto1]['coordenadas']
-                        coord2 = self.grafo.nodes[posto2]['coordenadas']
-                        custo, tempo = self.calcular_custo_tempo(coord1, coord2)
-                        self.grafo.add_edge(posto1, posto2, custo=custo, tempo=tempo)
+                        ligacoes.append((posto1, posto2, False))
                                             
         # Conectar postos ao posto de outra regiao mais proximo
-        postos = [n for n, d in nodes if d['tipo'] == 'posto']
         for posto in postos:
             regiao_posto = self.grafo.nodes[posto]['regiao']
-            postos_regiao = [n for n, d in nodes if d['tipo'] == 'posto' and d['regiao'] == regiao_posto]
-            postos_dist = [(p, self.calcula_distancia(self.grafo.nodes[posto]['coordenadas'], self.grafo.nodes[p]['coordenadas']))
-                        for p in postos if p not in postos_regiao]
-            postos_dist.sort(key=lambda x: x[1])
-            
-            posto_proximo, dist_proxima = postos_dist[0]
-            custo, tempo = self.calcular_custo_tempo(self.grafo.nodes[posto]['coordenadas'], self.grafo.nodes[posto_proximo]['coordenadas'])
-            self.grafo.add_edge(posto, posto_proximo, custo=custo, tempo=tempo)
-            self.grafo.add_edge(posto_proximo, posto, custo=custo, tempo=tempo)
+            outras_regioes = [r for r in self.regioes if r != regiao_posto]
+            posto_proximo, _ = indice.k_mais_proximos(coordenadas[posto], 'posto', k=1, regioes=outras_regioes)[0]
+            ligacoes.append((posto, posto_proximo, True))
         
         # Conectar hubs da mesma região
+        hubs_por_regiao = {regiao: [] for regiao in self.regioes}
+        for hub in cidades:
+            hubs_por_regiao[self.grafo.nodes[hub]['regiao']].append(hub)
+
         for regiao in self.regioes:
-            hubs_regiao = [n for n, d in nodes if d['tipo'] == 'hub' and d['regiao'] == regiao]
-            postos_regiao = [n for n, d in nodes if d['tipo'] == 'posto' and d['regiao'] == regiao]
+            hubs_regiao = hubs_por_regiao[regiao]
             
             for hub in hubs_regiao:
                     
                 # Conectar cada hub ao posto de reabastecimento mais proximo na sua região
-                coord_hub = self.grafo.nodes[hub]['coordenadas']
-                postos_dist = [(p, self.calcula_distancia(coord_hub, self.grafo.nodes[p]['coordenadas']))
-                            for p in postos_regiao]
-                postos_dist.sort(key=lambda x: x[1])
-                
-                posto_proximo1, dist_proxima1 = postos_dist[0]
-                custo1, tempo1 = self.calcular_custo_tempo(coord_hub, self.grafo.nodes[posto_proximo1]['coordenadas'])
-                self.grafo.add_edge(hub, posto_proximo1, custo=custo1, tempo=tempo1)
-                self.grafo.add_edge(posto_proximo1, hub, custo=custo1, tempo=tempo1)
+                coord_hub = coordenadas[hub]
+                posto_proximo1, _ = indice.k_mais_proximos(coord_hub, 'posto', k=1, regioes=[regiao])[0]
+                ligacoes.append((hub, posto_proximo1, True))
             
                 # Conectar cada hub ao posto de reabastecimento mais proximo
-                coord_hub = self.grafo.nodes[hub]['coordenadas']
-                postos_dist = [(p, self.calcula_distancia(coord_hub, self.grafo.nodes[p]['coordenadas']))
-                            for p in postos if p != posto_proximo1]
-                postos_dist.sort(key=lambda x: x[1])
-                
-                posto_proximo2, dist_proxima2 = postos_dist[0]
-                custo2, tempo2 = self.calcular_custo_tempo(coord_hub, self.grafo.nodes[posto_proximo2]['coordenadas'])
-                self.grafo.add_edge(hub, posto_proximo2, custo=custo2, tempo=tempo2)
-                self.grafo.add_edge(posto_proximo2, hub, custo=custo2, tempo=tempo2)
+                posto_proximo2, _ = indice.k_mais_proximos(coord_hub, 'posto', k=1, excluir=[posto_proximo1])[0]
+                ligacoes.append((hub, posto_proximo2, True))
 
             # Conectar hubs entre si
             for hub1 in hubs_regiao:
                 for hub2 in hubs_regiao:
                     if hub1 != hub2:
-                        coord1 = self.grafo.nodes[hub1]['coordenadas']
-                        coord2 = self.grafo.nodes[hub2]['coordenadas']
-                        custo, tempo = self.calcular_custo_tempo(coord1, coord2)
-                        self.grafo.add_edge(hub1, hub2, custo=custo, tempo=tempo)
+                        ligacoes.append((hub1, hub2, False))
+
+        # Conectar pontos de entrega aos hubs mais próximos (consulta em lote por região)
+        pontos_entrega = por_tipo['entrega']
+        hubs_proximos = {}
+        for regiao in self.regioes:
+            pes_regiao = [pe for pe in pontos_entrega if self.grafo.nodes[pe]['regiao'] == regiao]
+            vizinhos = indice.k_mais_proximos_lote([coordenadas[pe] for pe in pes_regiao], 'hub',
+                                                   k=2, regioes=[regiao])
+            hubs_proximos.update(zip(pes_regiao, vizinhos))
 
-        # Conectar pontos de entrega aos hubs mais próximos
-        pontos_entrega = [n for n, d in nodes if d['tipo'] == 'entrega']
         for pe in pontos_entrega:
-            regiao_pe = self.grafo.nodes[pe]['regiao']
-            hubs_regiao = [n for n, d in nodes if d['tipo'] == 'hub' and d['regiao'] == regiao_pe]
-            
-            coord_pe = self.grafo.nodes[pe]['coordenadas']
-            hubs_dist = [(h, math.sqrt((coord_pe[0] - self.grafo.nodes[h]['coordenadas'][0])**2 + 
-                                     (coord_pe[1] - self.grafo.nodes[h]['coordenadas'][1])**2))
-                        for h in hubs_regiao]
-            hubs_dist.sort(key=lambda x: x[1])
-            
-            for hub, _ in hubs_dist[:2]:
-                coord_hub = self.grafo.nodes[hub]['coordenadas']
-                custo, tempo = self.calcular_custo_tempo(coord_pe, coord_hub)
-                self.grafo.add_edge(hub, pe, custo=custo, tempo=tempo)
-                self.grafo.add_edge(pe, hub, custo=custo, tempo=tempo)
+            for hub in hubs_proximos[pe]:
+                ligacoes.append((hub, pe, True))
+
+        self._adicionar_ligacoes(ligacoes, coordenadas)
+
+    def _adicionar_ligacoes(self, ligacoes, coordenadas):
+        """
+        Calcula em lote o custo e o tempo das ligações e adiciona as arestas ao grafo.
+
+        As ligações bidirecionais partilham o mesmo custo e tempo nos dois sentidos.
+        """
+        if not ligacoes:
+            return
+        origens = [coordenadas[u] for u, _, _ in ligacoes]
+        destinos = [coordenadas[v] for _, v, _ in ligacoes]
+        custos, tempos = self.calcular_custos_tempos(origens, destinos)
+
+        arestas = []
+        for (u, v, bidirecional), custo, tempo in zip(ligacoes, custos.tolist(), tempos.tolist()):
+            arestas.append((u, v, {'custo': custo, 'tempo': tempo}))
+            if bidirecional:
+                arestas.append((v, u, {'custo': custo, 'tempo': tempo}))
+        self.grafo.add_edges_from(arestas)
 
     def visualizar_grafo(self, mostrar_labels=False):
         plt.figure(figsize=(15, 10))
@@ -332,9 +350,9 @@ class PortugalDistributionGraph:
         return plt
 
 def main():
-    # Criar e configurar o grafo
-    pdg = PortugalDistributionGraph()
-    grafo = pdg.criar_grafo_grande()
+    # Criar e configurar o grafo (reutilizando o snapshot em cache, se existir)
+    pdg = PortugalDistributionGraph(seed=42)
+    grafo = pdg.carregar_ou_criar_grafo()
     
     # Imprimir estatísticas
     print(f"Estatísticas do Grafo:")
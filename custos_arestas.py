@@ -0,0 +1,153 @@
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+import networkx as nx
+
+# Camadas de multiplicadores, compostas por produto sobre os pesos base das arestas
+CAMADAS = ('densidade', 'meteorologia', 'obstaculo', 'evento')
+
+# Multiplicadores da densidade populacional nas arestas que saem de um nodo com obstáculo
+MULTIPLICADORES_DENSIDADE = {
+    'alta': {'custo': 1.15, 'tempo': 1.3},
+    'normal': {'custo': 1.0, 'tempo': 1.0},
+    'baixa': {'custo': 0.9, 'tempo': 0.8}
+}
+
+# Menor fator de custo que a composição das camadas pode aplicar: só a densidade baixa
+# reduz o custo, os multiplicadores meteorológicos, de obstáculos e de eventos são >= 1
+MULTIPLICADOR_MINIMO_CUSTO = min(m['custo'] for m in MULTIPLICADORES_DENSIDADE.values())
+
+
+class GestorCustosArestas:
+    """
+    Repositório único dos pesos das arestas, partilhado pela meteorologia e pelos eventos.
+
+    Guarda o custo e o tempo base de cada aresta e, por camada (densidade,
+    meteorologia, obstáculo, evento), um multiplicador de custo e outro de
+    tempo, em arrays NumPy indexados pelo id da aresta. O peso efetivo é o
+    produto do valor base por todas as camadas, ou infinito se a aresta estiver
+    bloqueada. Cada gestor altera apenas a sua camada; as arestas alteradas
+    ficam marcadas como sujas e `aplicar` recalcula e escreve no DiGraph só
+    essas, devolvendo o conjunto de alterações e incrementando `versao`.
+
+    Deve existir um único repositório por grafo: usar `do_grafo`, que o guarda
+    em `grafo.graph['custos_arestas']`.
+    """
+
+    def __init__(self, grafo: nx.DiGraph):
+        self.grafo = grafo
+        self.arestas: List[Tuple[str, str]] = list(grafo.edges())
+        self.indice: Dict[Tuple[str, str], int] = {aresta: e for e, aresta in enumerate(self.arestas)}
+        self.saidas: Dict[str, List[int]] = {}
+        for e, (u, _) in enumerate(self.arestas):
+            self.saidas.setdefault(u, []).append(e)
+
+        dados = [grafo[u][v] for u, v in self.arestas]
+        self.custo_base = np.array([d['custo'] for d in dados], dtype=np.float64)
+        self.tempo_base = np.array([d['tempo'] for d in dados], dtype=np.float64)
+        self.camadas = {
+            camada: (np.ones(len(self.arestas)), np.ones(len(self.arestas))) for camada in CAMADAS
+        }
+        self.bloqueado = np.zeros(len(self.arestas), dtype=bool)
+
+        # Valores efetivos atualmente escritos no grafo
+        self.custo = np.array([d['custo'] for d in dados], dtype=np.float64)
+        self.tempo = np.array([d['tempo'] for d in dados], dtype=np.float64)
+        self.bloqueado_efetivo = np.array([d.get('bloqueado', False) for d in dados], dtype=bool)
+
+        self._sujas: List[np.ndarray] = []
+        self.versao = 0
+
+    @classmethod
+    def do_grafo(cls, grafo: nx.DiGraph) -> 'GestorCustosArestas':
+        """Devolve o repositório do grafo, criando-o a partir dos pesos atuais se ainda não existir."""
+        if 'custos_arestas' not in grafo.graph:
+            grafo.graph['custos_arestas'] = cls(grafo)
+        return grafo.graph['custos_arestas']
+
+    def ids(self, arestas: Iterable[Tuple[str, str]]) -> np.ndarray:
+        """Ids das arestas (u, v) dadas."""
+        return np.array([self.indice[aresta] for aresta in arestas], dtype=np.int64)
+
+    def _marcar(self, ids: np.ndarray):
+        if len(ids):
+            self._sujas.append(ids)
+
+    def definir_camada(self, camada: str, ids, custo, tempo):
+        """
+        Define os multiplicadores de custo e tempo de uma camada para as arestas dadas.
+
+        Args:
+            custo, tempo: Escalares ou arrays com um valor por aresta
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(ids) == 0:
+            return
+        custo = np.broadcast_to(np.asarray(custo, dtype=np.float64), ids.shape)
+        tempo = np.broadcast_to(np.asarray(tempo, dtype=np.float64), ids.shape)
+        mult_custo, mult_tempo = self.camadas[camada]
+        mudou = (mult_custo[ids] != custo) | (mult_tempo[ids] != tempo)
+        if mudou.any():
+            alteradas = ids[mudou]
+            mult_custo[alteradas] = custo[mudou]
+            mult_tempo[alteradas] = tempo[mudou]
+            self._marcar(alteradas)
+
+    def repor_camada(self, camada: str, ids):
+        """Retira o efeito de uma camada das arestas dadas (multiplicadores a 1)."""
+        self.definir_camada(camada, ids, 1.0, 1.0)
+
+    def definir_bloqueios(self, ids, bloqueado):
+        """Define o estado de bloqueio das arestas dadas."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(ids) == 0:
+            return
+        bloqueado = np.broadcast_to(np.asarray(bloqueado, dtype=bool), ids.shape)
+        mudou = self.bloqueado[ids] != bloqueado
+        if mudou.any():
+            alteradas = ids[mudou]
+            self.bloqueado[alteradas] = bloqueado[mudou]
+            self._marcar(alteradas)
+
+    def aplicar(self) -> List[Tuple[str, str, float, float]]:
+        """
+        Recalcula os pesos efetivos das arestas sujas e escreve no grafo os que mudaram.
+
+        Returns:
+            list: Alterações (u, v, custo antigo, custo novo) das arestas cujo custo, tempo ou bloqueio mudou
+        """
+        if not self._sujas:
+            return []
+        ids = np.unique(np.concatenate(self._sujas))
+        self._sujas = []
+
+        custo = self.custo_base[ids].copy()
+        tempo = self.tempo_base[ids].copy()
+        for mult_custo, mult_tempo in self.camadas.values():
+            custo *= mult_custo[ids]
+            tempo *= mult_tempo[ids]
+        bloqueado = self.bloqueado[ids]
+        custo[bloqueado] = np.inf
+        tempo[bloqueado] = np.inf
+
+        mudou = ((custo != self.custo[ids]) | (tempo != self.tempo[ids])
+                 | (bloqueado != self.bloqueado_efetivo[ids]))
+        if not mudou.any():
+            return []
+        ids, custo, tempo, bloqueado = ids[mudou], custo[mudou], tempo[mudou], bloqueado[mudou]
+
+        alteracoes = []
+        for e, antigo, novo_custo, novo_tempo, bloq in zip(
+                ids.tolist(), self.custo[ids].tolist(), custo.tolist(), tempo.tolist(), bloqueado.tolist()):
+            u, v = self.arestas[e]
+            dados = self.grafo[u][v]
+            dados['custo'] = novo_custo
+            dados['tempo'] = novo_tempo
+            dados['bloqueado'] = bloq
+            alteracoes.append((u, v, antigo, novo_custo))
+
+        self.custo[ids] = custo
+        self.tempo[ids] = tempo
+        self.bloqueado_efetivo[ids] = bloqueado
+        self.versao += 1
+        return alteracoes
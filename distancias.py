@@ -0,0 +1,67 @@
+import numpy as np
+from typing import Tuple
+
+# Raio médio da Terra usado pelo pacote haversine
+RAIO_TERRA_KM = 6371.0088
+
+# Parâmetros do modelo de custo/tempo das arestas (por km)
+CUSTO_POR_KM = 0.08
+TEMPO_POR_KM = 0.01
+VARIACAO_CUSTO = (0.8, 1.2)
+VARIACAO_TEMPO = (0.9, 1.3)
+
+
+def _radianos(coordenadas) -> Tuple[np.ndarray, np.ndarray]:
+    """Converte um array de pares (latitude, longitude) em radianos."""
+    coords = np.radians(np.asarray(coordenadas, dtype=float).reshape(-1, 2))
+    return coords[:, 0], coords[:, 1]
+
+
+def haversine_vetorizado(coords1, coords2) -> np.ndarray:
+    """
+    Calcula a distância de haversine entre pares de coordenadas.
+
+    Args:
+        coords1: Array (n, 2) de pares (latitude, longitude)
+        coords2: Array (n, 2) de pares (latitude, longitude)
+
+    Returns:
+        np.ndarray: Vetor (n,) com as distâncias em km entre coords1[i] e coords2[i]
+    """
+    lat1, lon1 = _radianos(coords1)
+    lat2, lon2 = _radianos(coords2)
+    d = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(np.minimum(d, 1.0)))
+
+
+def matriz_distancias(coords_a, coords_b) -> np.ndarray:
+    """
+    Calcula a matriz de distâncias de haversine entre dois conjuntos de coordenadas.
+
+    Returns:
+        np.ndarray: Matriz (n, m) com a distância em km entre coords_a[i] e coords_b[j]
+    """
+    lat1, lon1 = _radianos(coords_a)
+    lat2, lon2 = _radianos(coords_b)
+    d = (np.sin((lat2[None, :] - lat1[:, None]) / 2) ** 2
+         + np.cos(lat1)[:, None] * np.cos(lat2)[None, :]
+         * np.sin((lon2[None, :] - lon1[:, None]) / 2) ** 2)
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(np.minimum(d, 1.0)))
+
+
+def gerar_custos_tempos(distancias, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Gera em lote o custo e o tempo das arestas a partir das distâncias.
+
+    Args:
+        distancias: Vetor de distâncias em km
+        rng: Gerador NumPy usado para a variação aleatória
+
+    Returns:
+        tuple: Vetores (custo, tempo) arredondados a 2 e 3 casas decimais
+    """
+    distancias = np.asarray(distancias, dtype=float)
+    custo = distancias * CUSTO_POR_KM * rng.uniform(*VARIACAO_CUSTO, size=distancias.shape)
+    tempo = distancias * TEMPO_POR_KM * rng.uniform(*VARIACAO_TEMPO, size=distancias.shape)
+    return np.round(custo, 2), np.round(tempo, 3)
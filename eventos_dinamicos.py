@@ -1,7 +1,12 @@
 from enum import Enum
-import random
 from typing import Dict, List, Set, Tuple
+import numpy as np
 import networkx as nx
+from custos_arestas import GestorCustosArestas, MULTIPLICADORES_DENSIDADE
+
+# Limites do fator de impacto acumulado ao longo de uma rota
+IMPACTO_MAXIMO_CUSTO = 1.5
+IMPACTO_MAXIMO_TEMPO = 2.0
 
 class TipoObstaculo(Enum):
     INUNDACAO = "inundacao"
@@ -18,15 +23,11 @@ class TipoEvento(Enum):
     FALHA_ESTRUTURAL = "falha_estrutural"
 
 class GestorEventos:
-    def __init__(self, grafo: nx.DiGraph):
+    def __init__(self, grafo: nx.DiGraph, seed=None):
         self.grafo = grafo
         self.obstaculos = {}
         self.eventos = {}
-        self.multiplicadores_densidade = {
-            'alta': {'custo': 1.15, 'tempo': 1.3}, 
-            'normal': {'custo': 1.0, 'tempo': 1.0},
-            'baixa': {'custo': 0.9, 'tempo': 0.8}  
-        }
+        self.multiplicadores_densidade = MULTIPLICADORES_DENSIDADE
         self.multiplicadores_obstaculos = {
             TipoObstaculo.INUNDACAO: {
                 'custo': 1.2,    
@@ -92,114 +93,264 @@ class GestorEventos:
             }
         }
         
-        self.valores_originais = {
-            (u, v): {
-                'custo': data['custo'],
-                'tempo': data['tempo']
-            }
-            for u, v, data in self.grafo.edges(data=True)
+        # Pesos base e camadas partilhados com a meteorologia; aqui só se alteram as
+        # camadas de densidade, obstáculo e evento, e apenas quando um efeito começa ou termina
+        self.custos = GestorCustosArestas.do_grafo(self.grafo)
+
+        # Gerador NumPy para a geração de eventos em lote
+        self.rng = np.random.default_rng(seed)
+        self._tipos_obstaculo = list(TipoObstaculo)
+        self._tipos_evento = list(TipoEvento)
+        self._param_obstaculos = self._parametros(self._tipos_obstaculo, self.multiplicadores_obstaculos)
+        self._param_eventos = self._parametros(self._tipos_evento, self.multiplicadores_eventos)
+
+        # Nodos indexados pela ordem do grafo; arestas pelos ids do repositório de custos
+        self._nodos: List[str] = list(self.grafo.nodes())
+        self.indice_nodo: Dict[str, int] = {n: i for i, n in enumerate(self._nodos)}
+        self._elegivel = np.array([self.grafo.nodes[n].get('tipo') != 'base' for n in self._nodos], dtype=bool)
+        # Multiplicadores da densidade de cada nodo, lidos do grafo quando um obstáculo começa
+        self._densidade_custo = np.ones(len(self._nodos))
+        self._densidade_tempo = np.ones(len(self._nodos))
+
+        # Arestas de saída de cada nodo, em formato CSR
+        origem = np.array([self.indice_nodo[u] for u, _ in self.custos.arestas], dtype=np.int64)
+        self._saidas = np.argsort(origem, kind='stable')
+        self._offsets_saidas = np.searchsorted(origem[self._saidas], np.arange(len(self._nodos) + 1))
+
+        # Efeitos ativos em forma de array: tipo (-1 se inativo) e ciclo em que vencem
+        self._tipo_obstaculo = np.full(len(self._nodos), -1, dtype=np.int64)
+        self._vencimento_obstaculo = np.zeros(len(self._nodos), dtype=np.int64)
+        self._tipo_evento = np.full(len(self.custos.arestas), -1, dtype=np.int64)
+        self._vencimento_evento = np.zeros(len(self.custos.arestas), dtype=np.int64)
+
+        # Fatores de impacto (custo, tempo) do obstáculo de cada nodo e do evento de cada aresta (1 se inativo)
+        self.impacto_obstaculo = np.ones((len(self._nodos), 2))
+        self.impacto_evento = np.ones((len(self.custos.arestas), 2))
+
+        # Calendário de vencimentos: ciclo -> lotes de índices que vencem nesse ciclo
+        self.ciclo = 0
+        self._agenda_obstaculos: Dict[int, List[np.ndarray]] = {}
+        self._agenda_eventos: Dict[int, List[np.ndarray]] = {}
+
+    @staticmethod
+    def _parametros(tipos: List[Enum], multiplicadores: Dict) -> Dict[str, np.ndarray]:
+        """Multiplicadores, durações e probabilidades de remoção indexados pela posição do tipo."""
+        return {
+            'custo': np.array([multiplicadores[t]['custo'] for t in tipos], dtype=np.float64),
+            'tempo': np.array([multiplicadores[t]['tempo'] for t in tipos], dtype=np.float64),
+            'prob_remocao': np.array([multiplicadores[t]['prob_remocao'] for t in tipos], dtype=np.float64),
+            'duracao_min': np.array([multiplicadores[t]['duracao'][0] for t in tipos], dtype=np.int64),
+            'duracao_max': np.array([multiplicadores[t]['duracao'][1] for t in tipos], dtype=np.int64),
         }
 
-        self.contadores_tempo = {}
+    def _amostrar(self, n: int, prob: float) -> np.ndarray:
+        """
+        Índices em [0, n) escolhidos com probabilidade independente prob cada.
+
+        Usa amostragem por saltos geométricos: o trabalho é proporcional ao número
+        de índices escolhidos e não a n.
+        """
+        if n == 0 or prob <= 0:
+            return np.empty(0, dtype=np.int64)
+        if prob >= 1:
+            return np.arange(n, dtype=np.int64)
+        esperado = n * prob
+        lote = int(esperado + 4 * np.sqrt(esperado)) + 16
+        posicoes = np.cumsum(self.rng.geometric(prob, size=lote)) - 1
+        while posicoes[-1] < n:
+            mais = posicoes[-1] + np.cumsum(self.rng.geometric(prob, size=lote))
+            posicoes = np.concatenate((posicoes, mais))
+        return posicoes[posicoes < n]
+
+    def _sortear(self, quantidade: int, parametros: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Tipos (uniformes) e durações (uniformes no intervalo do tipo) de novos efeitos."""
+        tipos = self.rng.integers(len(parametros['custo']), size=quantidade)
+        duracoes = self.rng.integers(parametros['duracao_min'][tipos], parametros['duracao_max'][tipos] + 1)
+        return tipos, duracoes
+
+    def _arestas_saida(self, nodos: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Ids das arestas que saem dos nodos dados e, para cada uma, o índice do nodo de origem."""
+        inicio = self._offsets_saidas[nodos]
+        graus = self._offsets_saidas[nodos + 1] - inicio
+        total = int(graus.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        origem = np.repeat(nodos, graus)
+        deslocamento = np.arange(total) - np.repeat(np.cumsum(graus) - graus, graus)
+        return self._saidas[np.repeat(inicio, graus) + deslocamento], origem
+
+    def _ativar_obstaculos(self, nodos: np.ndarray, tipos: np.ndarray, duracoes: np.ndarray):
+        self._tipo_obstaculo[nodos] = tipos
+        self.impacto_obstaculo[nodos, 0] = self._param_obstaculos['custo'][tipos]
+        self.impacto_obstaculo[nodos, 1] = self._param_obstaculos['tempo'][tipos]
+        self._agendar(self._agenda_obstaculos, self._vencimento_obstaculo, nodos, self.ciclo + duracoes)
+        for i, t in zip(nodos.tolist(), tipos.tolist()):
+            nodo = self._nodos[i]
+            self.obstaculos[nodo] = self._tipos_obstaculo[t]
+            # A densidade pode ter sido atribuída depois da criação do gestor
+            densidade = self.multiplicadores_densidade[self.grafo.nodes[nodo].get('densidade_populacional', 'normal')]
+            self._densidade_custo[i] = densidade['custo']
+            self._densidade_tempo[i] = densidade['tempo']
+        ids, origem = self._arestas_saida(nodos)
+        tipo_aresta = self._tipo_obstaculo[origem]
+        self.custos.definir_camada('densidade', ids, self._densidade_custo[origem], self._densidade_tempo[origem])
+        self.custos.definir_camada('obstaculo', ids, self._param_obstaculos['custo'][tipo_aresta],
+                                   self._param_obstaculos['tempo'][tipo_aresta])
+
+    def _ativar_eventos(self, ids: np.ndarray, tipos: np.ndarray, duracoes: np.ndarray):
+        self._tipo_evento[ids] = tipos
+        self.impacto_evento[ids, 0] = self._param_eventos['custo'][tipos]
+        self.impacto_evento[ids, 1] = self._param_eventos['tempo'][tipos]
+        self._agendar(self._agenda_eventos, self._vencimento_evento, ids, self.ciclo + duracoes)
+        for e, t in zip(ids.tolist(), tipos.tolist()):
+            self.eventos[self.custos.arestas[e]] = self._tipos_evento[t]
+        self.custos.definir_camada('evento', ids, self._param_eventos['custo'][tipos],
+                                   self._param_eventos['tempo'][tipos])
+
+    def _remover_obstaculos(self, nodos: np.ndarray):
+        self._tipo_obstaculo[nodos] = -1
+        self.impacto_obstaculo[nodos] = 1.0
+        for i in nodos.tolist():
+            del self.obstaculos[self._nodos[i]]
+        ids, _ = self._arestas_saida(nodos)
+        self.custos.repor_camada('densidade', ids)
+        self.custos.repor_camada('obstaculo', ids)
+
+    def _remover_eventos(self, ids: np.ndarray):
+        self._tipo_evento[ids] = -1
+        self.impacto_evento[ids] = 1.0
+        for e in ids.tolist():
+            del self.eventos[self.custos.arestas[e]]
+        self.custos.repor_camada('evento', ids)
 
     def adicionar_obstaculo_fixo(self, node_id: str):
         if node_id in self.grafo and self.grafo.nodes[node_id]['tipo'] != 'base':
-            tipo = random.choice(list(TipoObstaculo))
-            self.obstaculos[node_id] = tipo
-            duracao_min, duracao_max = self.multiplicadores_obstaculos[tipo]['duracao']
-            self.contadores_tempo[node_id] = random.randint(duracao_min, duracao_max)
+            nodos = np.array([self.indice_nodo[node_id]], dtype=np.int64)
+            self._ativar_obstaculos(nodos, *self._sortear(1, self._param_obstaculos))
             return True
         return False
 
     def adicionar_evento_dinamico(self, node1: str, node2: str):
         if (node1, node2) in self.grafo.edges:
-            tipo = random.choice(list(TipoEvento))
-            self.eventos[(node1, node2)] = tipo
-            duracao_min, duracao_max = self.multiplicadores_eventos[tipo]['duracao']
-            self.contadores_tempo[(node1, node2)] = random.randint(duracao_min, duracao_max)
+            ids = self.custos.ids([(node1, node2)])
+            self._ativar_eventos(ids, *self._sortear(1, self._param_eventos))
             return True
         return False
 
     def gerar_eventos_aleatorios(self, prob_novo_evento: float = 0.3):
-        for node in self.grafo.nodes():
-            if (node not in self.obstaculos and 
-                random.random() < prob_novo_evento and 
-                self.grafo.nodes[node]['tipo'] != 'base'):
-                self.adicionar_obstaculo_fixo(node)
+        """
+        Gera novos obstáculos (por nodo) e eventos (por aresta), cada um com probabilidade prob_novo_evento.
+
+        As posições são amostradas por saltos geométricos e os tipos e durações
+        sorteados em lote; as posições já com um efeito ativo são descartadas.
+        """
+        nodos = self._amostrar(len(self._nodos), prob_novo_evento)
+        nodos = nodos[self._elegivel[nodos] & (self._tipo_obstaculo[nodos] < 0)]
+        if len(nodos):
+            self._ativar_obstaculos(nodos, *self._sortear(len(nodos), self._param_obstaculos))
+
+        ids = self._amostrar(len(self._tipo_evento), prob_novo_evento)
+        ids = ids[self._tipo_evento[ids] < 0]
+        if len(ids):
+            self._ativar_eventos(ids, *self._sortear(len(ids), self._param_eventos))
+
+    @staticmethod
+    def _agendar(agenda: Dict[int, List[np.ndarray]], vencimento: np.ndarray, indices: np.ndarray,
+                 ciclos: np.ndarray):
+        """Regista o ciclo de vencimento de cada índice e coloca-o no lote desse ciclo."""
+        vencimento[indices] = ciclos
+        if len(indices) == 0:
+            return
+        ordem = np.argsort(ciclos, kind='stable')
+        ciclos, indices = ciclos[ordem], indices[ordem]
+        cortes = np.flatnonzero(np.diff(ciclos)) + 1
+        for lote, ciclo in zip(np.split(indices, cortes), ciclos[np.r_[0, cortes]].tolist()):
+            agenda.setdefault(ciclo, []).append(lote)
 
-        for edge in self.grafo.edges():
-            if (edge not in self.eventos and 
-                random.random() < prob_novo_evento):
-                self.adicionar_evento_dinamico(edge[0], edge[1])
+    def _vencidos(self, agenda: Dict[int, List[np.ndarray]], vencimento: np.ndarray,
+                  tipo: np.ndarray, prob_remocao: np.ndarray) -> np.ndarray:
+        """
+        Índices que vencem no ciclo atual e são removidos pelo sorteio de prob_remocao.
+
+        Os que não saem do sorteio voltam a ser agendados para o ciclo seguinte.
+        As entradas obsoletas (efeito já removido ou reagendado) são ignoradas, e um
+        índice reativado com o mesmo vencimento tem duas entradas mas só conta uma vez.
+        """
+        lotes = agenda.pop(self.ciclo, None)
+        if not lotes:
+            return np.empty(0, dtype=np.int64)
+        indices = np.unique(np.concatenate(lotes))
+        indices = indices[(tipo[indices] >= 0) & (vencimento[indices] == self.ciclo)]
+        sorteio = self.rng.random(len(indices))
+        sai = sorteio < prob_remocao[tipo[indices]]
+        retidos = indices[~sai]
+        self._agendar(agenda, vencimento, retidos, np.full(len(retidos), self.ciclo + 1, dtype=np.int64))
+        return indices[sai]
 
     def atualizar_eventos(self):
-        items_to_remove = []
-        for node, tipo in self.obstaculos.items():
-            self.contadores_tempo[node] -= 1
-            if self.contadores_tempo[node] <= 0:
-                prob_remocao = self.multiplicadores_obstaculos[tipo]['prob_remocao']
-                if random.random() < prob_remocao:
-                    items_to_remove.append(('obstaculo', node))
-
-        for edge, tipo in self.eventos.items():
-            self.contadores_tempo[edge] -= 1
-            if self.contadores_tempo[edge] <= 0:
-                prob_remocao = self.multiplicadores_eventos[tipo]['prob_remocao']
-                if random.random() < prob_remocao:
-                    items_to_remove.append(('evento', edge))
-
-        for item_type, item in items_to_remove:
-            if item_type == 'obstaculo':
-                del self.obstaculos[item]
-                del self.contadores_tempo[item]
-            else:
-                del self.eventos[item]
-                del self.contadores_tempo[item]
-
-    def aplicar_efeitos(self):
-        for node, tipo in self.obstaculos.items():
-            densidade = self.grafo.nodes[node].get('densidade_populacional', 'normal')
-            mult_densidade = self.multiplicadores_densidade[densidade]
-            for edge in self.grafo.edges(node):
-                self.grafo[edge[0]][edge[1]]['custo'] = self.valores_originais[(edge[0],edge[1])]['custo'] * mult_densidade['custo']
-                self.grafo[edge[0]][edge[1]]['tempo'] = self.valores_originais[(edge[0],edge[1])]['tempo'] * mult_densidade['tempo']
-
-        for node, tipo in self.obstaculos.items():
-            mult = self.multiplicadores_obstaculos[tipo]
-            for edge in self.grafo.edges(node):
-                self.grafo[edge[0]][edge[1]]['custo'] = self.valores_originais[(edge[0],edge[1])]['custo'] * mult['custo']
-                self.grafo[edge[0]][edge[1]]['tempo'] = self.valores_originais[(edge[0],edge[1])]['tempo'] * mult['tempo']
-
-        for edge, tipo in self.eventos.items():
-            mult = self.multiplicadores_eventos[tipo]
-            self.grafo[edge[0]][edge[1]]['custo'] = self.valores_originais[(edge[0],edge[1])]['custo'] * mult['custo']
-            self.grafo[edge[0]][edge[1]]['tempo'] = self.valores_originais[(edge[0],edge[1])]['tempo'] * mult['tempo']
+        """
+        Avança um ciclo e remove os obstáculos e eventos vencidos que saem no sorteio.
+
+        Só são visitados os efeitos que vencem neste ciclo, através do calendário
+        de vencimentos; o custo não depende do número de efeitos ativos.
+        """
+        self.ciclo += 1
+        remover = self._vencidos(self._agenda_obstaculos, self._vencimento_obstaculo,
+                                 self._tipo_obstaculo, self._param_obstaculos['prob_remocao'])
+        remover_eventos = self._vencidos(self._agenda_eventos, self._vencimento_evento,
+                                         self._tipo_evento, self._param_eventos['prob_remocao'])
+        self._remover_obstaculos(remover)
+        self._remover_eventos(remover_eventos)
+
+    def aplicar_efeitos(self) -> List[Tuple[str, str, float, float]]:
+        """
+        Escreve nos pesos das arestas os efeitos da densidade, dos obstáculos e dos eventos.
+
+        As camadas já foram atualizadas quando cada obstáculo ou evento começou ou
+        terminou; aqui só se recalculam as arestas marcadas como alteradas.
+
+        Returns:
+            list: Alterações (u, v, custo antigo, custo novo) das arestas cujo custo ou tempo mudou
+        """
+        return self.custos.aplicar()
+
+    def impacto_rotas(self, partidas: np.ndarray, arestas: np.ndarray, chegadas: np.ndarray,
+                      inicios: np.ndarray) -> np.ndarray:
+        """
+        Fatores de impacto (custo, tempo) de um lote de rotas não vazias.
+
+        Cada rota contribui com o obstáculo do nodo de partida e, por aresta, com o
+        evento na aresta e o obstáculo no nodo de chegada; o produto é limitado por
+        IMPACTO_MAXIMO_CUSTO e IMPACTO_MAXIMO_TEMPO.
+
+        Args:
+            partidas: Índice (indice_nodo) do nodo de partida de cada rota
+            arestas: Índices (custos.indice) das arestas de todas as rotas, concatenadas
+            chegadas: Índice do nodo de chegada de cada aresta de `arestas`
+            inicios: Posição em `arestas` da primeira aresta de cada rota
+
+        Returns:
+            np.ndarray: Matriz (rotas x 2) com os fatores de custo e de tempo
+        """
+        fator = self.impacto_evento[arestas] * self.impacto_obstaculo[chegadas]
+        produto = np.multiply.reduceat(fator, inicios, axis=0) * self.impacto_obstaculo[partidas]
+        return np.minimum(produto, [IMPACTO_MAXIMO_CUSTO, IMPACTO_MAXIMO_TEMPO])
 
     def get_impacto_total(self, caminho: List[str]) -> Dict[str, float]:
         """Calcula o impacto total de eventos dinâmicos ao longo de um caminho."""
         if not caminho:
             return {'impacto_custo': 1.0, 'impacto_tempo': 1.0}  # Sem impacto para caminhos inválidos ou vazios
-        
-        impacto_custo = 1.0
-        impacto_tempo = 1.0
-
-        for node in caminho:
-            if node in self.obstaculos:
-                tipo = self.obstaculos[node]
-                mult = self.multiplicadores_obstaculos[tipo]
-                impacto_custo *= mult['custo']
-                impacto_tempo *= mult['tempo']
-
-        for i in range(len(caminho) - 1):
-            edge = (caminho[i], caminho[i + 1])
-            if edge in self.eventos:
-                tipo = self.eventos[edge]
-                mult = self.multiplicadores_eventos[tipo]
-                impacto_custo *= mult['custo']
-                impacto_tempo *= mult['tempo']
+
+        nodos = np.array([self.indice_nodo[node] for node in caminho], dtype=np.int64)
+        if len(caminho) == 1:
+            impacto = np.minimum(self.impacto_obstaculo[nodos[0]], [IMPACTO_MAXIMO_CUSTO, IMPACTO_MAXIMO_TEMPO])
+        else:
+            arestas = np.array([self.custos.indice[aresta] for aresta in zip(caminho, caminho[1:])], dtype=np.int64)
+            impacto = self.impacto_rotas(nodos[:1], arestas, nodos[1:], np.zeros(1, dtype=np.int64))[0]
 
         return {
-            'impacto_custo': min(impacto_custo, 1.5),
-            'impacto_tempo': min(impacto_tempo, 2.0)
+            'impacto_custo': float(impacto[0]),
+            'impacto_tempo': float(impacto[1])
         }
 
+
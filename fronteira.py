@@ -0,0 +1,119 @@
+import heapq
+from collections import deque
+from itertools import count
+from typing import Dict, Hashable, Tuple
+
+
+class FronteiraFIFO:
+    """Fronteira FIFO (busca em largura) com pertença em O(1)."""
+
+    def __init__(self):
+        self._fila = deque()
+        self._membros = set()
+
+    def inserir(self, item: Hashable):
+        self._fila.append(item)
+        self._membros.add(item)
+
+    def remover(self) -> Hashable:
+        item = self._fila.popleft()
+        self._membros.discard(item)
+        return item
+
+    def __contains__(self, item) -> bool:
+        return item in self._membros
+
+    def __len__(self) -> int:
+        return len(self._fila)
+
+
+class FronteiraLIFO:
+    """Fronteira LIFO (busca em profundidade) com pertença em O(1)."""
+
+    def __init__(self):
+        self._pilha = []
+        self._membros = set()
+
+    def inserir(self, item: Hashable):
+        self._pilha.append(item)
+        self._membros.add(item)
+
+    def remover(self) -> Hashable:
+        item = self._pilha.pop()
+        self._membros.discard(item)
+        return item
+
+    def __contains__(self, item) -> bool:
+        return item in self._membros
+
+    def __len__(self) -> int:
+        return len(self._pilha)
+
+
+class FronteiraPrioridade:
+    """
+    Fronteira de prioridade (busca gulosa, A*) sobre um heap binário.
+
+    A diminuição de prioridade (decrease-key) é feita por remoção preguiçosa:
+    é inserida uma nova entrada e a antiga é ignorada quando chegar ao topo.
+    Os empates são resolvidos pela ordem de inserção. Inserção e remoção
+    custam O(log n) e a pertença O(1).
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._entradas: Dict[Hashable, Tuple[float, int]] = {}
+        self._contador = count()
+
+    def inserir(self, item: Hashable, prioridade: float) -> bool:
+        """
+        Insere o item ou diminui a sua prioridade.
+
+        Returns:
+            bool: False se o item já estava na fronteira com prioridade menor ou igual
+        """
+        atual = self._entradas.get(item)
+        if atual is not None and atual[0] <= prioridade:
+            return False
+        entrada = (prioridade, next(self._contador))
+        self._entradas[item] = entrada
+        heapq.heappush(self._heap, (prioridade, entrada[1], item))
+        return True
+
+    def alterar(self, item: Hashable, prioridade: float):
+        """Insere o item ou altera a sua prioridade, para cima ou para baixo."""
+        entrada = (prioridade, next(self._contador))
+        self._entradas[item] = entrada
+        heapq.heappush(self._heap, (prioridade, entrada[1], item))
+
+    def retirar(self, item: Hashable):
+        """Retira o item da fronteira, se lá estiver."""
+        self._entradas.pop(item, None)
+
+    def remover(self) -> Tuple[Hashable, float]:
+        """Remove e devolve o item de menor prioridade e a respetiva prioridade."""
+        while self._heap:
+            prioridade, ordem, item = heapq.heappop(self._heap)
+            if self._entradas.get(item) == (prioridade, ordem):
+                del self._entradas[item]
+                return item, prioridade
+        raise IndexError("remover de uma fronteira vazia")
+
+    def minimo(self) -> float:
+        """Menor prioridade na fronteira, sem remover o respetivo item."""
+        while self._heap:
+            prioridade, ordem, item = self._heap[0]
+            if self._entradas.get(item) == (prioridade, ordem):
+                return prioridade
+            heapq.heappop(self._heap)
+        raise IndexError("consultar uma fronteira vazia")
+
+    def prioridade(self, item: Hashable) -> float:
+        """Prioridade atual de um item na fronteira."""
+        return self._entradas[item][0]
+
+    def __contains__(self, item) -> bool:
+        return item in self._entradas
+
+    def __len__(self) -> int:
+        return len(self._entradas)
@@ -1,10 +1,104 @@
-from typing import Dict, List, Tuple
+import heapq
+from typing import Dict, Iterable, List, Optional, Tuple
 import networkx as nx
+from grafo_csr import GrafoCSR
+from avaliacao_rotas import AvaliadorRotas
+from limitacoes_geograficas import RestricaoAcesso, mascara_terrenos
+
+
+class TabelaPostos:
+    """
+    Custo de cada nodo até ao posto de reabastecimento mais próximo.
+
+    Um único Dijkstra inverso, com todos os postos como fontes, dá para cada
+    nodo o custo até ao posto mais próximo, o próximo salto nesse caminho e o
+    posto em causa. A tabela é calculada por classe de terrenos a evitar e
+    refeita uma vez por versão do CSR, pelo que as decisões de reabastecimento
+    de toda a frota passam a ser consultas à tabela.
+    """
+
+    def __init__(self, csr: GrafoCSR):
+        self.csr = csr
+        self.postos = [i for i, nome in enumerate(csr.nomes) if csr.grafo.nodes[nome].get('tipo') == 'posto']
+        self._versao = csr.versao
+        self._tabelas: Dict[int, Tuple[List[float], List[int], List[int]]] = {}
+
+    def _tabela(self, evitar: Iterable[str]) -> Tuple[List[float], List[int], List[int]]:
+        """Devolve (custo, próximo salto, posto) de cada nodo, indexados pelos ids do CSR."""
+        csr = self.csr
+        if csr.versao != self._versao:
+            self._tabelas.clear()
+            self._versao = csr.versao
+        mascara = mascara_terrenos(evitar)
+        if mascara in self._tabelas:
+            return self._tabelas[mascara]
+
+        offsets_inv, origens_inv, arestas_inv = csr.listas_inversas()
+        custo = csr.listas()[2]
+        permitida = csr.arestas_permitidas(evitar)
+        num_nodos = len(csr)
+        dist = [float('inf')] * num_nodos
+        proximo = [-1] * num_nodos
+        posto = [-1] * num_nodos
+        heap = []
+        for p in self.postos:
+            dist[p] = 0.0
+            posto[p] = p
+            heap.append((0.0, p))
+        heapq.heapify(heap)
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            # Predecessores p de u: a aresta p -> u leva p para mais perto do posto de u
+            for k in range(offsets_inv[u], offsets_inv[u + 1]):
+                e = arestas_inv[k]
+                if not permitida[e]:
+                    continue
+                p = origens_inv[k]
+                nova = d + custo[e]
+                if nova < dist[p]:
+                    dist[p] = nova
+                    proximo[p] = u
+                    posto[p] = posto[u]
+                    heapq.heappush(heap, (nova, p))
+
+        self._tabelas[mascara] = (dist, proximo, posto)
+        return self._tabelas[mascara]
+
+    def consultar(self, nodo: str, evitar: Iterable[str] = ()) -> Tuple[Optional[str], float]:
+        """Posto mais próximo do nodo e respetivo custo (None e inf se nenhum for alcançável)."""
+        dist, _, posto = self._tabela(evitar)
+        i = self.csr.indice[nodo]
+        if posto[i] < 0:
+            return None, float('inf')
+        return self.csr.nomes[posto[i]], dist[i]
+
+    def rota(self, nodo: str, evitar: Iterable[str] = ()) -> Optional[List[str]]:
+        """Caminho de custo mínimo do nodo até ao posto mais próximo, seguindo os próximos saltos."""
+        _, proximo, posto = self._tabela(evitar)
+        i = self.csr.indice[nodo]
+        if posto[i] < 0:
+            return None
+        caminho = [i]
+        while caminho[-1] != posto[i]:
+            caminho.append(proximo[caminho[-1]])
+        return self.csr.caminho_para_nomes(caminho)
+
 
 class PlaneadorReabastecimento:
-    def __init__(self, grafo: nx.DiGraph):
+    def __init__(self, grafo: nx.DiGraph, csr: GrafoCSR = None):
+        """
+        Args:
+            grafo: Grafo da rede de distribuição
+            csr: Vista CSR partilhada (mantida atualizada por quem altera o grafo); se
+                omitida, é compilada uma nova a partir do grafo
+        """
         self.grafo = grafo
         self.pontos_reabastecimento = self._identificar_pontos_reabastecimento()
+        self.tabela_postos = TabelaPostos(csr if csr is not None else GrafoCSR(grafo))
+        self.avaliador_rotas = AvaliadorRotas(self.tabela_postos.csr)
+        self.restricao_acesso = RestricaoAcesso()
         
     def _identificar_pontos_reabastecimento(self) -> List[str]:
         """Identifica os nodos do grafo que servem como pontos de reabastecimento."""
@@ -15,47 +109,39 @@ class PlaneadorReabastecimento:
         """Calcula o custo total de uma rota."""
         if not rota or len(rota) < 2:
             return 0
-        return sum(self.grafo[rota[i]][rota[i + 1]]['custo'] 
-                  for i in range(len(rota) - 1))
+        return self.avaliador_rotas.avaliar(self.avaliador_rotas.ids_arestas(rota))['custo']
 
-    def _encontrar_melhor_posto(self, localizacao: str, autonomia: float) -> Tuple[str, List[str]]:
+    def _encontrar_melhor_posto(self, localizacao: str, autonomia: float,
+                                evitar: Iterable[str] = ()) -> Tuple[str, List[str]]:
         """
         Encontra o melhor posto de reabastecimento considerando distância e autonomia.
+
+        O posto de menor custo vem da tabela de postos, sem busca por posto, e só
+        usa terrenos que o veículo pode atravessar.
         """
-        melhor_posto = None
-        melhor_rota = None
-        menor_custo = float('inf')
-
-        for posto in self.pontos_reabastecimento:
-            try:
-                # Usa Dijkstra para encontrar o caminho mais curto até o posto
-                rota = nx.shortest_path(self.grafo, localizacao, posto, weight='custo')
-                custo = self._calcular_custo_rota(rota)
-                
-                # Verifica se é possível chegar ao posto com a autonomia atual
-                if custo <= autonomia * 0.9 and custo < menor_custo:  # 90% da autonomia para margem de segurança
-                    melhor_posto = posto
-                    melhor_rota = rota
-                    menor_custo = custo
-            except (nx.NetworkXNoPath, nx.NodeNotFound):
-                continue
+        if localizacao not in self.tabela_postos.csr:
+            return None, None
+        posto, custo = self.tabela_postos.consultar(localizacao, evitar)
 
-        return melhor_posto, melhor_rota
+        # Verifica se é possível chegar ao posto com a autonomia atual
+        if posto is None or custo > autonomia * 0.9:  # 90% da autonomia para margem de segurança
+            return None, None
+        return posto, self.tabela_postos.rota(localizacao, evitar)
+
+    def necessita_reabastecimento(self, veiculo: Dict) -> bool:
+        """O veículo deve reabastecer quando o combustível desce a 60% da autonomia ou menos."""
+        return veiculo['combustivel'] <= veiculo['autonomia'] * 0.6
 
     def calcular_proximo_reabastecimento(self, veiculo: Dict, rota_atual: List[str]) -> Tuple[bool, List[str]]:
         """
         Determina se e onde o veículo deve reabastecer.
         """
         combustivel_atual = veiculo['combustivel']
-        autonomia = veiculo['autonomia']
         localizacao = veiculo['localizacao']
-        
-        # Ajuste no limite de reabastecimento para 60% da autonomia
-        limite_reabastecimento = autonomia * 0.6
 
-        if combustivel_atual <= limite_reabastecimento:
+        if self.necessita_reabastecimento(veiculo):
             melhor_posto, rota_reabastecimento = self._encontrar_melhor_posto(
-                localizacao, combustivel_atual
+                localizacao, combustivel_atual, self.restricao_acesso.terrenos_evitar(veiculo['tipo'])
             )
             
             if melhor_posto and rota_reabastecimento:
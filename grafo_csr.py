@@ -0,0 +1,186 @@
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+import networkx as nx
+from limitacoes_geograficas import SEM_TERRENO, codigo_terreno, mascara_terrenos
+
+
+class GrafoCSR:
+    """
+    Vista compilada do DiGraph em formato CSR (compressed sparse row) para as buscas.
+
+    Os nodos são identificados por inteiros (posição em `nomes`). Os sucessores do
+    nodo i são `destinos[offsets[i]:offsets[i + 1]]`, ordenados pelo nome, e os
+    arrays `custo`, `tempo` e `bloqueado` são paralelos a `destinos`. O array
+    `terreno` guarda o código do tipo de terreno de cada nodo e `coordenadas`
+    as suas coordenadas (latitude, longitude). Os arrays
+    `offsets_inv`, `origens_inv` e `arestas_inv` descrevem os predecessores de
+    cada nodo, para buscas no sentido inverso.
+
+    A vista deve ser atualizada com `atualizar()` sempre que os pesos ou os
+    bloqueios do DiGraph mudem (condições meteorológicas, eventos); cada
+    atualização incrementa `versao`, e `versao_terreno` quando os terrenos mudam.
+    """
+
+    def __init__(self, grafo: nx.DiGraph):
+        self.grafo = grafo
+        self.versao = 0
+        self.versao_terreno = 0
+        self.terreno = None
+        self._compilar()
+
+    def _compilar(self):
+        """Constrói a estrutura (nodos e sucessores) a partir do DiGraph."""
+        self.nomes: List[str] = list(self.grafo.nodes())
+        self.indice: Dict[str, int] = {nome: i for i, nome in enumerate(self.nomes)}
+
+        self._linhas = [sorted(self.grafo.successors(nome)) for nome in self.nomes]
+        offsets = [0]
+        destinos = []
+        for linha in self._linhas:
+            destinos.extend(self.indice[v] for v in linha)
+            offsets.append(len(destinos))
+
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.destinos = np.array(destinos, dtype=np.int32)
+        self.num_arestas = len(destinos)
+        # Id da aresta (posição em `destinos`) para cada par (origem, destino) de nomes
+        self.arestas: Dict[Tuple[str, str], int] = {
+            (u, v): e for u, linha, inicio in zip(self.nomes, self._linhas, offsets)
+            for e, v in enumerate(linha, inicio)
+        }
+        self.coordenadas = np.array(
+            [self.grafo.nodes[n].get('coordenadas', (np.nan, np.nan)) for n in self.nomes], dtype=np.float64
+        ).reshape(-1, 2)
+
+        # Estrutura inversa (predecessores): para cada nodo v, as arestas u -> v,
+        # guardadas como (origem u, id da aresta no CSR direto)
+        origens = np.repeat(np.arange(len(self.nomes), dtype=np.int32), np.diff(self.offsets))
+        ordem = np.argsort(self.destinos, kind='stable')
+        self.offsets_inv = np.concatenate(([0], np.cumsum(np.bincount(self.destinos, minlength=len(self.nomes)))))
+        self.origens_inv = origens[ordem]
+        self.arestas_inv = ordem.astype(np.int64)
+        self._listas_inv = (self.offsets_inv.tolist(), self.origens_inv.tolist(), self.arestas_inv.tolist())
+
+        self.atualizar()
+
+    def atualizar(self):
+        """
+        Relê custo, tempo, bloqueio e terreno do DiGraph, recompilando se a estrutura mudou.
+
+        A estrutura mantém-se se o grafo tiver o mesmo número de nodos e cada nodo
+        compilado existir com o mesmo grau de saída e todos os sucessores compilados;
+        uma aresta removida e outra acrescentada (mesmas contagens) também recompila.
+        """
+        if self.grafo.number_of_nodes() != len(self.nomes):
+            self._compilar()
+            return
+
+        adj = self.grafo.adj
+        custo = []
+        tempo = []
+        bloqueado = []
+        for u, linha in zip(self.nomes, self._linhas):
+            vizinhos = adj.get(u)
+            if vizinhos is None or len(vizinhos) != len(linha):
+                self._compilar()
+                return
+            for v in linha:
+                dados = vizinhos.get(v)
+                if dados is None:
+                    self._compilar()
+                    return
+                custo.append(dados['custo'])
+                tempo.append(dados['tempo'])
+                bloqueado.append(dados.get('bloqueado', False))
+
+        self.custo = np.array(custo, dtype=np.float64)
+        self.tempo = np.array(tempo, dtype=np.float64)
+        self.bloqueado = np.array(bloqueado, dtype=bool)
+        terreno = np.array(
+            [codigo_terreno(self.grafo.nodes[n].get('tipo_terreno')) for n in self.nomes], dtype=np.int8
+        )
+        # Contador próprio para quem só depende do terreno (ex.: índice de alcançabilidade)
+        if self.terreno is None or not np.array_equal(terreno, self.terreno):
+            self.versao_terreno += 1
+        self.terreno = terreno
+
+        # Cópias em listas Python: a indexação escalar de listas é mais rápida nos ciclos das buscas
+        self._listas = (self.offsets.tolist(), self.destinos.tolist(), custo, bloqueado)
+        self._terreno_lista = self.terreno.tolist()
+        # Máscaras por classe de terrenos a evitar (bitmask): nodos proibidos e arestas permitidas
+        self._proibidos: Dict[int, List[bool]] = {}
+        self._permitidas: Dict[int, List[bool]] = {}
+        self.versao += 1
+
+    def aplicar_alteracoes(self, alteracoes: Iterable[Tuple[str, str, float, float]]) -> List[int]:
+        """
+        Relê do DiGraph apenas as arestas de um conjunto de alterações (u, v, antigo, novo).
+
+        Evita reler o grafo inteiro quando só uma parte das arestas mudou; tal como
+        `atualizar()`, incrementa `versao`.
+
+        Returns:
+            list: Ids das arestas alteradas
+        """
+        _, _, custo, bloqueado = self._listas
+        adj = self.grafo.adj
+        ids = []
+        for u, v, _, _ in alteracoes:
+            e = self.arestas[(u, v)]
+            dados = adj[u][v]
+            custo[e] = dados['custo']
+            bloqueado[e] = dados.get('bloqueado', False)
+            self.custo[e] = custo[e]
+            self.tempo[e] = dados['tempo']
+            self.bloqueado[e] = bloqueado[e]
+            for mascara, permitidas in self._permitidas.items():
+                permitidas[e] = not bloqueado[e] and not self._proibidos[mascara][self._listas[1][e]]
+            ids.append(e)
+        self.versao += 1
+        return ids
+
+    def __contains__(self, nome) -> bool:
+        return nome in self.indice
+
+    def __len__(self) -> int:
+        return len(self.nomes)
+
+    def listas(self) -> Tuple[List[int], List[int], List[float], List[bool]]:
+        """Devolve (offsets, destinos, custo, bloqueado) como listas Python."""
+        return self._listas
+
+    def listas_inversas(self) -> Tuple[List[int], List[int], List[int]]:
+        """Devolve (offsets_inv, origens_inv, arestas_inv) como listas Python."""
+        return self._listas_inv
+
+    def nodos_proibidos(self, evitar: Iterable[str]) -> List[bool]:
+        """
+        Devolve, para cada nodo, se o seu tipo de terreno está na lista a evitar.
+
+        Args:
+            evitar: Tipos de terreno (valores de TipoTerreno) a evitar
+        """
+        mascara = mascara_terrenos(evitar)
+        if mascara not in self._proibidos:
+            self._proibidos[mascara] = [t != SEM_TERRENO and bool(mascara >> t & 1) for t in self._terreno_lista]
+        return self._proibidos[mascara]
+
+    def arestas_permitidas(self, evitar: Iterable[str]) -> List[bool]:
+        """
+        Devolve, para cada aresta u -> v, se pode ser usada: não está bloqueada e o
+        terreno de v não está na lista a evitar.
+
+        A máscara é guardada por classe de terrenos e mantida por `aplicar_alteracoes`,
+        pelo que nas buscas a viabilidade de uma aresta é uma única consulta.
+        """
+        mascara = mascara_terrenos(evitar)
+        if mascara not in self._permitidas:
+            proibido = self.nodos_proibidos(evitar)
+            _, destinos, _, bloqueado = self._listas
+            self._permitidas[mascara] = [not b and not proibido[v] for v, b in zip(destinos, bloqueado)]
+        return self._permitidas[mascara]
+
+    def caminho_para_nomes(self, caminho: Iterable[int]) -> List[str]:
+        """Converte um caminho de ids inteiros na lista de nomes dos nodos."""
+        return [self.nomes[i] for i in caminho]
@@ -0,0 +1,221 @@
+import heapq
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from grafo_csr import GrafoCSR
+from distancias import CUSTO_POR_KM, VARIACAO_CUSTO, haversine_vetorizado, matriz_distancias
+from custos_arestas import MULTIPLICADOR_MINIMO_CUSTO
+
+
+def _dijkstra(num_nodos, offsets, vizinhos, arestas, custo, fontes) -> List[float]:
+    """
+    Dijkstra genérico sobre listas CSR.
+
+    Args:
+        offsets, vizinhos: Estrutura CSR a percorrer (direta ou inversa)
+        arestas: Id da aresta (em `custo`) para cada posição de `vizinhos`, ou None se coincidirem
+        custo: Custo de cada aresta
+        fontes: Ids dos nodos de partida (distância 0)
+    """
+    dist = [float('inf')] * num_nodos
+    heap = []
+    for fonte in fontes:
+        dist[fonte] = 0.0
+        heap.append((0.0, fonte))
+    heapq.heapify(heap)
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        for k in range(offsets[u], offsets[u + 1]):
+            v = vizinhos[k]
+            nova = d + custo[arestas[k] if arestas is not None else k]
+            if nova < dist[v]:
+                dist[v] = nova
+                heapq.heappush(heap, (nova, v))
+    return dist
+
+
+def distancias_ate_objetivo(csr: GrafoCSR, objetivo: int) -> np.ndarray:
+    """
+    Calcula o custo mínimo de todos os nodos até ao objetivo com um único Dijkstra inverso.
+
+    A busca parte do objetivo e percorre as arestas no sentido inverso (dos
+    predecessores), pelo que cada nodo fica com o custo do caminho mais curto
+    até ao objetivo.
+
+    Args:
+        csr: Vista CSR do grafo
+        objetivo: Id (no CSR) do nodo objetivo
+
+    Returns:
+        np.ndarray: Custo até ao objetivo, indexado pelo id do nodo (inf se inalcançável)
+    """
+    offsets_inv, origens_inv, arestas_inv = csr.listas_inversas()
+    custo = csr.listas()[2]
+    return np.array(_dijkstra(len(csr), offsets_inv, origens_inv, arestas_inv, custo, [objetivo]))
+
+
+def distancias_desde_origem(csr: GrafoCSR, origem: int) -> np.ndarray:
+    """Calcula o custo mínimo da origem até todos os nodos (Dijkstra direto)."""
+    offsets, destinos, custo, _ = csr.listas()
+    return np.array(_dijkstra(len(csr), offsets, destinos, None, custo, [origem]))
+
+
+class HeuristicaALT:
+    """
+    Heurística ALT (A*, landmarks e desigualdade triangular).
+
+    Escolhe um conjunto de marcos e precalcula, uma vez por versão dos pesos,
+    as distâncias de cada marco a todos os nodos e de todos os nodos a cada
+    marco. Para um objetivo t, o limite inferior do custo de v até t é
+
+        max_L max(d(v, L) - d(t, L), d(L, t) - d(L, v))
+
+    avaliado em O(número de marcos) por nodo, sem qualquer busca por consulta.
+    """
+
+    def __init__(self, csr: GrafoCSR, num_marcos: int = 8,
+                 tipos_candidatos: Iterable[str] = ('base', 'posto', 'hub'),
+                 marcos: Optional[List[str]] = None):
+        self.csr = csr
+        self.num_marcos = num_marcos
+        self.tipos_candidatos = tuple(tipos_candidatos)
+        self.marcos_fixos = marcos
+        self._versao = None
+
+    def _preprocessar(self):
+        """Escolhe os marcos (se não forem fixos) e calcula as tabelas de distâncias."""
+        csr = self.csr
+        if self.marcos_fixos is not None:
+            marcos = [csr.indice[m] for m in self.marcos_fixos]
+            de_marco = [distancias_desde_origem(csr, m) for m in marcos]
+            para_marco = [distancias_ate_objetivo(csr, m) for m in marcos]
+        else:
+            candidatos = [i for i, nome in enumerate(csr.nomes)
+                          if csr.grafo.nodes[nome].get('tipo') in self.tipos_candidatos]
+            marcos, de_marco, para_marco = [], [], []
+            # Seleção pelo mais afastado: começa numa base e escolhe sucessivamente o
+            # candidato mais distante dos marcos já escolhidos (marcos periféricos)
+            proximo = candidatos[0] if candidatos else 0
+            distancia_minima = np.full(len(csr), np.inf)
+            while len(marcos) < min(self.num_marcos, len(candidatos)):
+                marcos.append(proximo)
+                de_marco.append(distancias_desde_origem(csr, proximo))
+                para_marco.append(distancias_ate_objetivo(csr, proximo))
+                distancia_minima = np.minimum(distancia_minima, np.minimum(de_marco[-1], para_marco[-1]))
+                afastamento = np.where(np.isfinite(distancia_minima), distancia_minima, -1.0)[candidatos]
+                afastamento[[candidatos.index(m) for m in marcos]] = -np.inf
+                proximo = candidatos[int(np.argmax(afastamento))]
+
+        self.marcos = [csr.nomes[m] for m in marcos]
+        self.de_marco = np.array(de_marco).reshape(len(marcos), len(csr))
+        self.para_marco = np.array(para_marco).reshape(len(marcos), len(csr))
+        self._versao = csr.versao
+
+    def para_objetivo(self, objetivo: str) -> 'LimiteALT':
+        """Devolve a heurística para um objetivo, indexável pelos ids do CSR."""
+        if self._versao != self.csr.versao:
+            self._preprocessar()
+        return LimiteALT(self, self.csr.indice[objetivo])
+
+
+class _LimitePreguicoso(ABC):
+    """
+    Base das heurísticas avaliadas a pedido: memoriza o valor de cada nodo e
+    permite pré-avaliar em lote os vizinhos gerados numa expansão.
+    """
+
+    def __init__(self):
+        self._valores: Dict[int, float] = {}
+
+    @abstractmethod
+    def lote(self, nodos) -> np.ndarray:
+        """Avalia o limite inferior para vários nodos de uma vez."""
+
+    def pre_avaliar(self, nodos: List[int]):
+        """Avalia numa única operação vetorizada os nodos ainda sem valor memorizado."""
+        novos = [n for n in nodos if n not in self._valores]
+        if len(novos) > 1:
+            self._valores.update(zip(novos, self.lote(novos).tolist()))
+
+    def __getitem__(self, nodo: int) -> float:
+        valor = self._valores.get(nodo)
+        if valor is None:
+            valor = float(self.lote([nodo])[0])
+            self._valores[nodo] = valor
+        return valor
+
+
+class LimiteALT(_LimitePreguicoso):
+    """Limite inferior ALT até um objetivo fixo, avaliado de forma preguiçosa por nodo."""
+
+    def __init__(self, alt: HeuristicaALT, objetivo: int):
+        super().__init__()
+        self._de_marco = alt.de_marco
+        self._para_marco = alt.para_marco
+        self._de_marco_t = alt.de_marco[:, objetivo]
+        self._para_marco_t = alt.para_marco[:, objetivo]
+
+    def lote(self, nodos) -> np.ndarray:
+        """Avalia o limite inferior para vários nodos de uma vez."""
+        nodos = np.asarray(nodos, dtype=np.int64)
+        with np.errstate(invalid='ignore'):
+            frente = self._para_marco[:, nodos] - self._para_marco_t[:, None]
+            tras = self._de_marco_t[:, None] - self._de_marco[:, nodos]
+        # inf - inf (nodo e objetivo ambos sem ligação ao marco) não dá informação
+        limites = np.fmax(np.nan_to_num(frente, nan=0.0, posinf=np.inf, neginf=0.0),
+                          np.nan_to_num(tras, nan=0.0, posinf=np.inf, neginf=0.0))
+        return np.maximum(limites.max(axis=0, initial=0.0), 0.0)
+
+
+class HeuristicaGeografica:
+    """
+    Limite inferior geográfico: custo por km mínimo vezes a distância de haversine.
+
+    O custo de cada aresta é gerado como distância * CUSTO_POR_KM * U(0.8, 1.2)
+    e as camadas de GestorCustosArestas nunca o multiplicam por menos de
+    MULTIPLICADOR_MINIMO_CUSTO (densidade baixa), pelo que
+    fator * haversine(v, objetivo) nunca excede o custo real até ao objetivo.
+    O fator é calibrado com os custos atuais das arestas para absorver o
+    arredondamento dos custos a duas casas decimais. Não há qualquer
+    pré-processamento por consulta.
+    """
+
+    def __init__(self, csr: GrafoCSR):
+        self.csr = csr
+        self.fator = self._calibrar()
+
+    def _calibrar(self) -> float:
+        """
+        Menor custo por km observado nas arestas, limitado ao mínimo teórico do gerador
+        e reduzido pelo menor multiplicador que as camadas de custo podem aplicar.
+        """
+        fator = CUSTO_POR_KM * VARIACAO_CUSTO[0]
+        origens = np.repeat(np.arange(len(self.csr)), np.diff(self.csr.offsets))
+        distancias = haversine_vetorizado(self.csr.coordenadas[origens], self.csr.coordenadas[self.csr.destinos])
+        validas = distancias > 0
+        if validas.any():
+            fator = min(fator, float(np.min(self.csr.custo[validas] / distancias[validas])))
+        return max(fator, 0.0) * MULTIPLICADOR_MINIMO_CUSTO
+
+    def para_objetivo(self, objetivo: str) -> 'LimiteGeografico':
+        """Devolve a heurística para um objetivo, indexável pelos ids do CSR."""
+        return LimiteGeografico(self.csr.coordenadas, self.csr.indice[objetivo], self.fator)
+
+
+class LimiteGeografico(_LimitePreguicoso):
+    """Limite inferior geográfico até um objetivo fixo, calculado a partir das coordenadas."""
+
+    def __init__(self, coordenadas: np.ndarray, objetivo: int, fator: float):
+        super().__init__()
+        self._coordenadas = coordenadas
+        self._objetivo = coordenadas[objetivo:objetivo + 1]
+        self._fator = fator
+
+    def lote(self, nodos) -> np.ndarray:
+        """Avalia o limite inferior para vários nodos de uma vez."""
+        nodos = np.asarray(nodos, dtype=np.int64)
+        distancias = matriz_distancias(self._objetivo, self._coordenadas[nodos])[0]
+        return np.nan_to_num(distancias * self._fator, nan=0.0)
@@ -0,0 +1,250 @@
+import heapq
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from grafo_csr import GrafoCSR
+from limitacoes_geograficas import mascara_terrenos
+from fronteira import FronteiraPrioridade
+
+
+class HierarquiaContracao:
+    """
+    Hierarquia de contração personalizável (estilo CCH) sobre a vista CSR.
+
+    O pré-processamento só depende da estrutura do grafo: os nodos são ordenados
+    pelo grau mínimo e eliminados por essa ordem, ligando entre si todos os
+    vizinhos ainda não eliminados de cada nodo. Cada par de nodos ligado dá um
+    arco (nodo de menor ordem -> nodo de maior ordem) com um peso em cada
+    sentido, `sobe` e `desce`.
+
+    A personalização atribui os pesos: parte dos custos atuais das arestas e
+    percorre os triângulos inferiores por ordem de eliminação, o que é muito
+    mais barato que reconstruir a hierarquia. É feita a pedido, uma vez por
+    versão do CSR e por conjunto de terrenos a evitar, pelo que as alterações de
+    custo feitas pela meteorologia e pelos eventos não obrigam a refazer a ordem.
+
+    As consultas são buscas bidirecionais que só sobem na hierarquia, seguidas
+    do desdobramento dos atalhos no caminho original.
+    """
+
+    def __init__(self, csr: GrafoCSR):
+        self.csr = csr
+        self._preprocessar()
+
+    def _preprocessar(self):
+        """Ordena os nodos, cria os arcos (com atalhos) e enumera os triângulos inferiores."""
+        csr = self.csr
+        num_nodos = len(csr)
+        offsets, destinos, _, _ = csr.listas()
+
+        vizinhos = [set() for _ in range(num_nodos)]
+        for u in range(num_nodos):
+            for e in range(offsets[u], offsets[u + 1]):
+                v = destinos[e]
+                if v != u:
+                    vizinhos[u].add(v)
+                    vizinhos[v].add(u)
+
+        # Eliminação pelo grau mínimo, com atualização preguiçosa dos graus no heap
+        heap = [(len(vizinhos[v]), v) for v in range(num_nodos)]
+        heapq.heapify(heap)
+        eliminado = [False] * num_nodos
+        ordem = []
+        superiores: List[List[int]] = [[] for _ in range(num_nodos)]
+        while heap:
+            grau, v = heapq.heappop(heap)
+            if eliminado[v] or grau != len(vizinhos[v]):
+                continue
+            eliminado[v] = True
+            ordem.append(v)
+            restantes = vizinhos[v]
+            superiores[v] = sorted(restantes)
+            for u in restantes:
+                vizinhos[u].discard(v)
+                vizinhos[u].update(w for w in restantes if w != u)
+            for u in restantes:
+                heapq.heappush(heap, (len(vizinhos[u]), u))
+            vizinhos[v] = set()
+
+        self.ordem = ordem
+        self.posicao = [0] * num_nodos
+        for i, v in enumerate(ordem):
+            self.posicao[v] = i
+
+        # Arcos para cima: para cada nodo, os vizinhos eliminados depois dele
+        self.arcos: Dict[Tuple[int, int], int] = {}
+        self.offsets_arcos = [0]
+        self.topo_arco: List[int] = []
+        self.base_arco: List[int] = []
+        for v in range(num_nodos):
+            for w in superiores[v]:
+                self.arcos[(v, w)] = len(self.topo_arco)
+                self.base_arco.append(v)
+                self.topo_arco.append(w)
+            self.offsets_arcos.append(len(self.topo_arco))
+
+        # Triângulos inferiores (v, u, w) com v abaixo de u e w, por ordem de eliminação
+        self.triangulos: List[Tuple[int, int, int, int]] = []
+        for v in ordem:
+            acima = sorted(superiores[v], key=self.posicao.__getitem__)
+            for i, u in enumerate(acima):
+                arco_vu = self.arcos[(v, u)]
+                for w in acima[i + 1:]:
+                    self.triangulos.append((arco_vu, self.arcos[(v, w)], self.arcos[(u, w)], v))
+
+        # Arco e sentido correspondentes a cada aresta do CSR
+        origens = np.repeat(np.arange(num_nodos), np.diff(csr.offsets)).tolist()
+        self.arco_aresta: List[int] = []
+        self.aresta_sobe: List[bool] = []
+        for u, v in zip(origens, destinos):
+            if u == v:
+                self.arco_aresta.append(-1)
+                self.aresta_sobe.append(True)
+            elif self.posicao[u] < self.posicao[v]:
+                self.arco_aresta.append(self.arcos[(u, v)])
+                self.aresta_sobe.append(True)
+            else:
+                self.arco_aresta.append(self.arcos[(v, u)])
+                self.aresta_sobe.append(False)
+
+        self._offsets_csr = csr.offsets
+        self._versao = csr.versao
+        self._metricas: Dict[int, Tuple] = {}
+
+    def _personalizar(self, evitar: Iterable[str]):
+        """
+        Devolve os pesos (sobe, desce) e os nodos intermédios dos atalhos para
+        uma classe de terrenos a evitar, calculando-os se necessário.
+        """
+        csr = self.csr
+        if csr.offsets is not self._offsets_csr:
+            # A estrutura do grafo mudou: é preciso refazer a ordem e os atalhos
+            self._preprocessar()
+        elif csr.versao != self._versao:
+            self._metricas.clear()
+            self._versao = csr.versao
+
+        classe = mascara_terrenos(evitar)
+        if classe in self._metricas:
+            return self._metricas[classe]
+
+        custo = csr.listas()[2]
+        permitida = csr.arestas_permitidas(evitar)
+        num_arcos = len(self.topo_arco)
+        inf = float('inf')
+        sobe = [inf] * num_arcos
+        desce = [inf] * num_arcos
+        for e, (arco, para_cima) in enumerate(zip(self.arco_aresta, self.aresta_sobe)):
+            if arco < 0 or not permitida[e]:
+                continue
+            if para_cima:
+                sobe[arco] = min(sobe[arco], custo[e])
+            else:
+                desce[arco] = min(desce[arco], custo[e])
+
+        # -1 indica uma aresta original; caso contrário, o nodo intermédio do atalho
+        meio_sobe = [-1] * num_arcos
+        meio_desce = [-1] * num_arcos
+        for arco_vu, arco_vw, arco_uw, v in self.triangulos:
+            # u -> v -> w e w -> v -> u, com v abaixo de u e de w
+            via = desce[arco_vu] + sobe[arco_vw]
+            if via < sobe[arco_uw]:
+                sobe[arco_uw] = via
+                meio_sobe[arco_uw] = v
+            via = desce[arco_vw] + sobe[arco_vu]
+            if via < desce[arco_uw]:
+                desce[arco_uw] = via
+                meio_desce[arco_uw] = v
+
+        metrica = (sobe, desce, meio_sobe, meio_desce)
+        self._metricas[classe] = metrica
+        return metrica
+
+    def _subir(self, fronteira, distancias, pais, pesos, melhor, outras):
+        """Expande um nodo de uma das buscas ascendentes, atualizando o melhor encontro [custo, nodo]."""
+        n, d = fronteira.remover()
+        for arco in range(self.offsets_arcos[n], self.offsets_arcos[n + 1]):
+            nova = d + pesos[arco]
+            vizinho = self.topo_arco[arco]
+            if nova < distancias.get(vizinho, float('inf')):
+                distancias[vizinho] = nova
+                pais[vizinho] = (n, arco)
+                fronteira.inserir(vizinho, nova)
+                if vizinho in outras and nova + outras[vizinho] < melhor[0]:
+                    melhor[:] = [nova + outras[vizinho], vizinho]
+
+    def _desdobrar(self, arco: int, para_cima: bool, meio_sobe, meio_desce) -> List[int]:
+        """Devolve os nodos (sem o primeiro) do caminho original representado por um arco."""
+        nodos = []
+        pilha = [(arco, para_cima)]
+        while pilha:
+            arco, para_cima = pilha.pop()
+            meio = meio_sobe[arco] if para_cima else meio_desce[arco]
+            baixo, alto = self.base_arco[arco], self.topo_arco[arco]
+            if meio < 0:
+                nodos.append(alto if para_cima else baixo)
+            elif para_cima:
+                # baixo -> meio -> alto (a pilha processa primeiro o último inserido)
+                pilha.append((self.arcos[(meio, alto)], True))
+                pilha.append((self.arcos[(meio, baixo)], False))
+            else:
+                # alto -> meio -> baixo
+                pilha.append((self.arcos[(meio, baixo)], True))
+                pilha.append((self.arcos[(meio, alto)], False))
+        return nodos
+
+    def busca(self, inicio: str, objetivo: str, evitar: List[str] = []) -> Optional[List[str]]:
+        """
+        Caminho de custo mínimo entre dois nodos, com a mesma regra de bloqueios e
+        terrenos a evitar das buscas de algoritmos_busca.
+
+        Returns:
+            list: Nomes dos nodos do caminho, ou None se não existir caminho
+        """
+        csr = self.csr
+        if inicio not in csr or objetivo not in csr:
+            print(f"Nodo inicial {inicio} ou objetivo {objetivo} não encontrado no grafo")
+            return None
+
+        sobe, desce, meio_sobe, meio_desce = self._personalizar(evitar)
+        i_inicio, i_objetivo = csr.indice[inicio], csr.indice[objetivo]
+        if i_inicio == i_objetivo:
+            return [inicio]
+
+        g_frente, g_tras = {i_inicio: 0.0}, {i_objetivo: 0.0}
+        pais_frente, pais_tras = {i_inicio: None}, {i_objetivo: None}
+        frente, tras = FronteiraPrioridade(), FronteiraPrioridade()
+        frente.inserir(i_inicio, 0.0)
+        tras.inserir(i_objetivo, 0.0)
+        melhor = [float('inf'), None]
+
+        # Cada lado pára quando o seu mínimo já não pode melhorar o encontro
+        while True:
+            ativa_frente = bool(frente) and frente.minimo() < melhor[0]
+            ativa_tras = bool(tras) and tras.minimo() < melhor[0]
+            if not ativa_frente and not ativa_tras:
+                break
+            if ativa_frente and (not ativa_tras or frente.minimo() <= tras.minimo()):
+                self._subir(frente, g_frente, pais_frente, sobe, melhor, g_tras)
+            else:
+                self._subir(tras, g_tras, pais_tras, desce, melhor, g_frente)
+
+        encontro = melhor[1]
+        if encontro is None:
+            print(f"Não foi encontrado caminho entre {inicio} e {objetivo}")
+            return None
+
+        # Arcos da subida a partir do início, por ordem, e da descida até ao objetivo
+        subida = []
+        nodo = encontro
+        while pais_frente[nodo] is not None:
+            nodo, arco = pais_frente[nodo]
+            subida.append(arco)
+        caminho = [i_inicio]
+        for arco in reversed(subida):
+            caminho.extend(self._desdobrar(arco, True, meio_sobe, meio_desce))
+        nodo = encontro
+        while pais_tras[nodo] is not None:
+            nodo, arco = pais_tras[nodo]
+            caminho.extend(self._desdobrar(arco, False, meio_sobe, meio_desce))
+        return csr.caminho_para_nomes(caminho)
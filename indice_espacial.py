@@ -0,0 +1,124 @@
+import numpy as np
+import networkx as nx
+from typing import Dict, Iterable, List, Optional, Tuple
+from distancias import RAIO_TERRA_KM
+
+
+def coordenadas_para_vetores(coordenadas) -> np.ndarray:
+    """
+    Converte coordenadas (latitude, longitude) em vetores unitários 3D.
+
+    A distância euclidiana (corda) entre dois vetores unitários cresce
+    monotonamente com a distância ao longo do círculo máximo, pelo que os
+    vizinhos mais próximos em 3D são os mesmos que pela fórmula de haversine.
+    """
+    coords = np.radians(np.asarray(coordenadas, dtype=float).reshape(-1, 2))
+    lat, lon = coords[:, 0], coords[:, 1]
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+def corda_para_km(corda: np.ndarray) -> np.ndarray:
+    """Converte a distância de corda entre vetores unitários em quilómetros."""
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.clip(corda / 2, 0.0, 1.0))
+
+
+class IndiceEspacial:
+    """
+    Índice espacial dos nodos do grafo agrupados por tipo e região.
+
+    Cada grupo guarda os vetores unitários das coordenadas dos seus nodos,
+    permitindo responder a consultas dos k vizinhos mais próximos com uma
+    única operação vetorizada, isoladas ou em lote.
+    """
+
+    def __init__(self):
+        self._ids: Dict[Tuple[str, str], List[str]] = {}
+        self._coordenadas: Dict[Tuple[str, str], List[Tuple[float, float]]] = {}
+        self._vetores: Dict[Tuple[str, str], np.ndarray] = {}
+        self._cache: Dict[Tuple, Tuple[List[str], np.ndarray]] = {}
+
+    @classmethod
+    def do_grafo(cls, grafo: nx.DiGraph) -> 'IndiceEspacial':
+        """Constrói o índice a partir dos atributos 'tipo', 'regiao' e 'coordenadas' dos nodos."""
+        indice = cls()
+        for node, data in grafo.nodes(data=True):
+            indice.adicionar(node, data['tipo'], data['regiao'], data['coordenadas'])
+        return indice
+
+    def adicionar(self, node_id: str, tipo: str, regiao: str, coordenadas: Tuple[float, float]):
+        """Adiciona um nodo ao grupo (tipo, regiao) correspondente."""
+        chave = (tipo, regiao)
+        self._ids.setdefault(chave, []).append(node_id)
+        self._coordenadas.setdefault(chave, []).append(coordenadas)
+        self._vetores.pop(chave, None)
+        self._cache.clear()
+
+    def _candidatos(self, tipo: str, regioes: Optional[Iterable[str]] = None) -> Tuple[List[str], np.ndarray]:
+        """Devolve os ids e vetores dos nodos de um tipo, opcionalmente restritos a algumas regiões."""
+        if regioes is not None:
+            regioes = tuple(regioes)
+        chave_cache = (tipo, regioes)
+        if chave_cache in self._cache:
+            return self._cache[chave_cache]
+
+        # Manter a ordem de inserção para que os empates se resolvam como numa lista ordenada
+        chaves = [c for c in self._ids if c[0] == tipo and (regioes is None or c[1] in regioes)]
+        ids = []
+        blocos = []
+        for chave in chaves:
+            if chave not in self._vetores:
+                self._vetores[chave] = coordenadas_para_vetores(self._coordenadas[chave])
+            ids.extend(self._ids[chave])
+            blocos.append(self._vetores[chave])
+        vetores = np.vstack(blocos) if blocos else np.empty((0, 3))
+
+        self._cache[chave_cache] = (ids, vetores)
+        return ids, vetores
+
+    def k_mais_proximos(self, coordenadas: Tuple[float, float], tipo: str, k: int = 1,
+                        regioes: Optional[Iterable[str]] = None,
+                        excluir: Iterable[str] = ()) -> List[Tuple[str, float]]:
+        """
+        Encontra os k nodos de um tipo mais próximos de umas coordenadas.
+
+        Args:
+            coordenadas (tuple): Par (latitude, longitude) de referência
+            tipo (str): Tipo de nodo a considerar ('base', 'posto', 'hub', 'entrega')
+            k (int): Número de vizinhos a devolver
+            regioes (iterable): Regiões a considerar (todas se None)
+            excluir (iterable): Ids de nodos a ignorar
+
+        Returns:
+            list: Pares (nodo, distância em km) ordenados por distância crescente
+        """
+        ids, vetores = self._candidatos(tipo, regioes)
+        if not ids:
+            return []
+
+        corda = np.linalg.norm(vetores - coordenadas_para_vetores(coordenadas), axis=1)
+        excluir = set(excluir)
+        if excluir:
+            corda[[i for i, node in enumerate(ids) if node in excluir]] = np.inf
+
+        ordem = np.argsort(corda, kind='stable')[:k]
+        distancias = corda_para_km(corda[ordem])
+        return [(ids[i], float(d)) for i, d in zip(ordem, distancias) if np.isfinite(corda[i])]
+
+    def k_mais_proximos_lote(self, coordenadas, tipo: str, k: int = 1,
+                             regioes: Optional[Iterable[str]] = None) -> List[List[str]]:
+        """
+        Versão em lote de k_mais_proximos para várias coordenadas de uma vez.
+
+        Returns:
+            list: Para cada coordenada, a lista dos ids dos k nodos mais próximos
+        """
+        ids, vetores = self._candidatos(tipo, regioes)
+        consultas = coordenadas_para_vetores(coordenadas)
+        if not ids or len(consultas) == 0:
+            return [[] for _ in range(len(consultas))]
+
+        # Para vetores unitários, minimizar a corda equivale a maximizar o produto interno
+        semelhanca = consultas @ vetores.T
+        ordem = np.argsort(-semelhanca, axis=1, kind='stable')[:, :k]
+        return [[ids[i] for i in linha] for linha in ordem.tolist()]
@@ -1,6 +1,6 @@
 # limitacoes_geograficas.py
 from enum import Enum
-from typing import Dict, Set
+from typing import Dict, Iterable, List
 
 class TipoTerreno(Enum):
     URBANO = "urbano"
@@ -9,6 +9,29 @@ class TipoTerreno(Enum):
     COSTEIRO = "costeiro"
     RURAL = "rural"
 
+# Códigos inteiros dos tipos de terreno (-1 = nodo sem terreno definido); o código é
+# também a posição do terreno nas bitmasks de terrenos
+CODIGOS_TERRENO = {t.value: i for i, t in enumerate(TipoTerreno)}
+SEM_TERRENO = -1
+
+
+def codigo_terreno(valor) -> int:
+    """Converte um tipo de terreno (TipoTerreno ou string) no seu código inteiro."""
+    if isinstance(valor, Enum):
+        valor = valor.value
+    return CODIGOS_TERRENO.get(valor, SEM_TERRENO)
+
+
+def mascara_terrenos(terrenos: Iterable) -> int:
+    """Bitmask de um conjunto de tipos de terreno (TipoTerreno ou strings)."""
+    mascara = 0
+    for terreno in terrenos:
+        codigo = codigo_terreno(terreno)
+        if codigo != SEM_TERRENO:
+            mascara |= 1 << codigo
+    return mascara
+
+
 class RestricaoAcesso:
     def __init__(self):
         self.restricoes_veiculo = {
@@ -17,4 +40,28 @@ class RestricaoAcesso:
             "barco": {TipoTerreno.URBANO, TipoTerreno.MONTANHOSO, TipoTerreno.FLORESTAL, TipoTerreno.RURAL},
             "drone": set(),  # Drones podem aceder todos os terrenos
             "helicóptero": {TipoTerreno.COSTEIRO}  # Helicópteros não podem aceder terrenos costeiros
-        }
\ No newline at end of file
+        }
+        # Matriz de compatibilidade compilada a partir das restrições: tipo de veículo ->
+        # bitmask dos terrenos permitidos. É a única tabela usada pelas buscas e pela simulação.
+        todos = (1 << len(TipoTerreno)) - 1
+        self.compatibilidade: Dict[str, int] = {
+            tipo: todos & ~mascara_terrenos(restricoes) for tipo, restricoes in self.restricoes_veiculo.items()
+        }
+        self._evitar: Dict[str, List[str]] = {
+            tipo: [t.value for t in TipoTerreno if t in restricoes]
+            for tipo, restricoes in self.restricoes_veiculo.items()
+        }
+
+    def terrenos_evitar(self, tipo_veiculo: str) -> List[str]:
+        """Tipos de terreno (valores) que um tipo de veículo deve evitar, na forma usada pelas buscas."""
+        return self._evitar.get(tipo_veiculo, [])
+
+    def compativel(self, tipo_veiculo: str, terreno) -> bool:
+        """
+        Indica se um tipo de veículo pode aceder a um tipo de terreno (TipoTerreno ou string).
+
+        Um nodo sem terreno definido (bases e postos) é acessível a todos os veículos,
+        tal como em GrafoCSR.nodos_proibidos.
+        """
+        codigo = codigo_terreno(terreno)
+        return codigo == SEM_TERRENO or bool(self.compatibilidade.get(tipo_veiculo, 0) >> codigo & 1)
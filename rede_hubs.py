@@ -0,0 +1,219 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from grafo_csr import GrafoCSR
+from limitacoes_geograficas import mascara_terrenos
+
+# Tipos de nodo que formam a rede principal (backbone)
+TIPOS_BACKBONE = ('base', 'posto', 'hub')
+
+
+class RoteadorHubs:
+    """
+    Roteador a dois níveis: tabelas completas sobre o backbone e ligações das folhas.
+
+    O backbone é formado pelas bases, postos e hubs. Os restantes nodos (pontos
+    de entrega) só se ligam a nodos do backbone, pelo que um caminho entre dois
+    nodos quaisquer é: ligação de saída da origem, caminho no backbone, ligação
+    de entrada no destino. Um ponto de entrega também pode servir de passagem
+    entre dois hubs (hub -> PE -> hub); essas passagens entram no backbone como
+    arestas virtuais.
+
+    Para cada conjunto de terrenos a evitar é calculada, com Floyd-Warshall em
+    NumPy, a tabela de custos mínimos entre todos os pares do backbone, o tempo
+    dos respetivos caminhos e o próximo salto. Uma consulta é o mínimo, sobre as
+    poucas ligações da origem e do destino, do custo das ligações mais o valor
+    da tabela. Quando o CSR muda de versão as tabelas só são recalculadas se os
+    pesos das arestas do backbone (ou das passagens) tiverem mudado.
+    """
+
+    def __init__(self, csr: GrafoCSR, tipos_backbone: Iterable[str] = TIPOS_BACKBONE):
+        self.csr = csr
+        self.tipos_backbone = tuple(tipos_backbone)
+        self._estruturar()
+
+    def _estruturar(self):
+        """Separa o backbone das folhas e verifica que as folhas só se ligam ao backbone."""
+        csr = self.csr
+        offsets, destinos, _, _ = csr.listas()
+        offsets_inv, origens_inv, _ = csr.listas_inversas()
+
+        self.backbone: List[int] = [i for i, nome in enumerate(csr.nomes)
+                                    if csr.grafo.nodes[nome].get('tipo') in self.tipos_backbone]
+        self.posicao: Dict[int, int] = {n: i for i, n in enumerate(self.backbone)}
+
+        for n in range(len(csr)):
+            if n in self.posicao:
+                continue
+            vizinhos = destinos[offsets[n]:offsets[n + 1]] + origens_inv[offsets_inv[n]:offsets_inv[n + 1]]
+            if any(v not in self.posicao for v in vizinhos):
+                raise ValueError(f"O nodo {csr.nomes[n]} liga-se a nodos fora do backbone")
+
+        self._posicao_array = np.full(len(csr), -1, dtype=np.int64)
+        self._posicao_array[self.backbone] = np.arange(len(self.backbone))
+        self._origens = np.repeat(np.arange(len(csr), dtype=np.int64), np.diff(csr.offsets))
+        self._offsets_csr = csr.offsets
+        self._versao = csr.versao
+        self._tabelas: Dict[int, Tuple] = {}
+
+    def _pesos_backbone(self, evitar: Iterable[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Matrizes de custo e tempo das arestas diretas entre nodos do backbone,
+        incluindo as passagens por folhas, e a folha usada em cada passagem (-1 se direta).
+
+        Calculadas sobre os arrays do CSR: para cada par fica a aresta (ou passagem)
+        de menor custo, e uma passagem só substitui uma aresta direta se for mais barata.
+        """
+        csr = self.csr
+        custo, tempo, destinos = csr.custo, csr.tempo, csr.destinos
+        permitida = np.array(csr.arestas_permitidas(evitar), dtype=bool)
+        n = len(self.backbone)
+        pesos = np.full((n, n), np.inf)
+        tempos = np.full((n, n), np.inf)
+        pontes = np.full((n, n), -1, dtype=np.int64)
+        np.fill_diagonal(pesos, 0.0)
+        np.fill_diagonal(tempos, 0.0)
+
+        # Posição no backbone da origem e do destino de cada aresta (-1 para folhas)
+        pu = self._posicao_array[self._origens]
+        pv = self._posicao_array[destinos]
+
+        def escrever(i, j, c, t, ponte):
+            # Mínimo por par (i, j): o primeiro após ordenar por custo, e só se melhorar o atual
+            ordem = np.argsort(c, kind='stable')
+            _, primeiro = np.unique(i[ordem] * n + j[ordem], return_index=True)
+            sel = ordem[primeiro]
+            sel = sel[c[sel] < pesos[i[sel], j[sel]]]
+            pesos[i[sel], j[sel]] = c[sel]
+            tempos[i[sel], j[sel]] = t[sel]
+            pontes[i[sel], j[sel]] = ponte[sel]
+
+        diretas = np.flatnonzero(permitida & (pu >= 0) & (pv >= 0))
+        escrever(pu[diretas], pv[diretas], custo[diretas], tempo[diretas], np.full(len(diretas), -1))
+
+        # Passagens hub -> folha -> hub como arestas virtuais: cada entrada numa folha
+        # combinada com cada saída da mesma folha
+        entradas = np.flatnonzero(permitida & (pv < 0))
+        saidas = np.flatnonzero(permitida & (pu < 0))
+        saidas = saidas[np.argsort(self._origens[saidas], kind='stable')]
+        graus = np.bincount(self._origens[saidas], minlength=len(csr))
+        inicio_saidas = np.cumsum(graus) - graus
+        folha = destinos[entradas].astype(np.int64)
+        repeticoes = graus[folha]
+        e_in = np.repeat(entradas, repeticoes)
+        deslocamento = np.arange(int(repeticoes.sum())) - np.repeat(np.cumsum(repeticoes) - repeticoes, repeticoes)
+        e_out = saidas[np.repeat(inicio_saidas[folha], repeticoes) + deslocamento]
+        escrever(pu[e_in], pv[e_out], custo[e_in] + custo[e_out], tempo[e_in] + tempo[e_out],
+                 destinos[e_in].astype(np.int64))
+        return pesos, tempos, pontes
+
+    def _tabela(self, evitar: Iterable[str]):
+        """Devolve (custos, tempos, proximo, pontes) do backbone para uma classe de terrenos a evitar."""
+        csr = self.csr
+        if csr.offsets is not self._offsets_csr:
+            self._estruturar()
+        classe = mascara_terrenos(evitar)
+        tabela = self._tabelas.get(classe)
+        if tabela is not None and tabela[0] == csr.versao:
+            return tabela[1]
+
+        pesos, tempos, pontes = self._pesos_backbone(evitar)
+        if tabela is not None and np.array_equal(tabela[2], pesos) and np.array_equal(tabela[3], tempos):
+            # Nenhum peso do backbone mudou: a tabela mantém-se válida
+            self._tabelas[classe] = (csr.versao,) + tabela[1:]
+            return tabela[1]
+
+        custos = pesos.copy()
+        tempos_caminho = tempos.copy()
+        n = len(self.backbone)
+        proximo = np.where(np.isfinite(pesos), np.arange(n)[None, :], -1)
+        for k in range(n):
+            alternativa = custos[:, k, None] + custos[None, k, :]
+            melhora = alternativa < custos
+            custos = np.where(melhora, alternativa, custos)
+            tempos_caminho = np.where(melhora, tempos_caminho[:, k, None] + tempos_caminho[None, k, :], tempos_caminho)
+            proximo = np.where(melhora, proximo[:, k, None], proximo)
+
+        resultado = (custos, tempos_caminho, proximo, pontes)
+        self._tabelas[classe] = (csr.versao, resultado, pesos, tempos)
+        return resultado
+
+    def _ligacoes(self, nodo: int, saida: bool, evitar: Iterable[str]) -> List[Tuple[int, float, float]]:
+        """Ligações (posição no backbone, custo, tempo) de saída ou de entrada de um nodo."""
+        if nodo in self.posicao:
+            return [(self.posicao[nodo], 0.0, 0.0)]
+        csr = self.csr
+        _, _, custo, _ = csr.listas()
+        permitida = csr.arestas_permitidas(evitar)
+        ligacoes = []
+        if saida:
+            offsets, destinos, _, _ = csr.listas()
+            for e in range(offsets[nodo], offsets[nodo + 1]):
+                if permitida[e]:
+                    ligacoes.append((self.posicao[destinos[e]], custo[e], csr.tempo[e]))
+        else:
+            offsets_inv, origens_inv, arestas_inv = csr.listas_inversas()
+            for k in range(offsets_inv[nodo], offsets_inv[nodo + 1]):
+                e = arestas_inv[k]
+                if permitida[e]:
+                    ligacoes.append((self.posicao[origens_inv[k]], custo[e], csr.tempo[e]))
+        return ligacoes
+
+    def _melhor_par(self, inicio: int, objetivo: int, evitar: Iterable[str]):
+        """Escolhe as ligações de saída e de entrada que minimizam o custo total."""
+        custos, tempos, proximo, pontes = self._tabela(evitar)
+        saidas = self._ligacoes(inicio, True, evitar)
+        entradas = self._ligacoes(objetivo, False, evitar)
+        if not saidas or not entradas:
+            return None
+
+        a = np.array([s[0] for s in saidas])
+        b = np.array([t[0] for t in entradas])
+        total = (np.array([s[1] for s in saidas])[:, None] + custos[np.ix_(a, b)]
+                 + np.array([t[1] for t in entradas])[None, :])
+        i, j = np.unravel_index(np.argmin(total), total.shape)
+        if not np.isfinite(total[i, j]):
+            return None
+        tempo = saidas[i][2] + tempos[a[i], b[j]] + entradas[j][2]
+        return float(total[i, j]), float(tempo), int(a[i]), int(b[j]), proximo, pontes
+
+    def custo_tempo(self, inicio: str, objetivo: str, evitar: List[str] = []) -> Optional[Tuple[float, float]]:
+        """Custo mínimo e tempo do respetivo caminho entre dois nodos, sem construir o caminho."""
+        if inicio == objetivo:
+            return 0.0, 0.0
+        melhor = self._melhor_par(self.csr.indice[inicio], self.csr.indice[objetivo], evitar)
+        return None if melhor is None else melhor[:2]
+
+    def busca(self, inicio: str, objetivo: str, evitar: List[str] = []) -> Optional[List[str]]:
+        """
+        Caminho de custo mínimo entre dois nodos, com a mesma regra de bloqueios e
+        terrenos a evitar das buscas de algoritmos_busca.
+
+        Returns:
+            list: Nomes dos nodos do caminho, ou None se não existir caminho
+        """
+        csr = self.csr
+        if inicio not in csr or objetivo not in csr:
+            print(f"Nodo inicial {inicio} ou objetivo {objetivo} não encontrado no grafo")
+            return None
+        if inicio == objetivo:
+            return [inicio]
+
+        i_inicio, i_objetivo = csr.indice[inicio], csr.indice[objetivo]
+        melhor = self._melhor_par(i_inicio, i_objetivo, evitar)
+        if melhor is None:
+            print(f"Não foi encontrado caminho entre {inicio} e {objetivo}")
+            return None
+
+        _, _, a, b, proximo, pontes = melhor
+        caminho = [] if i_inicio in self.posicao else [i_inicio]
+        caminho.append(self.backbone[a])
+        while a != b:
+            seguinte = int(proximo[a, b])
+            if pontes[a, seguinte] >= 0:
+                caminho.append(int(pontes[a, seguinte]))
+            caminho.append(self.backbone[seguinte])
+            a = seguinte
+        if i_objetivo not in self.posicao:
+            caminho.append(i_objetivo)
+        return csr.caminho_para_nomes(caminho)
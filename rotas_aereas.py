@@ -0,0 +1,202 @@
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from grafo_csr import GrafoCSR
+from condicoes_meteorologicas import CondicaoMeteorologica
+from distancias import haversine_vetorizado, matriz_distancias
+from avaliacao_rotas import MARGEM_COMBUSTIVEL
+
+# Velocidade (km/h), consumo (combustível por km) e condições em que o tipo não pode voar
+PARAMETROS_AEREOS = {
+    "drone": {
+        "velocidade": 90.0,
+        "consumo": 0.2,
+        "condicoes_proibidas": {CondicaoMeteorologica.NEVOEIRO, CondicaoMeteorologica.CHUVA_FORTE,
+                                CondicaoMeteorologica.TEMPESTADE, CondicaoMeteorologica.NEVE},
+    },
+    "helicóptero": {
+        "velocidade": 220.0,
+        "consumo": 0.5,
+        "condicoes_proibidas": {CondicaoMeteorologica.CHUVA_FORTE, CondicaoMeteorologica.TEMPESTADE,
+                                CondicaoMeteorologica.NEVE},
+    },
+}
+
+# Distância máxima entre pontos amostrados ao longo de uma perna no teste de espaço aéreo fechado
+PASSO_AMOSTRAGEM_KM = 10.0
+
+
+class PlaneadorAereo:
+    """
+    Planeamento de voos diretos para drones e helicópteros.
+
+    Em vez de seguirem a rede terrestre, os veículos aéreos voam em linha reta
+    (ortodrómica) entre a origem e o destino: a distância é a de haversine e o
+    custo e o tempo resultam do consumo e da velocidade de cada tipo. Uma perna
+    não pode atravessar regiões cuja condição meteorológica proíba o voo desse
+    tipo de veículo; o teste é feito sobre pontos amostrados ao longo da perna.
+
+    Só é inserida uma paragem num posto quando o voo direto não é possível, por
+    falta de combustível ou por atravessar espaço aéreo fechado. Todo o
+    planeamento é geometria vetorizada sobre as coordenadas, sem busca no grafo.
+    """
+
+    def __init__(self, csr: GrafoCSR, regioes: Dict[str, Dict[str, float]], gestor_meteo=None):
+        """
+        Args:
+            csr: Vista CSR do grafo (nomes e coordenadas dos nodos)
+            regioes: Limites de cada região (min_lat, max_lat, min_lon, max_lon)
+            gestor_meteo: GestorMeteorologico com as condições por região; sem gestor
+                não há espaço aéreo fechado
+        """
+        self.csr = csr
+        self.gestor_meteo = gestor_meteo
+        self.nomes_regioes = list(regioes)
+        self.limites = np.array([[b['min_lat'], b['max_lat'], b['min_lon'], b['max_lon']]
+                                 for b in regioes.values()])
+        self.centros = np.column_stack(((self.limites[:, 0] + self.limites[:, 1]) / 2,
+                                        (self.limites[:, 2] + self.limites[:, 3]) / 2))
+        self.postos = [nome for nome in csr.nomes if csr.grafo.nodes[nome].get('tipo') == 'posto']
+
+    def e_aereo(self, tipo: str) -> bool:
+        """Indica se o tipo de veículo usa o modo de voo direto."""
+        return tipo in PARAMETROS_AEREOS
+
+    def _coordenadas(self, nodos: Iterable[str]) -> np.ndarray:
+        return self.csr.coordenadas[[self.csr.indice[n] for n in nodos]].reshape(-1, 2)
+
+    def _regioes_fechadas(self, tipo: str) -> List[int]:
+        """Índices das regiões cuja condição atual proíbe o voo do tipo de veículo."""
+        if self.gestor_meteo is None:
+            return []
+        proibidas = PARAMETROS_AEREOS[tipo]["condicoes_proibidas"]
+        condicoes = self.gestor_meteo.condicoes_por_regiao
+        return [i for i, regiao in enumerate(self.nomes_regioes)
+                if condicoes.get(regiao, CondicaoMeteorologica.NORMAL) in proibidas]
+
+    def _regiao_pontos(self, pontos: np.ndarray) -> np.ndarray:
+        """
+        Região de cada ponto, com a mesma regra de PortugalDistributionGraph._determinar_regiao:
+        a primeira região que contém o ponto ou, fora de todas, a de centro mais próximo.
+        """
+        lat, lon = pontos[:, 0, None], pontos[:, 1, None]
+        dentro = ((self.limites[:, 0] <= lat) & (lat <= self.limites[:, 1])
+                  & (self.limites[:, 2] <= lon) & (lon <= self.limites[:, 3]))
+        regiao = np.argmax(dentro, axis=1)
+        fora = ~dentro.any(axis=1)
+        if fora.any():
+            regiao[fora] = np.argmin(matriz_distancias(pontos[fora], self.centros), axis=1)
+        return regiao
+
+    def _pernas_livres(self, origens: np.ndarray, destinos: np.ndarray, fechadas: List[int]) -> np.ndarray:
+        """Indica, para cada perna origens[i] -> destinos[i], se não atravessa nenhuma região fechada."""
+        if not fechadas or len(origens) == 0:
+            return np.ones(len(origens), dtype=bool)
+        distancias = haversine_vetorizado(origens, destinos)
+        num_pontos = max(2, int(math.ceil(distancias.max() / PASSO_AMOSTRAGEM_KM)) + 1)
+        # Interpolação linear em latitude/longitude, suficiente à escala do país
+        t = np.linspace(0.0, 1.0, num_pontos)[None, :, None]
+        pontos = origens[:, None, :] + t * (destinos - origens)[:, None, :]
+        regioes = self._regiao_pontos(pontos.reshape(-1, 2)).reshape(len(origens), num_pontos)
+        return ~np.isin(regioes, fechadas).any(axis=1)
+
+    def custo_tempo(self, tipo: str, rota: List[str]) -> Tuple[float, float]:
+        """Custo (combustível) e tempo (horas) de uma rota aérea, perna a perna."""
+        if len(rota) < 2:
+            return 0.0, 0.0
+        coords = self._coordenadas(rota)
+        distancia = float(haversine_vetorizado(coords[:-1], coords[1:]).sum())
+        parametros = PARAMETROS_AEREOS[tipo]
+        return distancia * parametros["consumo"], distancia / parametros["velocidade"]
+
+    def autonomia_suficiente(self, veiculo: Dict, rota: List[str]) -> bool:
+        """
+        Verifica o combustível de cada troço entre paragens: o primeiro com o combustível
+        atual, os seguintes com a autonomia completa reposta no posto.
+        """
+        if not rota:
+            return False
+        disponivel = veiculo["combustivel"]
+        inicio = 0
+        for i in range(1, len(rota)):
+            if i == len(rota) - 1 or "POSTO_" in rota[i]:
+                custo, _ = self.custo_tempo(veiculo["tipo"], rota[inicio:i + 1])
+                if custo * MARGEM_COMBUSTIVEL > disponivel:
+                    return False
+                disponivel = veiculo["autonomia"]
+                inicio = i
+        return True
+
+    def planear(self, veiculo: Dict, destinos: List[str]) -> Dict[str, Tuple[float, List[str]]]:
+        """
+        Rotas aéreas da localização do veículo para cada destino.
+
+        O voo direto é usado sempre que o combustível e o espaço aéreo o permitem;
+        caso contrário é escolhido o posto que minimiza a distância total com as
+        duas pernas possíveis (a segunda com o depósito cheio).
+
+        Returns:
+            dict: Destino -> (custo total, rota), só para os destinos alcançáveis
+        """
+        if not destinos:
+            return {}
+        tipo = veiculo["tipo"]
+        inicio = veiculo["localizacao"]
+        consumo = PARAMETROS_AEREOS[tipo]["consumo"] * MARGEM_COMBUSTIVEL
+        fechadas = self._regioes_fechadas(tipo)
+        origem = self._coordenadas([inicio])
+        coords = self._coordenadas(destinos)
+
+        distancia = matriz_distancias(origem, coords)[0]
+        direto = (distancia * consumo <= veiculo["combustivel"]) & self._pernas_livres(
+            np.repeat(origem, len(destinos), axis=0), coords, fechadas)
+        rotas = {destino: (float(d) * PARAMETROS_AEREOS[tipo]["consumo"], [inicio, destino])
+                 for destino, d, ok in zip(destinos, distancia, direto) if ok}
+
+        restantes = np.flatnonzero(~direto)
+        postos = [p for p in self.postos if p != inicio]
+        if len(restantes) == 0 or not postos:
+            return rotas
+
+        # Uma paragem: perna origem -> posto com o combustível atual, posto -> destino com o depósito cheio
+        coords_postos = self._coordenadas(postos)
+        ate_posto = matriz_distancias(origem, coords_postos)[0]
+        primeira = (ate_posto * consumo <= veiculo["combustivel"]) & self._pernas_livres(
+            np.repeat(origem, len(postos), axis=0), coords_postos, fechadas)
+        if not primeira.any():
+            return rotas
+        coords_postos = coords_postos[primeira]
+        ate_posto = ate_posto[primeira]
+        postos = [p for p, ok in zip(postos, primeira) if ok]
+
+        coords_restantes = coords[restantes]
+        do_posto = matriz_distancias(coords_postos, coords_restantes)
+        livres = self._pernas_livres(
+            np.repeat(coords_postos, len(restantes), axis=0),
+            np.tile(coords_restantes, (len(postos), 1)), fechadas).reshape(do_posto.shape)
+        total = np.where(livres & (do_posto * consumo <= veiculo["autonomia"]),
+                         ate_posto[:, None] + do_posto, np.inf)
+        melhor = np.argmin(total, axis=0)
+        for j, i in enumerate(restantes):
+            if np.isfinite(total[melhor[j], j]):
+                destino = destinos[i]
+                custo = float(total[melhor[j], j]) * PARAMETROS_AEREOS[tipo]["consumo"]
+                rotas[destino] = (custo, [inicio, postos[melhor[j]], destino])
+        return rotas
+
+    def rota_reabastecimento(self, veiculo: Dict) -> Optional[List[str]]:
+        """Voo direto até ao posto mais próximo ao alcance e com espaço aéreo aberto."""
+        postos = [p for p in self.postos if p != veiculo["localizacao"]]
+        if not postos:
+            return None
+        origem = self._coordenadas([veiculo["localizacao"]])
+        coords_postos = self._coordenadas(postos)
+        distancia = matriz_distancias(origem, coords_postos)[0]
+        consumo = PARAMETROS_AEREOS[veiculo["tipo"]]["consumo"] * MARGEM_COMBUSTIVEL
+        possivel = (distancia * consumo <= veiculo["combustivel"]) & self._pernas_livres(
+            np.repeat(origem, len(postos), axis=0), coords_postos, self._regioes_fechadas(veiculo["tipo"]))
+        if not possivel.any():
+            return None
+        melhor = int(np.argmin(np.where(possivel, distancia, np.inf)))
+        return [veiculo["localizacao"], postos[melhor]]
@@ -1,5 +1,5 @@
 from turtle import pos
-from typing import Dict, List, Counter
+from typing import Dict, List, Tuple, Counter
 import networkx as nx
 from estado_inicial import estado_inicial, inicializar_zonas_afetadas
 from criar_grafo import PortugalDistributionGraph
@@ -8,6 +8,7 @@ from condicoes_meteorologicas import GestorMeteorologico, CondicaoMeteorologica
 from eventos_dinamicos import GestorEventos
 from limitacoes_geograficas import RestricaoAcesso, TipoTerreno
 from gestao_recursos import PlaneadorReabastecimento
+from avaliacao_rotas import AvaliadorRotas, MARGEM_COMBUSTIVEL
 from janela_tempo import JanelaTempoZona, PrioridadeZona
 from datetime import datetime, timedelta
 import time
@@ -18,19 +19,22 @@ import heapq
 class SimulacaoEmergencia:
     def __init__(self, grafo: nx.DiGraph):
         self.grafo = grafo
-        self.gestor_meteo = GestorMeteorologico(self.grafo)
-        self.gestor_eventos = GestorEventos(self.grafo)
+        self.gestor_meteo = GestorMeteorologico(self.grafo, seed=random.getrandbits(32))
+        self.gestor_eventos = GestorEventos(self.grafo, seed=random.getrandbits(32))
         self.estado = estado_inicial.copy()
         self.estado["zonas_afetadas"] = inicializar_zonas_afetadas(self.grafo)
-        self.busca = BuscaEmergencia(self.grafo, self.estado)
+        self.busca = BuscaEmergencia(self.grafo, self.estado, gestor_meteo=self.gestor_meteo)
         self.restricao_acesso = RestricaoAcesso()
-        self.planeador_reabastecimento = PlaneadorReabastecimento(self.grafo)
+        self.planeador_reabastecimento = PlaneadorReabastecimento(self.grafo, self.busca.grafo_csr)
+        # Custo, tempo e impacto dos eventos das rotas, avaliados sobre os arrays de arestas do CSR
+        self.avaliador_rotas = AvaliadorRotas(self.busca.grafo_csr, self.gestor_eventos)
         self.estatisticas = self._inicializar_estatisticas()
         self.fila_prioridades = []  # Nova fila de prioridades para zonas críticas
         
         # Initialize components
         self._inicializar_postos_reabastecimento()
         self._inicializar_terrenos()
+        self.busca.grafo_csr.atualizar()
         self._atualizar_fila_prioridades()  # Nova função para inicializar a fila
 
     def _inicializar_estatisticas(self) -> Dict:
@@ -206,23 +210,29 @@ class SimulacaoEmergencia:
                 self.estatisticas['entregas_realizadas']
             )
             
-    def _calcula_custo(self, rota: List, grafo: nx.DiGraph, idx_inicial: int = 0, idx_final: int = -1) -> float:
-        """Calcula o custo total de uma rota."""
-        if idx_final == -1:
-            idx_final = len(rota) - 1
-        impactos = self.gestor_eventos.get_impacto_total(rota)
-        return sum(
-            self.grafo[rota[i]][rota[i + 1]]['custo'] for i in range(idx_inicial, idx_final)
-        ) * max(1.0, impactos['impacto_custo'] * 0.6)
-
-    def _calcula_tempo(self, rota: List, grafo: nx.DiGraph, idx_inicial: int = 0, idx_final: int = -1) -> float:
-        """Calcula o tempo total de uma rota."""
-        if idx_final == -1:
-            idx_final = len(rota) - 1
-        impactos = self.gestor_eventos.get_impacto_total(rota)
-        return sum(
-            self.grafo[rota[i]][rota[i + 1]]['tempo'] for i in range(idx_inicial, idx_final)
-        ) * max(1.0, impactos['impacto_tempo'] * 0.6)
+    def _avaliar_rota(self, rota: List[str], veiculo: Dict, cortes: List[int] = ()) -> Tuple[float, float, List[float]]:
+        """
+        Custo e tempo de uma rota, com o impacto dos obstáculos e eventos, e o custo de cada troço.
+
+        O troço k vai de rota[cortes[k]] a rota[cortes[k + 1]] e usa o fator de impacto
+        da rota completa. A rota e os troços são avaliados num único lote sobre os
+        arrays de arestas do CSR; os veículos aéreos usam o voo direto perna a perna.
+
+        Returns:
+            tuple: (custo total, tempo total, custos dos troços)
+        """
+        trocos = list(zip(cortes, cortes[1:]))
+        if self.busca.planeador_aereo.e_aereo(veiculo['tipo']):
+            planeador = self.busca.planeador_aereo
+            custo, tempo = planeador.custo_tempo(veiculo['tipo'], rota)
+            return custo, tempo, [planeador.custo_tempo(veiculo['tipo'], rota[i:j + 1])[0] for i, j in trocos]
+
+        ids = self.avaliador_rotas.ids_arestas(rota)
+        metricas = self.avaliador_rotas.avaliar_lote([ids] + [ids[i:j] for i, j in trocos])
+        fator_custo = max(1.0, metricas['impacto_custo'][0] * 0.6)
+        fator_tempo = max(1.0, metricas['impacto_tempo'][0] * 0.6)
+        return (float(metricas['custo'][0]) * fator_custo, float(metricas['tempo'][0]) * fator_tempo,
+                (metricas['custo'][1:] * fator_custo).tolist())
 
     def simular_reabastecimento(self, veiculo: Dict, rota: List[str], custo_total: float) -> bool:
         """Tenta realizar um reabastecimento."""
@@ -233,17 +243,19 @@ class SimulacaoEmergencia:
         
         destino = rota[-1]
         
-        combustivel_necessario_viagem_completa = custo_total * 1.1
+        combustivel_necessario_viagem_completa = custo_total * MARGEM_COMBUSTIVEL
         if combustivel_necessario_viagem_completa > veiculo['combustivel']:
             print(f"Reabastecimento falhou: combustível insuficiente ({veiculo['combustivel']:.2f} < {combustivel_necessario_viagem_completa:.2f})")
             self.estatisticas['falhas_por_combustivel'] = self.estatisticas.get('falhas_por_combustivel', 0) + 1
             return False
         
         # Verificar compatibilidade de terreno e atualizar estatísticas
+        proibido = self.busca.grafo_csr.nodos_proibidos(self.restricao_acesso.terrenos_evitar(veiculo['tipo']))
+        indice = self.busca.grafo_csr.indice
         for node in rota:
-            if node in self.grafo and not any(posto in node for posto in ['POSTO_', 'BASE_']):
-                terreno = self.grafo.nodes[node].get('tipo_terreno', 'urbano')
-                if not self._verificar_compatibilidade_terreno(veiculo['tipo'], terreno):
+            if node in indice and not any(posto in node for posto in ['POSTO_', 'BASE_']):
+                if proibido[indice[node]]:
+                    terreno = self.grafo.nodes[node].get('tipo_terreno')
                     print(f"Entrega falhou: veículo {veiculo['tipo']} incompatível com terreno {terreno} em {node}")
                     self.estatisticas['falhas_por_terreno'] += 1
                     return False
@@ -275,7 +287,7 @@ class SimulacaoEmergencia:
         
         def _simular_viagem(rota: List[str], veiculo: Dict, destino, custo) -> bool:
             # O parâmetro custo agora é usado ao invés de custo_total
-            combustivel_necessario_viagem = custo * 1.1  # Usando o custo passado como parâmetro
+            combustivel_necessario_viagem = custo * MARGEM_COMBUSTIVEL  # Usando o custo passado como parâmetro
             if combustivel_necessario_viagem > veiculo['combustivel']:
                 print(f"Entrega falhou: combustível insuficiente ({veiculo['combustivel']:.2f} < {combustivel_necessario_viagem:.2f})")
                 self.estatisticas['falhas_por_combustivel'] = self.estatisticas.get('falhas_por_combustivel', 0) + 1
@@ -301,10 +313,12 @@ class SimulacaoEmergencia:
                 self.estatisticas['total_tempo_restante'] += janela.tempo_restante()
 
             # Verificar compatibilidade de terreno e atualizar estatísticas
+            proibido = self.busca.grafo_csr.nodos_proibidos(self.restricao_acesso.terrenos_evitar(veiculo['tipo']))
+            indice = self.busca.grafo_csr.indice
             for node in rota:
-                if node in self.grafo and not any(posto in node for posto in ['POSTO_', 'BASE_']):
-                    terreno = self.grafo.nodes[node].get('tipo_terreno', 'urbano')
-                    if not self._verificar_compatibilidade_terreno(veiculo['tipo'], terreno):
+                if node in indice and not any(posto in node for posto in ['POSTO_', 'BASE_']):
+                    if proibido[indice[node]]:
+                        terreno = self.grafo.nodes[node].get('tipo_terreno')
                         print(f"Entrega falhou: veículo {veiculo['tipo']} incompatível com terreno {terreno} em {node}")
                         self.estatisticas['falhas_por_terreno'] += 1
                         return False
@@ -343,17 +357,15 @@ class SimulacaoEmergencia:
         for node in rota:
             if "POSTO_" in node:
                 reabastece_durante_entrega = True
-                postos_na_rota.append([node, 0, 0])
+                postos_na_rota.append((node, rota.index(node)))
         
         partes_entrega = []
         if reabastece_durante_entrega:
-            for i in range(len(postos_na_rota)):
-                posto = postos_na_rota[i]
-                posto[1] = rota.index(posto[0])
-                idx_anterior = postos_na_rota[i - 1][1] if i > 0 else 0
-                posto[2] = self._calcula_custo(rota, self.grafo, idx_anterior, posto[1])
-                partes_entrega.append((rota[idx_anterior:posto[1] + 1], posto[0], posto[2]))
-            partes_entrega.append((rota[postos_na_rota[-1][1]:], rota[-1], custo_total))
+            # Troços entre paragens; depois da última paragem só conta o troço restante
+            cortes = [0] + [indice for _, indice in postos_na_rota] + [len(rota) - 1]
+            _, _, custos_trocos = self._avaliar_rota(rota, veiculo, cortes)
+            for (inicio, fim), custo in zip(zip(cortes, cortes[1:]), custos_trocos):
+                partes_entrega.append((rota[inicio:fim + 1], rota[fim], custo))
         else:
             partes_entrega.append((rota, rota[-1], custo_total))
 
@@ -386,78 +398,74 @@ class SimulacaoEmergencia:
         return True
 
 
-    def _verificar_compatibilidade_terreno(self, tipo_veiculo: str, terreno: str) -> bool:
-        """Define compatibilidade entre tipos de veículos e terrenos."""
-        compatibilidade = {
-            'camião': {'urbano', 'rural'},
-            'drone': {'urbano', 'rural', 'montanhoso', 'florestal', 'costeiro'},
-            'helicóptero': {'urbano', 'rural', 'montanhoso', 'florestal'},
-            'barco': {'costeiro'},
-            'camioneta': {'urbano', 'rural', 'florestal'}
-        }
-        return terreno in compatibilidade.get(tipo_veiculo, set())
-    
-    
     def executar_simulacao(self, num_ciclos: int):
         print(f"Iniciando simulação com {num_ciclos} ciclos...\n")
         
         for ciclo in range(num_ciclos):
             print(f"\n=== Ciclo {ciclo + 1} ===")
 
+            # Arestas cujo peso mudou neste ciclo (u, v, custo antigo, custo novo)
+            alteracoes = []
+
             # Atualizar condições meteorológicas
             if ciclo % 5 == 0:
-                self.gestor_meteo.atualizar_condicoes()
+                alteracoes += self.gestor_meteo.atualizar_condicoes()
 
             # Atualizar eventos dinâmicos
             self.gestor_eventos.gerar_eventos_aleatorios(prob_novo_evento=0.3)
             self.gestor_eventos.atualizar_eventos()
-            self.gestor_eventos.aplicar_efeitos()
+            alteracoes += self.gestor_eventos.aplicar_efeitos()
+
+            # Refletir apenas as arestas alteradas na vista CSR e nas buscas incrementais
+            self.busca.aplicar_alteracoes(alteracoes)
+
+            # Rotas de entrega planeadas em lote, já com as paragens nos postos que o combustível exigir
+            veiculos = self.busca.estado["veiculos"]
+            rotas_planeadas = self.busca.planear_lote(veiculos)
 
             # Processar cada veículo
-            for veiculo in self.busca.estado["veiculos"]:
+            for veiculo in veiculos:
                 print(f"\nPlaneando rota para {veiculo['tipo']} (ID: {veiculo['id']})")
-                
-                necessita_reabastecimento, rota_reabastecimento = (
-                    self.planeador_reabastecimento.calcular_proximo_reabastecimento(
-                        veiculo, [veiculo['localizacao']]
-                    )
-                )
-                # Verificar necessidade de reabastecimento (60% da autonomia)
-                if necessita_reabastecimento:   
-                    self.estatisticas['tentativas_reabastecimento'] += 1
-                    print(f"Veículo {veiculo['id']} com combustível baixo: {veiculo['combustivel']:.2f}")
-
-                    if rota_reabastecimento:
+
+                rota = rotas_planeadas[veiculo['id']]
+                if not rota:
+                    # Sem entrega possível: reabastecer se o combustível estiver abaixo de 60% da autonomia
+                    aereo = self.busca.planeador_aereo.e_aereo(veiculo['tipo'])
+                    if aereo:
+                        # Voo direto até ao posto, com o consumo por km do veículo aéreo
+                        rota_reabastecimento = None
+                        if self.planeador_reabastecimento.necessita_reabastecimento(veiculo):
+                            rota_reabastecimento = self.busca.planear_reabastecimento(veiculo)
+                        necessita_reabastecimento = rota_reabastecimento is not None
+                    else:
+                        necessita_reabastecimento, rota_reabastecimento = \
+                            self.planeador_reabastecimento.calcular_proximo_reabastecimento(
+                                veiculo, [veiculo['localizacao']]
+                            )
+                    if necessita_reabastecimento:
+                        self.estatisticas['tentativas_reabastecimento'] += 1
+                        print(f"Veículo {veiculo['id']} com combustível baixo: {veiculo['combustivel']:.2f}")
                         print(f"Rota de reabastecimento encontrada: {rota_reabastecimento}")
-                        
+
                         # Calcular custo total da rota até o posto
-                        custo_total = sum(self.grafo[rota_reabastecimento[i]][rota_reabastecimento[i + 1]]['custo']
-                                        for i in range(len(rota_reabastecimento) - 1))
-                        
+                        if aereo:
+                            custo_total, _, _ = self._avaliar_rota(rota_reabastecimento, veiculo)
+                        else:
+                            custo_total = self.avaliador_rotas.avaliar(
+                                self.avaliador_rotas.ids_arestas(rota_reabastecimento))['custo']
+
                         # Tentar realizar o reabastecimento
-                        if self.simular_reabastecimento(veiculo, rota_reabastecimento, custo_total):
-                            self.estatisticas['reabastecimentos_falhados'] += 1
-                            continue
-                        
+                        if not self.simular_reabastecimento(veiculo, rota_reabastecimento, custo_total):
+                            print(f"Falha no reabastecimento: não foi possível alcançar o posto")
                         self.estatisticas['reabastecimentos_falhados'] += 1
-                        print(f"Falha no reabastecimento: não foi possível alcançar o posto")
-                        continue
-                    else:
-                        self.estatisticas['reabastecimentos_falhados'] += 1
-                        print(f"Falha no reabastecimento: não foi possível alcançar o posto")
                         continue
 
-                # Buscar próxima rota normal
-                rota = self.busca.busca_rota_prioritaria(veiculo['id'])
-                if not rota:
                     print(f"Veículo {veiculo['id']} não encontrou rota válida.")
                     self.estatisticas['rotas_bloqueadas'] += 1
                     continue
 
                 # Calcular custos e impactos
-                impactos = self.gestor_eventos.get_impacto_total(rota)
-                custo_total = self._calcula_custo(rota, self.grafo)
-                tempo_total = self._calcula_tempo(rota, self.grafo)
+                custo_total, tempo_total, _ = self._avaliar_rota(rota, veiculo)
 
                 # Executar a entrega
                 sucesso = self.simular_entrega(veiculo, rota, custo_total, tempo_total)
@@ -582,11 +590,12 @@ def main():
     # Configurações da simulação
     NUM_PONTOS_ENTREGA = 200
     NUM_CICLOS = 10
+    SEED = 42
     
     # Criar grafo
     print("Criando o grafo...")
-    pdg = PortugalDistributionGraph()
-    grafo = pdg.criar_grafo_grande(NUM_PONTOS_ENTREGA)
+    pdg = PortugalDistributionGraph(seed=SEED)
+    grafo = pdg.carregar_ou_criar_grafo(NUM_PONTOS_ENTREGA)
     
     print("\nInformações do grafo:")
     print(f"Número de nós: {grafo.number_of_nodes()}")
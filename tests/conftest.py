@@ -0,0 +1,92 @@
+import math
+import os
+import random
+import sys
+
+import networkx as nx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from criar_grafo import PortugalDistributionGraph  # noqa: E402
+
+
+@pytest.fixture
+def grafo():
+    """Grafo gerado pequeno e reprodutível (sem passar pela cache de snapshots)."""
+    return PortugalDistributionGraph(seed=7).criar_grafo_grande(120)
+
+
+@pytest.fixture
+def pares(grafo):
+    """Pares (início, objetivo) aleatórios mas fixos para as comparações."""
+    aleatorio = random.Random(3)
+    nodos = list(grafo.nodes())
+    return [tuple(aleatorio.sample(nodos, 2)) for _ in range(60)]
+
+
+def _terreno(grafo, nodo):
+    terreno = grafo.nodes[nodo].get('tipo_terreno')
+    return getattr(terreno, 'value', terreno)
+
+
+@pytest.fixture
+def distancia_referencia():
+    """
+    Custo mínimo calculado com o networkx, com a regra das buscas do projeto:
+    arestas bloqueadas ignoradas e a aresta u -> v só usada se v não tiver um
+    terreno a evitar. Devolve inf se não existir caminho.
+    """
+    def distancia(grafo, inicio, objetivo, evitar=()):
+        def peso(u, v, dados):
+            if dados.get('bloqueado', False) or _terreno(grafo, v) in evitar:
+                return None
+            return dados['custo']
+        try:
+            return nx.shortest_path_length(grafo, inicio, objetivo, weight=peso)
+        except nx.NetworkXNoPath:
+            return float('inf')
+    return distancia
+
+
+@pytest.fixture
+def custo_caminho():
+    """Soma dos custos das arestas de um caminho, verificando que todas existem e são utilizáveis."""
+    def custo(grafo, caminho, evitar=()):
+        total = 0.0
+        for u, v in zip(caminho, caminho[1:]):
+            dados = grafo[u][v]
+            assert not dados.get('bloqueado', False)
+            assert _terreno(grafo, v) not in evitar
+            total += dados['custo']
+        return total
+    return custo
+
+
+@pytest.fixture
+def comparar_com_referencia(distancia_referencia, custo_caminho):
+    """Verifica, para cada par, que busca(inicio, objetivo, evitar) devolve um caminho de custo mínimo."""
+    def comparar(busca, grafo, pares, evitar=()):
+        for inicio, objetivo in pares:
+            esperado = distancia_referencia(grafo, inicio, objetivo, evitar)
+            caminho = busca(inicio, objetivo, list(evitar))
+            if math.isinf(esperado):
+                assert caminho is None
+            else:
+                assert caminho[0] == inicio and caminho[-1] == objetivo
+                assert custo_caminho(grafo, caminho, evitar) == pytest.approx(esperado)
+    return comparar
+
+
+@pytest.fixture
+def alterar_pesos():
+    """Gera eventos e bloqueios durante alguns ciclos e propaga as alterações ao CSR (e ao motor LPA*)."""
+    def alterar(grafo, gestor, csr, motor=None, ciclos=3):
+        for ciclo in range(ciclos):
+            gestor.gerar_eventos_aleatorios(0.2)
+            gestor.atualizar_eventos()
+            gestor.custos.definir_bloqueios(gestor.custos.ids(list(grafo.edges())[ciclo::11]), True)
+            arestas = csr.aplicar_alteracoes(gestor.aplicar_efeitos())
+            if motor is not None:
+                motor.notificar(arestas)
+    return alterar
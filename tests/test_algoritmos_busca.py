@@ -0,0 +1,56 @@
+import math
+
+import pytest
+
+from algoritmos_busca import busca_a_estrela, busca_bidirecional, busca_com_combustivel
+from avaliacao_rotas import MARGEM_COMBUSTIVEL
+from grafo_csr import GrafoCSR
+
+
+@pytest.mark.parametrize('busca', [busca_a_estrela, busca_bidirecional])
+def test_busca_exata_igual_ao_networkx(busca, grafo, pares, comparar_com_referencia):
+    csr = GrafoCSR(grafo)
+    comparar_com_referencia(lambda i, o, e: busca(csr, i, o, evitar=e), grafo, pares)
+
+
+@pytest.mark.parametrize('evitar', [('montanhoso',), ('florestal', 'costeiro')])
+def test_busca_bidirecional_com_terrenos_e_bloqueios(evitar, grafo, pares, comparar_com_referencia):
+    # Bloqueios espalhados para que a regra de paragem seja testada com fronteiras assimétricas
+    for k, (u, v) in enumerate(list(grafo.edges())):
+        if k % 7 == 0:
+            grafo[u][v]['bloqueado'] = True
+    csr = GrafoCSR(grafo)
+    comparar_com_referencia(lambda i, o, e: busca_bidirecional(csr, i, o, e), grafo, pares, evitar)
+
+
+def test_busca_com_combustivel_sem_limite_igual_ao_caminho_minimo(grafo, pares, distancia_referencia):
+    csr = GrafoCSR(grafo)
+    objetivos = [objetivo for _, objetivo in pares]
+    for inicio, _ in pares[:10]:
+        resultados = busca_com_combustivel(csr, inicio, objetivos, math.inf, math.inf)
+        for objetivo in objetivos:
+            esperado = distancia_referencia(grafo, inicio, objetivo)
+            if math.isinf(esperado):
+                assert objetivo not in resultados
+            else:
+                assert resultados[objetivo][0] == pytest.approx(esperado)
+
+
+def test_busca_com_combustivel_respeita_a_autonomia(grafo, pares, distancia_referencia, custo_caminho):
+    csr = GrafoCSR(grafo)
+    autonomia = 12.0
+    for inicio, objetivo in pares:
+        resultados = busca_com_combustivel(csr, inicio, [objetivo], autonomia / 2, autonomia)
+        if objetivo not in resultados:
+            continue
+        custo, caminho = resultados[objetivo]
+        assert custo == pytest.approx(custo_caminho(grafo, caminho))
+        assert custo >= distancia_referencia(grafo, inicio, objetivo) - 1e-9
+
+        # Cada troço entre postos cabe no combustível disponível com a reserva
+        combustivel = autonomia if grafo.nodes[inicio]['tipo'] == 'posto' else autonomia / 2
+        for u, v in zip(caminho, caminho[1:]):
+            combustivel -= grafo[u][v]['custo'] * MARGEM_COMBUSTIVEL
+            assert combustivel >= -1e-9
+            if grafo.nodes[v]['tipo'] == 'posto':
+                combustivel = autonomia
@@ -0,0 +1,45 @@
+import copy
+
+from algoritmos_busca import busca_com_combustivel
+from busca_emergencia import BuscaEmergencia
+from estado_inicial import estado_inicial
+
+
+def _busca(grafo):
+    estado = copy.deepcopy(estado_inicial)
+    # Segundo camião em Lisboa com o depósito quase vazio, depois do camião 1
+    quase_vazio = dict(next(v for v in estado["veiculos"] if v["id"] == 1), id=99, combustivel=0.5)
+    estado["veiculos"].insert(1, quase_vazio)
+    busca = BuscaEmergencia(grafo, estado)
+    # Sem a avaliação do portefólio: um algoritmo exato fixo
+    busca.algoritmo_escolhido = "A*"
+    return busca
+
+
+def test_planear_lote_igual_ao_planeamento_individual(grafo):
+    busca = _busca(grafo)
+    terrestres = [v for v in busca.estado["veiculos"] if not busca.planeador_aereo.e_aereo(v["tipo"])]
+    planeadas = busca.planear_lote(terrestres)
+
+    # Nenhuma zona atribuída a dois veículos
+    destinos = [rota[-1] for rota in planeadas.values() if rota]
+    assert len(destinos) == len(set(destinos))
+
+    for veiculo in terrestres:
+        rota = planeadas[veiculo["id"]]
+        if rota is None:
+            continue
+        # A rota é a que o veículo obtém sozinho para a mesma zona, com o seu próprio depósito
+        evitar = busca.restricao_acesso.terrenos_evitar(veiculo["tipo"])
+        sozinho = busca_com_combustivel(busca.grafo_csr, veiculo["localizacao"], [rota[-1]],
+                                        veiculo["combustivel"], veiculo["autonomia"], evitar=evitar)
+        assert rota == sozinho[rota[-1]][1]
+        assert busca.verificar_autonomia(veiculo, rota)
+
+
+def test_veiculo_quase_vazio_nao_limita_o_grupo(grafo):
+    busca = _busca(grafo)
+    camiao, quase_vazio = busca.estado["veiculos"][0], busca.estado["veiculos"][1]
+    sozinho = busca.planear_lote([camiao])[camiao["id"]]
+    assert sozinho is not None
+    assert busca.planear_lote([camiao, quase_vazio])[camiao["id"]] == sozinho
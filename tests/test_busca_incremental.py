@@ -0,0 +1,21 @@
+from busca_incremental import MotorIncremental
+from eventos_dinamicos import GestorEventos
+from grafo_csr import GrafoCSR
+
+
+def test_lpa_reparado_igual_ao_networkx(grafo, pares, comparar_com_referencia, alterar_pesos):
+    csr = GrafoCSR(grafo)
+    motor = MotorIncremental(csr)
+    comparar_com_referencia(motor.busca, grafo, pares)
+
+    # Os estados criados acima são reparados com as arestas notificadas, não recalculados
+    alterar_pesos(grafo, GestorEventos(grafo, seed=11), csr, motor)
+    assert len(motor._estados) > 0
+    comparar_com_referencia(motor.busca, grafo, pares)
+    comparar_com_referencia(motor.busca, grafo, pares, evitar=('urbano',))
+
+
+def test_lpa_limite_de_estados(grafo, pares, comparar_com_referencia):
+    motor = MotorIncremental(GrafoCSR(grafo), max_estados=3)
+    comparar_com_referencia(motor.busca, grafo, pares)
+    assert len(motor._estados) == 3
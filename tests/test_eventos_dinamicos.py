@@ -0,0 +1,75 @@
+import numpy as np
+
+from eventos_dinamicos import GestorEventos
+
+
+def _fixar_sorteio(monkeypatch, gestor, duracao):
+    """Faz com que todos os novos efeitos sejam do primeiro tipo e durem `duracao` ciclos."""
+    def sortear(quantidade, parametros):
+        return np.zeros(quantidade, dtype=np.int64), np.full(quantidade, duracao, dtype=np.int64)
+    monkeypatch.setattr(gestor, '_sortear', sortear)
+
+
+def _nodo_elegivel(grafo):
+    return next(n for n, d in grafo.nodes(data=True) if d['tipo'] != 'base')
+
+
+def test_obstaculo_vence_no_ciclo_agendado(grafo, monkeypatch):
+    gestor = GestorEventos(grafo, seed=1)
+    _fixar_sorteio(monkeypatch, gestor, 4)
+    gestor._param_obstaculos['prob_remocao'][:] = 1.0
+    nodo = _nodo_elegivel(grafo)
+
+    assert gestor.adicionar_obstaculo_fixo(nodo)
+    for _ in range(3):
+        gestor.atualizar_eventos()
+        assert nodo in gestor.obstaculos
+    gestor.atualizar_eventos()
+    assert nodo not in gestor.obstaculos
+    assert gestor.get_impacto_total([nodo]) == {'impacto_custo': 1.0, 'impacto_tempo': 1.0}
+
+
+def test_efeito_retido_no_sorteio_volta_a_ser_agendado(grafo, monkeypatch):
+    gestor = GestorEventos(grafo, seed=1)
+    _fixar_sorteio(monkeypatch, gestor, 2)
+    gestor._param_obstaculos['prob_remocao'][:] = 0.0
+    nodo = _nodo_elegivel(grafo)
+
+    gestor.adicionar_obstaculo_fixo(nodo)
+    for _ in range(5):
+        gestor.atualizar_eventos()
+    assert nodo in gestor.obstaculos
+
+    gestor._param_obstaculos['prob_remocao'][:] = 1.0
+    gestor.atualizar_eventos()
+    assert nodo not in gestor.obstaculos
+
+
+def test_calendario_igual_a_varrimento_completo(grafo):
+    """Os efeitos ativos seguem a regra do varrimento: saem no vencimento ou depois, nunca antes."""
+    gestor = GestorEventos(grafo, seed=3)
+    for _ in range(60):
+        gestor.gerar_eventos_aleatorios(0.1)
+        antes = gestor._vencimento_obstaculo.copy(), gestor._tipo_obstaculo.copy()
+        gestor.atualizar_eventos()
+        removidos = (antes[1] >= 0) & (gestor._tipo_obstaculo < 0)
+        assert (antes[0][removidos] == gestor.ciclo).all()
+        ativos = gestor._tipo_obstaculo >= 0
+        assert (gestor._vencimento_obstaculo[ativos] > gestor.ciclo).all()
+        assert set(gestor.obstaculos) == {gestor._nodos[i] for i in np.flatnonzero(ativos)}
+        assert len(gestor.eventos) == int((gestor._tipo_evento >= 0).sum())
+
+
+def test_obstaculo_repetido_com_o_mesmo_vencimento_nao_vence_duas_vezes(grafo, monkeypatch):
+    # Regressão: o nodo ficava com duas entradas no mesmo lote do calendário e a
+    # segunda remoção falhava com KeyError
+    gestor = GestorEventos(grafo, seed=1)
+    _fixar_sorteio(monkeypatch, gestor, 2)
+    gestor._param_obstaculos['prob_remocao'][:] = 1.0
+    nodo = _nodo_elegivel(grafo)
+
+    assert gestor.adicionar_obstaculo_fixo(nodo)
+    assert gestor.adicionar_obstaculo_fixo(nodo)
+    gestor.atualizar_eventos()
+    gestor.atualizar_eventos()
+    assert nodo not in gestor.obstaculos
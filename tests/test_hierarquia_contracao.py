@@ -0,0 +1,20 @@
+from eventos_dinamicos import GestorEventos
+from grafo_csr import GrafoCSR
+from hierarquia_contracao import HierarquiaContracao
+
+
+def test_hierarquia_igual_ao_networkx(grafo, pares, comparar_com_referencia):
+    hierarquia = HierarquiaContracao(GrafoCSR(grafo))
+    comparar_com_referencia(hierarquia.busca, grafo, pares)
+    comparar_com_referencia(hierarquia.busca, grafo, pares, evitar=('rural',))
+
+
+def test_hierarquia_personalizada_apos_alteracoes(grafo, pares, comparar_com_referencia, alterar_pesos):
+    csr = GrafoCSR(grafo)
+    hierarquia = HierarquiaContracao(csr)
+    comparar_com_referencia(hierarquia.busca, grafo, pares)
+
+    # Nova versão do CSR: pesos repersonalizados sobre a mesma ordem e atalhos desdobrados de novo
+    alterar_pesos(grafo, GestorEventos(grafo, seed=5), csr)
+    comparar_com_referencia(hierarquia.busca, grafo, pares)
+    comparar_com_referencia(hierarquia.busca, grafo, pares, evitar=('montanhoso',))
@@ -0,0 +1,14 @@
+from grafo_csr import GrafoCSR
+from limitacoes_geograficas import RestricaoAcesso
+
+
+def test_compativel_igual_as_mascaras_do_csr(grafo):
+    # Uma única regra: a matriz de compatibilidade e as máscaras das buscas nunca divergem,
+    # incluindo nos nodos sem terreno (bases e postos)
+    restricao = RestricaoAcesso()
+    csr = GrafoCSR(grafo)
+    assert any(grafo.nodes[n].get('tipo_terreno') is None for n in csr.nomes)
+    for tipo in restricao.restricoes_veiculo:
+        proibido = csr.nodos_proibidos(restricao.terrenos_evitar(tipo))
+        for i, nome in enumerate(csr.nomes):
+            assert restricao.compativel(tipo, grafo.nodes[nome].get('tipo_terreno')) == (not proibido[i])